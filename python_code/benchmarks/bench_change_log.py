@@ -0,0 +1,89 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.DatabaseSystem import DatabaseSystem
+from database.ChangeLog import drop_change_triggers, install_change_triggers
+
+#   Change Log Benchmark
+#
+#   Times what the change log (see ChangeLog) costs writers and saves readers:
+#       - load:    inserting the catalog with and without the change triggers
+#       - update:  quantity updates of random items in one transaction, with and without the triggers
+#       - read:    changes_since() for the updates
+#       - catch up: a ColumnStore applying the updates made by another connection, against a full reload
+#
+#   python benchmarks/bench_change_log.py --items 1000000 --updates 1000
+#
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def load(database, items, start=0):
+    with database.transaction():
+        database.cursor.executemany(
+            f"INSERT INTO {database.items_table} (id, name, quantity, price, category, brand, description) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((f"SKU-{i:07d}", f"Item {i}", i % 100, round((i * 7919) % 100000 / 100, 2),
+              f"Category {i % 20}", f"Brand {i % 500}", "") for i in range(start, start + items)))
+
+
+def update(database, items, updates, offset):
+    with database.transaction():
+        database.cursor.executemany(f"UPDATE {database.items_table} SET quantity = quantity + 1 WHERE id = ?",
+                                    ((f"SKU-{(i * 7919 + offset) % items:07d}",) for i in range(updates)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the change log triggers and incremental readers")
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--updates", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = DatabaseSystem(os.path.join(directory, "changes"), os.path.join(directory, "changes.db"))
+        tables = database.change_log.tables
+        with database.storage_profile("bulk-load"):
+            half = args.items // 2
+            with_triggers = timed(lambda: load(database, half), 1)
+            drop_change_triggers(database.conn, database.items_table)
+            without_triggers = timed(lambda: load(database, half, half), 1)
+        print(f"{'load':10} ms with triggers:{with_triggers * 1000:8.0f}  without:{without_triggers * 1000:8.0f}  ({half} items each)")
+
+        without_triggers = timed(lambda: update(database, args.items, args.updates, 0), 1)
+        with database.transaction():
+            install_change_triggers(database.conn, tables)
+        with_triggers = timed(lambda: update(database, args.items, args.updates, 1), 1)
+        print(f"{'update':10} ms with triggers:{with_triggers * 1000:8.2f}  without:{without_triggers * 1000:8.2f}  ({args.updates} items)")
+
+        store = database.column_store()
+        # Look at the log on every refresh, the catch up below is timed right after this one
+        store.follow_timer.interval = 0
+        store.refresh()
+        seq = database.latest_change()
+        update(database, args.items, args.updates, 2)
+        database.changes_since(seq)
+        read = timed(lambda: database.changes_since(seq), 10)
+        print(f"{'read':10} ms:{read * 1000:8.2f}  ({len(database.changes_since(seq))} changes)")
+
+        # Another connection changes the items, the store only knows through the change log
+        other = DatabaseSystem(os.path.join(directory, "other"), os.path.join(directory, "changes.db"))
+        update(other, args.items, args.updates, 3)
+        catch_up = timed(store.refresh, 1)
+        reload = timed(store.reload, 1)
+        print(f"{'catch up':10} ms:{catch_up * 1000:8.2f}  full reload ms:{reload * 1000:8.0f}")
+
+        for system in (other, database):
+            system.connections.close()
+            system.log_file.close()
+
+
+if __name__ == "__main__":
+    main()
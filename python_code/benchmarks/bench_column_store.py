@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.DatabaseSystem import DatabaseSystem
+
+#   Column Store Benchmark
+#
+#   Builds the ColumnStore snapshot of a large catalog and times the dashboard and search queries:
+#       - low stock:   count of items with quantity <= 5
+#       - category:    ids of one category with a price range
+#       - value:       total price * quantity
+#       - search:      text search of the name column
+#       - refresh:     a stock change followed by a count (incremental refresh of one row)
+#
+#   python benchmarks/bench_column_store.py --items 1000000
+#
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time ColumnStore filters and aggregates")
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = DatabaseSystem(os.path.join(directory, "columns"), os.path.join(directory, "columns.db"))
+        with database.storage_profile("bulk-load"):
+            with database.transaction():
+                database.cursor.executemany(
+                    f"INSERT INTO {database.items_table} (id, name, quantity, price, category, brand, description) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((str(i), f"Item {i}", i % 100, (i % 500) / 10, f"Category {i % 20}", f"Brand {i % 50}", "") for i in range(args.items)))
+
+        store = database.column_store()
+        build = timed(store.reload, 1)
+        print(f"{'build':10} ms:{build * 1000:9.2f}")
+
+        queries = {
+            "low stock": lambda: store.count({"quantity": ("<=", 5)}),
+            "category": lambda: store.ids_where({"category": "Category 3", "price": (">", 20)}),
+            "value": lambda: store.total_value(),
+            "search": lambda: store.search(["name"], "Item 4242"),
+            "refresh": lambda: (database.adjust_stock("7", 1), store.count()),
+        }
+        for name, query in queries.items():
+            print(f"{name:10} ms:{timed(query, args.repeat) * 1000:9.2f}")
+
+        database.connections.close()
+        database.log_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.DatabaseSystem import DatabaseSystem
+
+#   Facet Counts Benchmark
+#
+#   Times the facet panels of the inventory view on a large catalog (see FacetCounts):
+#       - cold:     every facet counted from the database (first view after a change)
+#       - drill:    one more value checked, only the other facets are recounted
+#       - cached:   the same selection again, answered from the cache
+#
+#   python benchmarks/bench_facet_counts.py --items 500000
+#
+
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time facet counts as filters combine")
+    parser.add_argument("--items", type=int, default=500000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = DatabaseSystem(os.path.join(directory, "facets"), os.path.join(directory, "facets.db"))
+        with database.storage_profile("bulk-load"):
+            with database.transaction():
+                database.cursor.executemany(
+                    f"INSERT INTO {database.items_table} (id, name, quantity, price, category, brand, description) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((str(i), f"Item {i}", i % 100, (i % 500) / 10, f"Category {i % 20}", f"Brand {i % 50}", "") for i in range(args.items)))
+
+        facets = database.facet_fields()
+        steps = [
+            ("cold", {}),
+            ("drill", {"category": ("in", ["Category 3"])}),
+            ("drill", {"category": ("in", ["Category 3"]), "brand": ("in", ["Brand 3", "Brand 23"])}),
+            ("drill", {"category": ("in", ["Category 3"]), "brand": ("in", ["Brand 3", "Brand 23"]), "price": ("range", (0, 10))}),
+            ("cached", {"category": ("in", ["Category 3"]), "brand": ("in", ["Brand 3", "Brand 23"]), "price": ("range", (0, 10))}),
+        ]
+        for name, filters in steps:
+            seconds = timed(lambda: database.get_facet_counts(facets, filters, limit=50))
+            print(f"{name:8} filters:{len(filters)} ms:{seconds * 1000:9.2f}")
+
+        database.connections.close()
+        database.log_file.close()
+
+
+if __name__ == "__main__":
+    main()
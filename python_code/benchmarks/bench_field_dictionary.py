@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.DatabaseSystem import DatabaseSystem
+
+#   Field Dictionary Benchmark
+#
+#   Loads a catalog with long category and brand names and compares the text columns with their
+#   dictionary encoded version (see FieldDictionaries):
+#       - size:      database file size after VACUUM
+#       - encode:    time to encode both fields
+#       - filter:    count of one category and brand
+#       - distinct:  distinct categories (the inventory view's category list)
+#
+#   python benchmarks/bench_field_dictionary.py --items 200000
+#
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def report(label, database, path, repeat):
+    database.conn.execute("VACUUM")
+    size = os.path.getsize(path) / 1024 / 1024
+    filters = {"category": "Electronic Components / Category 3", "brand": "Manufacturer Brand Name 7"}
+    count = timed(lambda: database.count_items(filters), repeat)
+    distinct = timed(lambda: database.get_distinct_values("category"), repeat)
+    print(f"{label:8} MiB:{size:8.1f} filter ms:{count * 1000:8.2f} distinct ms:{distinct * 1000:8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare text and dictionary encoded fields")
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dictionary.db")
+        database = DatabaseSystem(os.path.join(directory, "dictionary"), path)
+        with database.transaction():
+            database.cursor.executemany(
+                f"INSERT INTO {database.items_table} (id, name, quantity, price, category, brand, description) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((str(i), f"Item {i}", i % 100, 9.99, f"Electronic Components / Category {i % 40}", f"Manufacturer Brand Name {i % 200}", "") for i in range(args.items)))
+        for field in ("category", "brand"):
+            database.cursor.execute(f"CREATE INDEX IF NOT EXISTS {database.items_table}_{field} ON {database.items_table}({field})")
+        database.conn.commit()
+        report("text", database, path, args.repeat)
+
+        encode = timed(lambda: [database.set_field_dictionary(field) for field in ("category", "brand")], 1)
+        print(f"{'encode':8} seconds:{encode:8.3f}")
+        report("encoded", database, path, args.repeat)
+
+        database.connections.close()
+        database.log_file.close()
+
+
+if __name__ == "__main__":
+    main()
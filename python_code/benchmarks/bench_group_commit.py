@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.DatabaseSystem import DatabaseSystem
+from database.WriteQueue import GroupCommitWriter
+
+#   Group Commit Benchmark
+#
+#   Times a burst of stock removals (as produced by a barcode scanner) applied with
+#       - per-call: remove_item_from_database, one commit per removal
+#       - grouped:  the same calls submitted to GroupCommitWriter
+#
+#   python benchmarks/bench_group_commit.py --removals 500
+#
+
+
+def build_database(directory, name, items):
+    database = DatabaseSystem(os.path.join(directory, name), os.path.join(directory, f"{name}.db"))
+    database.cursor.executemany(
+        f"INSERT INTO {database.items_table} (id, name, quantity, price, category, brand, description) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((str(i), f"Item {i}", 1000000, 9.99, "Cables", "Brand", "") for i in range(items)))
+    database.conn.commit()
+    return database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call commits with group commits")
+    parser.add_argument("--removals", type=int, default=500)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = build_database(directory, "per_call", args.items)
+        started = time.perf_counter()
+        for i in range(args.removals):
+            database.remove_item_from_database(str(i % args.items), 1)
+        per_call = time.perf_counter() - started
+        database.conn.close()
+        database.log_file.close()
+
+        database = build_database(directory, "grouped", args.items)
+        writer = GroupCommitWriter(database, latency=args.latency)
+        started = time.perf_counter()
+        futures = [writer.submit("remove_item_from_database", str(i % args.items), 1) for i in range(args.removals)]
+        for future in futures:
+            future.result()
+        grouped = time.perf_counter() - started
+        writer.close()
+        database.conn.close()
+        database.log_file.close()
+
+        print(f"per-call  removals:{args.removals} seconds:{per_call:.3f} per second:{args.removals / per_call:.0f} commits:{args.removals}")
+        print(f"grouped   removals:{args.removals} seconds:{grouped:.3f} per second:{args.removals / grouped:.0f} commits:{writer.commits}")
+
+
+if __name__ == "__main__":
+    main()
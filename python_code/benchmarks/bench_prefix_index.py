@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.DatabaseSystem import DatabaseSystem
+
+#   Prefix Index Benchmark
+#
+#   Builds the autocomplete index (see PrefixIndex) of a large catalog and times:
+#       - complete:  completions of short and long prefixes, all fields and the id field only
+#       - update:    a committed change of one item followed by a completion
+#
+#   python benchmarks/bench_prefix_index.py --items 1000000
+#
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time PrefixIndex completions")
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = DatabaseSystem(os.path.join(directory, "prefix"), os.path.join(directory, "prefix.db"))
+        with database.storage_profile("bulk-load"):
+            with database.transaction():
+                database.cursor.executemany(
+                    f"INSERT INTO {database.items_table} (id, name, quantity, price, category, brand, description) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((f"SKU-{i:07d}", f"Item {i}", i % 100, 9.99, f"Category {i % 20}", f"Brand {i % 500}", "") for i in range(args.items)))
+
+        index = database.prefix_index()
+        print(f"{'build':10} seconds:{timed(index.reload, 1):8.3f}")
+
+        queries = {
+            "short": lambda: database.complete_values("it"),
+            "long": lambda: database.complete_values("item 4242"),
+            "id": lambda: database.complete_values("sku-00123", field="id"),
+            "no match": lambda: database.complete_values("zzz"),
+        }
+        for name, query in queries.items():
+            print(f"{name:10} us:{timed(query, args.repeat) * 1000000:8.1f}")
+        update = timed(lambda: (database.adjust_stock("SKU-0000007", 1), database.update_item("SKU-0000007", {"brand": "Brand X"}), database.complete_values("brand x")), 20)
+        print(f"{'update':10} ms:{update * 1000:8.2f}")
+
+        database.connections.close()
+        database.log_file.close()
+
+
+if __name__ == "__main__":
+    main()
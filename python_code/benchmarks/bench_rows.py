@@ -0,0 +1,79 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.DatabaseSystem import DatabaseSystem
+
+#   Result Rows Benchmark
+#
+#   Loads the whole catalog and reads every value, as the inventory table does, with
+#       - dataframe: get_all_items() and iterrows()
+#       - rowset:    fetch_all_items() and its tuples
+#       - records:   fetch_all_items().records() (generated __slots__ rows)
+#   and reports the time and the peak memory of each.
+#
+#   python benchmarks/bench_rows.py --items 100000
+#
+
+
+def read_dataframe(database):
+    df = database.get_all_items()
+    count = 0
+    for _, row in df.iterrows():
+        for field in df.columns:
+            count += row[field] is not None
+    return count
+
+
+def read_rowset(database):
+    count = 0
+    for row in database.fetch_all_items():
+        for value in row:
+            count += value is not None
+    return count
+
+
+def read_records(database):
+    count = 0
+    for row in database.fetch_all_items().records():
+        for value in row.values():
+            count += value is not None
+    return count
+
+
+def measure(function, database):
+    tracemalloc.start()
+    started = time.perf_counter()
+    function(database)
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare DataFrame and RowSet reads")
+    parser.add_argument("--items", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = DatabaseSystem(os.path.join(directory, "rows"), os.path.join(directory, "rows.db"))
+        with database.transaction():
+            database.cursor.executemany(
+                f"INSERT INTO {database.items_table} (id, name, quantity, price, category, brand, description) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((str(i), f"Item {i}", i % 100, 9.99, f"Category {i % 20}", f"Brand {i % 50}", "Benchmark item " * 8) for i in range(args.items)))
+
+        for name, function in (("dataframe", read_dataframe), ("rowset", read_rowset), ("records", read_records)):
+            seconds, peak = measure(function, database)
+            print(f"{name:10} seconds:{seconds:8.3f} peak MiB:{peak / 1024 / 1024:8.1f}")
+
+        database.connections.close()
+        database.log_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.SchemaChange import SchemaChangeEngine
+
+#   Column Drop Benchmark
+#
+#   Times removing a field from a products table of the given size with
+#       - copy:    the old CREATE TABLE ... AS SELECT / DROP / RENAME approach
+#       - alter:   ALTER TABLE ... DROP COLUMN through SchemaChangeEngine
+#       - rebuild: the batched online rebuild through SchemaChangeEngine
+#
+#   python benchmarks/bench_schema_change.py --rows 1000000
+#
+
+
+def build_table(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE products (id TEXT PRIMARY KEY, name TEXT, brand TEXT, category TEXT, "
+                 "price REAL, quantity INTEGER, description TEXT, warranty TEXT)")
+    conn.execute("CREATE INDEX products_category ON products (category)")
+    conn.executemany("INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     ((str(i), f"Item {i}", f"Brand {i % 50}", f"Category {i % 20}", i % 1000 + 0.99,
+                       i % 300, "Benchmark row", f"{i % 5} years") for i in range(rows)))
+    conn.commit()
+    return conn
+
+
+def time_copy(conn):
+    started = time.perf_counter()
+    columns = [column[1] for column in conn.execute("PRAGMA table_info(products)").fetchall() if column[1] != "warranty"]
+    conn.execute(f"CREATE TABLE temp_table AS SELECT {', '.join(columns)} FROM products")
+    conn.execute("DROP TABLE products")
+    conn.execute("ALTER TABLE temp_table RENAME TO products")
+    conn.commit()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time removing a column from a large products table")
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for method in ("copy", "alter", "rebuild"):
+            conn = build_table(os.path.join(directory, f"{method}.db"), args.rows)
+            if method == "copy":
+                seconds = time_copy(conn)
+            else:
+                engine = SchemaChangeEngine(conn)
+                if method == "rebuild":
+                    engine.can_alter_drop = lambda *args: False
+                seconds = engine.drop_column("products", "warranty")["seconds"]
+            indexes = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = 'products'").fetchone()[0]
+            print(f"{method:8} rows:{args.rows} seconds:{seconds:.3f} indexes kept:{indexes}")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.DatabaseSystem import DatabaseSystem
+
+#   Sorted Pages Benchmark
+#
+#   Times the pages of the inventory table (see DatabaseSystem.fetch_page) on a large catalog:
+#       - first:  the first page after clicking a header, both directions
+#       - deep:   a page half way through the sort order, continuing after the previous page
+#       - all:    reading and sorting every item, what showing the whole table costs
+#   price and quantity are indexed (schema migration 6), name is not.
+#
+#   python benchmarks/bench_sorted_pages.py --items 1000000
+#
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time sorted keyset pages of the items table")
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = DatabaseSystem(os.path.join(directory, "pages"), os.path.join(directory, "pages.db"))
+        with database.storage_profile("bulk-load"):
+            with database.transaction():
+                database.cursor.executemany(
+                    f"INSERT INTO {database.items_table} (id, name, quantity, price, category, brand, description) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((f"SKU-{i:07d}", f"Item {i}", i % 100, None if i % 50 == 0 else round((i * 7919) % 100000 / 100, 2),
+                      f"Category {i % 20}", f"Brand {i % 500}", "") for i in range(args.items)))
+        database.cursor.execute("ANALYZE")
+
+        for column in ("price", "quantity", "name"):
+            for descending in (False, True):
+                label = f"{column} {'desc' if descending else 'asc'}"
+                first = timed(lambda: database.fetch_page(order_by=column, descending=descending), args.repeat)
+                # The page after the first half of the order
+                _, after = database.fetch_page([column], order_by=column, descending=descending, limit=args.items // 2)
+                deep = timed(lambda: database.fetch_page(order_by=column, descending=descending, after=after), args.repeat)
+                print(f"{label:14} first ms:{first * 1000:8.2f}  deep ms:{deep * 1000:8.2f}")
+        full = timed(lambda: database.fetch_items(order_by="price"), 1)
+        print(f"{'all by price':14} ms:{full * 1000:8.0f}")
+
+        database.connections.close()
+        database.log_file.close()
+
+
+if __name__ == "__main__":
+    main()
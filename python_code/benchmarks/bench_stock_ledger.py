@@ -0,0 +1,72 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.DatabaseSystem import DatabaseSystem
+
+#   Stock Ledger Benchmark
+#
+#   Fills stock_movements with a year of synthetic movements and times:
+#       - history: the last 100 movements of one item
+#       - item:    daily totals of one item over a month
+#       - all:     weekly totals of every item over the whole year
+#
+#   python benchmarks/bench_stock_ledger.py --movements 10000000
+#
+
+
+def fill_ledger(database, movements, items):
+    start = int(time.time()) - 365 * 86400
+    step = 365 * 86400 / movements
+    batch = []
+    with database.storage_profile("bulk-load"):
+        with database.transaction():
+            for i in range(movements):
+                batch.append((str(random.randrange(items)), random.choice((-3, -2, -1, -1, 5, 10)), None, "remove", start + int(i * step)))
+                if len(batch) == 100000:
+                    database.cursor.executemany(f"INSERT INTO {database.movements_table} (product_id, delta, quantity, reason, created_at) VALUES (?, ?, ?, ?, ?)", batch)
+                    batch = []
+            database.cursor.executemany(f"INSERT INTO {database.movements_table} (product_id, delta, quantity, reason, created_at) VALUES (?, ?, ?, ?, ?)", batch)
+    return start
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time stock ledger queries")
+    parser.add_argument("--movements", type=int, default=1000000)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = DatabaseSystem(os.path.join(directory, "ledger"), os.path.join(directory, "ledger.db"))
+        started = time.perf_counter()
+        start = fill_ledger(database, args.movements, args.items)
+        print(f"filled {args.movements} movements in {time.perf_counter() - started:.1f}s")
+
+        month = (start + 180 * 86400, start + 210 * 86400)
+        queries = {
+            "history": lambda: database.get_stock_history("42", limit=100),
+            "item": lambda: database.get_stock_totals("day", month[0], month[1], item_id="42"),
+            "all": lambda: database.get_stock_totals("week"),
+        }
+        for name, query in queries.items():
+            seconds, rows = timed(query, args.repeat if name != "all" else 1)
+            print(f"{name:8} rows:{rows:6} ms:{seconds * 1000:9.2f}")
+
+        database.connections.close()
+        database.log_file.close()
+
+
+if __name__ == "__main__":
+    main()
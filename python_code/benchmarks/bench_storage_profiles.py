@@ -0,0 +1,64 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.DatabaseSystem import DatabaseSystem
+from database.StorageProfiles import STORAGE_PROFILES
+
+#   Storage Profile Benchmark
+#
+#   Runs the same workloads under every storage profile:
+#       - import:   inserting a catalog in one transaction
+#       - removals: single-item stock removals, each committed on its own
+#       - reads:    loading the whole catalog and searching it by name
+#
+#   python benchmarks/bench_storage_profiles.py --items 50000
+#
+
+
+def run_profile(directory, profile, items, removals, reads):
+    database = DatabaseSystem(os.path.join(directory, profile), os.path.join(directory, f"{profile}.db"), storage_profile=profile)
+    timings = {}
+
+    started = time.perf_counter()
+    with database.transaction():
+        database.cursor.executemany(
+            f"INSERT INTO {database.items_table} (id, name, quantity, price, category, brand, description) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((str(i), f"Item {i}", 1000, 9.99, f"Category {i % 20}", f"Brand {i % 50}", "Benchmark item") for i in range(items)))
+    timings["import"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(removals):
+        database.remove_item_from_database(str(i % items), 1)
+    timings["removals"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(reads):
+        database.get_all_items()
+        database.search_items(["name"], f"Item {i}")
+    timings["reads"] = time.perf_counter() - started
+
+    database.connections.close()
+    database.log_file.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SQLite storage profiles")
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--removals", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'profile':10} {'import':>8} {'removals':>9} {'reads':>8}")
+        for profile in STORAGE_PROFILES:
+            timings = run_profile(directory, profile, args.items, args.removals, args.reads)
+            print(f"{profile:10} {timings['import']:8.3f} {timings['removals']:9.3f} {timings['reads']:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import hashlib
+import mmap
+import os
+import shutil
+import threading
+
+# Size of the chunks used when streaming payloads
+CHUNK_SIZE = 64 * 1024
+
+#   Blob Storage Backends
+#
+#   These classes decide where the bytes of product images live. Every backend
+#   exposes the same small interface so DatabaseSystem does not care which one is used:
+#       - put(data)              -> (image_data, image_ref) to store in the images table
+#       - get(image_data, ref)   -> the original bytes
+#       - delete(ref)            -> release the payload of a reference that is no longer used
+#       - clear()                -> remove every payload owned by the backend
+#       - open_stream(ref)       -> a readable binary file object for the payload
+#       - settings(base)         -> what the database saves to open the same store again (see open_blob_store)
+#
+#   External backends can also write payloads in fixed-size chunks:
+#       - put_stream(source)     -> same as put() but reads from a file object chunk by chunk
+#
+#   DatabaseBlobStore keeps the bytes inside SQLite (the original behaviour)
+#   FileBlobStore writes each payload to a sharded directory, keyed by its SHA-256 hash
+#   PackFileBlobStore appends every payload to a single pack file
+#
+#   The external backends keep only a reference in SQLite and serve reads through mmap
+#
+
+
+#
+#   Returns the SHA-256 hex digest used to address image payloads
+#
+def blob_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+#
+#   Yields chunks read from a file object (or socket) until it is exhausted
+#
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    read = source.read if hasattr(source, "read") else source.recv
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+#
+#   Returns a path relative to base when possible, so a database and its store can be moved together
+#
+def relative_path(path, base):
+    try:
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(base))
+    except ValueError:
+        # ex. another drive on Windows
+        return os.path.abspath(path)
+
+
+#
+#   Opens the blob store described by settings() (paths are relative to base)
+#
+def open_blob_store(settings, base="."):
+    store = settings.get("store", "database")
+    if store == "database":
+        return DatabaseBlobStore()
+    if store == "files":
+        return FileBlobStore(os.path.join(base, settings["root"]), int(settings.get("shard_depth", 2)))
+    if store == "pack":
+        return PackFileBlobStore(os.path.join(base, settings["path"]))
+    raise ValueError(f"Unknown blob store '{store}'")
+
+
+#
+#   Readable file object over a byte range of a larger file (used for pack file payloads)
+#
+class RangeReader:
+    def __init__(self, path, offset, length):
+        self.file = open(path, "rb")
+        self.file.seek(offset)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DatabaseBlobStore:
+    name = "database"
+    inline = True
+
+    def put(self, data, digest=None):
+        # The bytes stay in the image_data column, no reference is needed
+        return data, None
+
+    def get(self, image_data, image_ref):
+        if image_ref:
+            raise ValueError(f"Image {image_ref} is kept in an external blob store, open the database with that store")
+        return image_data
+
+    def open_stream(self, image_ref):
+        # Inline images are read from the image_data column, a reference belongs to an external store
+        raise ValueError(f"Image {image_ref} is kept in an external blob store, open the database with that store")
+
+    def delete(self, image_ref):
+        pass
+
+    def clear(self):
+        pass
+
+    def settings(self, base="."):
+        return {"store": self.name}
+
+
+class FileBlobStore:
+    name = "files"
+    inline = False
+
+    def __init__(self, root: str, shard_depth: int = 2):
+        # Directory that holds the payloads, sharded by the first bytes of the digest
+        # (ex. root/ab/cd/abcd...) so no single directory grows too large
+        self.root = root
+        self.shard_depth = shard_depth
+        os.makedirs(self.root, exist_ok=True)
+
+    #
+    #   Returns the on-disk path of a payload reference
+    #
+    def path_for(self, image_ref):
+        shards = [image_ref[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.root, *shards, image_ref)
+
+    def put(self, data, digest=None):
+        image_ref = digest or blob_digest(data)
+        path = self.path_for(image_ref)
+
+        # Payloads are content addressed, identical images are only written once
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a partial payload behind
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as payload_file:
+                payload_file.write(data)
+                payload_file.flush()
+                os.fsync(payload_file.fileno())
+            os.replace(temp_path, path)
+
+        # The images table keeps an empty blob and the reference
+        return b"", image_ref
+
+    def put_stream(self, source, chunk_size=CHUNK_SIZE):
+        # The digest is only known once everything is read, so stream into a temporary file first
+        os.makedirs(self.root, exist_ok=True)
+        temp_path = os.path.join(self.root, f"incoming.{os.getpid()}.{threading.get_ident()}.tmp")
+        hasher = hashlib.sha256()
+        try:
+            with open(temp_path, "wb") as payload_file:
+                for chunk in iter_chunks(source, chunk_size):
+                    hasher.update(chunk)
+                    payload_file.write(chunk)
+                payload_file.flush()
+                os.fsync(payload_file.fileno())
+
+            image_ref = hasher.hexdigest()
+            path = self.path_for(image_ref)
+            if os.path.exists(path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return b"", image_ref
+
+    def open_stream(self, image_ref):
+        return open(self.path_for(image_ref), "rb")
+
+    def get(self, image_data, image_ref):
+        if not image_ref:
+            return image_data
+
+        with open(self.path_for(image_ref), "rb") as payload_file:
+            # mmap cannot map empty files
+            if os.fstat(payload_file.fileno()).st_size == 0:
+                return b""
+            with mmap.mmap(payload_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[:]
+
+    def delete(self, image_ref):
+        if not image_ref:
+            return
+        try:
+            os.remove(self.path_for(image_ref))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+
+    def settings(self, base="."):
+        return {"store": self.name, "root": relative_path(self.root, base), "shard_depth": self.shard_depth}
+
+
+class PackFileBlobStore:
+    name = "pack"
+    inline = False
+
+    def __init__(self, path: str):
+        # Single append-only file, references are "offset:length" into the file
+        self.path = path
+        self.lock = threading.Lock()
+        # Guards the map: reads copy their range while holding it, so a remap never closes a map in use
+        self.map_lock = threading.Lock()
+        self.mapped = None
+        self.mapped_size = 0
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(self.path):
+            open(self.path, "wb").close()
+
+    def settings(self, base="."):
+        return {"store": self.name, "path": relative_path(self.path, base)}
+
+    def put(self, data, digest=None):
+        with self.lock:
+            with open(self.path, "ab") as pack_file:
+                offset = pack_file.seek(0, os.SEEK_END)
+                pack_file.write(data)
+                pack_file.flush()
+                os.fsync(pack_file.fileno())
+        return b"", f"{offset}:{len(data)}"
+
+    def put_stream(self, source, chunk_size=CHUNK_SIZE):
+        with self.lock:
+            with open(self.path, "ab") as pack_file:
+                offset = pack_file.seek(0, os.SEEK_END)
+                length = 0
+                for chunk in iter_chunks(source, chunk_size):
+                    pack_file.write(chunk)
+                    length += len(chunk)
+                pack_file.flush()
+                os.fsync(pack_file.fileno())
+        return b"", f"{offset}:{length}"
+
+    def open_stream(self, image_ref):
+        offset, length = (int(part) for part in image_ref.split(":"))
+        return RangeReader(self.path, offset, length)
+
+    #
+    #   Copies a range out of a read-only map of the pack file, remapping when the file has grown since the last read
+    #
+    def read_range(self, offset, length):
+        with self.map_lock:
+            if self.mapped is None or offset + length > self.mapped_size:
+                if self.mapped is not None:
+                    self.mapped.close()
+                with open(self.path, "rb") as pack_file:
+                    self.mapped_size = os.fstat(pack_file.fileno()).st_size
+                    self.mapped = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self.mapped[offset:offset + length]
+
+    def get(self, image_data, image_ref):
+        if not image_ref:
+            return image_data
+
+        offset, length = (int(part) for part in image_ref.split(":"))
+        if length == 0:
+            return b""
+        return self.read_range(offset, length)
+
+    def delete(self, image_ref):
+        # The pack file is append-only, unused ranges are left in place
+        pass
+
+    def clear(self):
+        with self.lock, self.map_lock:
+            if self.mapped is not None:
+                self.mapped.close()
+                self.mapped = None
+                self.mapped_size = 0
+            open(self.path, "wb").close()
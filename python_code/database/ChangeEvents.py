@@ -0,0 +1,99 @@
+#   Change Events
+#
+#   DatabaseSystem publishes what its methods changed on a ChangeBus, so the views and the in-memory
+#   indexes (ColumnStore, FacetCounts, PrefixIndex) can apply the change instead of reloading everything:
+#       - ITEM_ADDED, ITEM_UPDATED, ITEM_REMOVED:  item_ids lists the items, an update that changed
+#         ids has renamed = {old id: new id}
+#       - FIELD_ADDED, FIELD_REMOVED:               field is the column
+#       - IMAGES_CHANGED:                           item_ids lists the items whose images changed
+#       - ITEMS_RELOADED:                           anything may have changed (ex. the database was cleared)
+#
+#   Events are only published once their changes are committed. Events of a savepoint that is rolled
+#   back are dropped with it, so a failed transaction publishes nothing. Subscribers are called on the
+#   thread that committed (ex. the WriteQueue writer thread), the views pass them to the GUI thread.
+#
+
+ITEM_ADDED = "item_added"
+ITEM_UPDATED = "item_updated"
+ITEM_REMOVED = "item_removed"
+FIELD_ADDED = "field_added"
+FIELD_REMOVED = "field_removed"
+IMAGES_CHANGED = "images_changed"
+ITEMS_RELOADED = "items_reloaded"
+
+# Events that change the values of items
+ITEM_EVENTS = {ITEM_ADDED, ITEM_UPDATED, ITEM_REMOVED, ITEMS_RELOADED}
+
+# Events that change the columns of the items table
+SCHEMA_EVENTS = {FIELD_ADDED, FIELD_REMOVED, ITEMS_RELOADED}
+
+
+class ChangeEvent:
+    __slots__ = ("kind", "item_ids", "field", "renamed")
+
+    def __init__(self, kind, item_ids=None, field=None, renamed=None):
+        self.kind = kind
+        # Ids are stored as text, callers may pass numbers
+        self.item_ids = [str(item_id) for item_id in item_ids or []]
+        self.field = field
+        self.renamed = {str(old_id): str(new_id) for old_id, new_id in (renamed or {}).items()}
+
+    #
+    #   Returns every id the event touches, including the ids items had before a rename
+    #
+    def affected_ids(self):
+        return list(dict.fromkeys(self.item_ids + list(self.renamed)))
+
+    def __eq__(self, other):
+        return isinstance(other, ChangeEvent) and (self.kind, self.item_ids, self.field, self.renamed) == (other.kind, other.item_ids, other.field, other.renamed)
+
+    def __repr__(self):
+        return f"ChangeEvent({self.kind!r}, item_ids={self.item_ids!r}, field={self.field!r}, renamed={self.renamed!r})"
+
+
+class ChangeBus:
+    def __init__(self, log=None):
+        # [(callback, kinds or None for every kind)]
+        self.subscribers = []
+        self.log = log
+
+    #
+    #   Calls callback(event) for every committed event of the given kinds (all kinds by default)
+    #
+    def subscribe(self, callback, kinds=None):
+        self.subscribers.append((callback, None if kinds is None else set(kinds)))
+
+    def unsubscribe(self, callback):
+        self.subscribers = [(subscriber, kinds) for subscriber, kinds in self.subscribers if subscriber != callback]
+
+    #
+    #   Calls the subscribers of the event, one failing subscriber does not stop the others
+    #
+    def publish(self, event):
+        for callback, kinds in list(self.subscribers):
+            if kinds is not None and event.kind not in kinds:
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                if self.log:
+                    self.log(f"ERROR: Change Subscriber Failed: event:{event.kind}, error:{str(e)}")
+                print(f"Error handling change event {event.kind}: {str(e)}")
+
+
+#
+#   Adapts a callback(item_ids) to the bus, for the indexes that only need to know which items to re-read:
+#   item_ids is None when the whole table may have changed (ex. a field was added)
+#
+class ItemChangeListener:
+    def __init__(self, callback):
+        self.callback = callback
+
+    def __call__(self, event):
+        if event.kind in SCHEMA_EVENTS:
+            self.callback(None)
+        elif event.kind in ITEM_EVENTS:
+            self.callback(event.affected_ids())
+
+    def __eq__(self, other):
+        return isinstance(other, ItemChangeListener) and self.callback == other.callback
@@ -0,0 +1,238 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from database.Rows import RowSet
+
+#   Change Log
+#
+#   Change data capture for the items and images tables: triggers append one row per inserted,
+#   updated or deleted row to the changes table (created by schema migration 7), in the same
+#   transaction as the change, whichever connection or process made it:
+#       - seq:              increasing number of the change, never reused (AUTOINCREMENT)
+#       - table_name:       table of the changed row
+#       - row_id:           rowid of the changed row
+#       - item_id:          id of the item (images: the product_id)
+#       - previous_item_id: the id before an update that changed it
+#       - operation:        "insert", "update", "delete", or "schema" when the table's columns changed
+#       - changed_columns:  comma separated columns whose values changed (updates only)
+#       - changed_at:       unix time in seconds
+#
+#   A consumer keeps the last seq it has applied and asks for what came after it (changes_since),
+#   ex. ColumnStore and PrefixIndex catch up on changes made by other processes this way. They hear
+#   about their own process's changes right away (see ChangeEvents), so they only look at the log
+#   every FOLLOW_INTERVAL seconds (see FollowTimer) instead of before every query.
+#   compact() deletes old changes; a consumer that is further behind than the oldest kept change
+#   gets ChangesCompacted and has to re-read the table.
+#
+#   Triggers name the table's columns, so they are recreated whenever a field is added or removed
+#   (install, suspended). Updates that do not change any value are not recorded.
+#
+
+# Changes kept by compact() when no seq is given
+DEFAULT_KEEP = 100000
+
+# Seconds between two looks at the change log by the in-memory indexes
+FOLLOW_INTERVAL = 1.0
+
+# Columns of changes_since() results
+CHANGE_COLUMNS = ["seq", "table_name", "row_id", "item_id", "previous_item_id", "operation", "changed_columns", "changed_at"]
+
+
+class ChangesCompacted(ValueError):
+    pass
+
+
+#
+#   Tells a consumer when it is time to look at the change log again
+#       - interval 0 looks every time (ex. tests that change the database from another connection)
+#
+class FollowTimer:
+    def __init__(self, interval=FOLLOW_INTERVAL):
+        self.interval = interval
+        self.last = None
+
+    def due(self):
+        now = time.monotonic()
+        if self.last is not None and now - self.last < self.interval:
+            return False
+        self.last = now
+        return True
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+#
+#   Creates the changes table (does not commit)
+#
+def create_changes_table(conn, tables):
+    changes = tables["changes"]
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {changes} (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER,
+            item_id TEXT,
+            previous_item_id TEXT,
+            operation TEXT NOT NULL,
+            changed_columns TEXT,
+            changed_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+
+
+#
+#   Returns [(trigger name, CREATE TRIGGER statement), ...] recording the changes of one table
+#       - key: the column that identifies the item (id for items, product_id for images)
+#
+def trigger_statements(conn, table, changes, key):
+    columns = [column[1] for column in conn.execute(f"PRAGMA table_info({quote(table)})").fetchall()]
+    if not columns:
+        return []
+    new_key = f"NEW.{quote(key)}" if key in columns else "NULL"
+    old_key = f"OLD.{quote(key)}" if key in columns else "NULL"
+    previous_key = f"CASE WHEN {old_key} IS NOT {new_key} THEN {old_key} END"
+    insert = f"INSERT INTO {changes} (table_name, row_id, item_id, previous_item_id, operation, changed_columns)"
+    # Names of the columns whose values differ, ex. "name,price"
+    changed = " || ".join(f"CASE WHEN OLD.{quote(column)} IS NOT NEW.{quote(column)} THEN '{column},' ELSE '' END" for column in columns)
+    return [
+        (f"{table}_changes_insert",
+         f"CREATE TRIGGER {quote(table + '_changes_insert')} AFTER INSERT ON {quote(table)} BEGIN "
+         f"{insert} VALUES ('{table}', NEW.rowid, {new_key}, NULL, 'insert', NULL); END"),
+        (f"{table}_changes_update",
+         f"CREATE TRIGGER {quote(table + '_changes_update')} AFTER UPDATE ON {quote(table)} BEGIN "
+         f"{insert} SELECT '{table}', NEW.rowid, {new_key}, {previous_key}, 'update', rtrim(changed, ',') "
+         f"FROM (SELECT {changed} AS changed) WHERE changed <> ''; END"),
+        (f"{table}_changes_delete",
+         f"CREATE TRIGGER {quote(table + '_changes_delete')} AFTER DELETE ON {quote(table)} BEGIN "
+         f"{insert} VALUES ('{table}', OLD.rowid, {old_key}, NULL, 'delete', NULL); END"),
+    ]
+
+
+#
+#   (Re)creates the change triggers of the items and images tables for their current columns (does not commit)
+#
+def install_change_triggers(conn, tables):
+    for table, key in ((tables["items"], "id"), (tables["images"], "product_id")):
+        drop_change_triggers(conn, table)
+        for _, sql in trigger_statements(conn, table, tables["changes"], key):
+            conn.execute(sql)
+
+
+def drop_change_triggers(conn, table):
+    for operation in ("insert", "update", "delete"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {quote(f'{table}_changes_{operation}')}")
+
+
+class ChangeLog:
+    def __init__(self, database):
+        self.database = database
+        self.tables = {"items": database.items_table, "images": database.images_table, "changes": database.changes_table}
+
+    #
+    #   Recreates the triggers after the columns of the items table changed and records a "schema"
+    #   change, so consumers re-read the table (inside the caller's write transaction)
+    #
+    def install(self, cursor):
+        install_change_triggers(cursor.connection, self.tables)
+        cursor.execute(f"INSERT INTO {self.tables['changes']} (table_name, operation) VALUES (?, 'schema')", (self.tables["items"],))
+
+    #
+    #   Drops the item triggers while the items table is rebuilt or rewritten, then installs them again:
+    #       with change_log.suspended():
+    #           ...
+    #   Row changes in between are not recorded one by one, the "schema" change stands for them.
+    #   The block is a transaction (nested in the caller's), a failure restores the old triggers with it.
+    #
+    @contextmanager
+    def suspended(self):
+        with self.database.transaction():
+            drop_change_triggers(self.database.conn, self.tables["items"])
+            yield
+            self.install(self.database.cursor)
+
+    #
+    #   Returns the seq of the latest change, 0 if nothing was ever recorded
+    #
+    def latest(self, cursor=None):
+        cursor = cursor or self.database.read_cursor()
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (self.tables["changes"],))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+    #
+    #   Returns the changes after seq in order as a RowSet (see CHANGE_COLUMNS)
+    #       - table: only the changes of this table
+    #       - Raises ChangesCompacted when changes after seq have already been deleted by compact()
+    #
+    def changes_since(self, seq=0, limit=None, table=None):
+        cursor = self.database.read_cursor()
+        seq = int(seq or 0)
+        sql = f"SELECT {', '.join(CHANGE_COLUMNS)} FROM {self.tables['changes']} WHERE seq > ?"
+        params = [seq]
+        if table is not None:
+            sql += " AND table_name = ?"
+            params.append(table)
+        sql += " ORDER BY seq"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        # The rows and the compaction check read the same snapshot of the log
+        own_transaction = not cursor.connection.in_transaction
+        if own_transaction:
+            cursor.execute("BEGIN")
+        try:
+            cursor.execute(sql, params)
+            rows = RowSet.from_cursor(cursor)
+
+            # seq values have no gaps, so the first kept change tells if any were deleted after seq
+            cursor.execute(f"SELECT MIN(seq) FROM {self.tables['changes']}")
+            oldest = cursor.fetchone()[0]
+            if oldest is None:
+                oldest = self.latest(cursor) + 1
+        finally:
+            if own_transaction:
+                cursor.execute("COMMIT")
+        if seq + 1 < oldest:
+            raise ChangesCompacted(f"Changes after {seq} were compacted (oldest kept change: {oldest})")
+        return rows
+
+    #
+    #   Tells a consumer's callback(item_ids) what changed in the items table after seq and returns the
+    #   seq to continue from; item_ids is None when everything has to be re-read (schema changes or compaction)
+    #
+    def follow(self, seq, callback):
+        try:
+            rows = self.changes_since(seq, table=self.tables["items"])
+        except ChangesCompacted:
+            callback(None)
+            return self.latest()
+        except sqlite3.OperationalError:
+            # The database has no change log yet
+            return seq
+        if not rows:
+            return seq
+        operations = rows.column("operation")
+        if "schema" in operations:
+            callback(None)
+        else:
+            item_ids = set(rows.column("item_id")) | set(rows.column("previous_item_id"))
+            item_ids.discard(None)
+            callback(sorted(item_ids))
+        return rows.column("seq")[-1]
+
+    #
+    #   Deletes the changes up to and including seq, or all but the newest keep changes
+    #       - Returns the number of deleted changes
+    #
+    def compact(self, through=None, keep=DEFAULT_KEEP):
+        with self.database.transaction():
+            if through is None:
+                through = self.latest(self.database.cursor) - keep
+            self.database.cursor.execute(f"DELETE FROM {self.tables['changes']} WHERE seq <= ?", (int(through),))
+            deleted = self.database.cursor.rowcount
+        if deleted:
+            self.database.log_message(f"Change Log Compacted: through:{through}, deleted:{deleted}")
+        return deleted
@@ -0,0 +1,373 @@
+import threading
+import numpy as np
+import pandas as pd
+from database.ChangeLog import FollowTimer
+from database.ItemQuery import FILTER_OPERATORS, parse_condition
+
+#   ColumnStore Class
+#
+#   An in-memory, column by column copy of the items table for the dashboard and the search box:
+#       - Numeric columns (INTEGER / REAL) are float64 arrays, NULL and non-numeric values are NaN
+#       - Every other column is dictionary encoded: an int32 array of codes into a list of the
+#         distinct values (-1 for NULL), so comparisons run on integers and text searches only
+#         look at each distinct value once
+#       - Filters use the ItemQuery syntax ({column: value} or {column: (operator, value)}) plus
+#         "contains" (case-insensitive text search), and are evaluated with NumPy over whole columns
+#
+#   The snapshot follows the changes of this process: DatabaseSystem reports the ids it changed
+#   after every commit (see DatabaseSystem.add_change_listener) and the store re-reads only those rows
+#   before its next query. Schema changes and clearing the database trigger a full reload.
+#   Changes made by other processes are read from the change log (see ChangeLog) before a query,
+#   at most every FOLLOW_INTERVAL seconds.
+#   Item ids are not unique, rows are told apart by their rowid.
+#
+
+# Declared column types stored as numbers
+NUMERIC_TYPES = ("INT", "REAL", "FLOA", "DOUB", "NUM")
+
+
+class ColumnStore:
+    def __init__(self, database):
+        self.database = database
+        self.lock = threading.RLock()
+        # Ids reported as changed since the last query (None after a schema change: reload everything)
+        self.pending = set()
+        self.needs_reload = True
+        # Moves on with every reported change, results of an older version may be out of date
+        self.version = 0
+        # Last change log entry applied to the snapshot
+        self.change_seq = 0
+        self.follow_timer = FollowTimer()
+
+        self.columns = []
+        self.numeric = {}
+        self.codes = {}
+        self.categories = {}
+        self.category_codes = {}
+        # Lowercase text of the distinct values, for "contains" searches
+        self.search_text = {}
+        # Id and rowid of every position, {rowid: position} and {id: {positions}} of the rows that exist
+        self.ids = []
+        self.rowids = []
+        self.positions = {}
+        self.item_positions = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.size = 0
+
+    #
+    #   Change listener registered with DatabaseSystem, item_ids None means everything may have changed
+    #
+    def items_changed(self, item_ids=None):
+        with self.lock:
+            self.version += 1
+            if item_ids is None:
+                self.needs_reload = True
+                self.pending = set()
+            elif not self.needs_reload:
+                self.pending.update(str(item_id) for item_id in item_ids)
+
+    #
+    #   Applies the changes reported since the last call (called before every query)
+    #
+    def refresh(self):
+        with self.lock:
+            if not self.needs_reload and self.follow_timer.due():
+                self.change_seq = self.database.change_log.follow(self.change_seq, self.items_changed)
+            if self.needs_reload:
+                self.reload()
+            elif self.pending:
+                pending, self.pending = self.pending, set()
+                self.apply_rows(pending, self.database.fetch_products_by_id(list(pending), with_rowid=True))
+
+    #
+    #   Rebuilds the whole snapshot from the items table
+    #
+    def reload(self):
+        with self.lock:
+            cursor = self.database.read_cursor()
+            # Changes logged while reading are applied again by the next refresh, which is harmless
+            self.change_seq = self.database.change_log.latest(cursor)
+            cursor.execute(f"PRAGMA table_info({self.database.items_table})")
+            column_types = {column[1]: (column[2] or "").upper() for column in cursor.fetchall()}
+            # Dictionary encoded fields store INTEGER codes but hold text
+            encoded = self.database.dictionaries.fields(cursor)
+            rows = self.database.fetch_all_items(with_rowid=True)
+            columns = rows.columns[1:]
+            df = rows.to_dataframe()
+            rowids = df.pop("rowid")
+
+            self.columns = columns
+            self.numeric, self.codes, self.categories, self.category_codes, self.search_text = {}, {}, {}, {}, {}
+            for column in columns:
+                if column not in encoded and column_types.get(column, "").startswith(NUMERIC_TYPES):
+                    self.numeric[column] = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+                else:
+                    codes, uniques = pd.factorize(df[column], use_na_sentinel=True)
+                    self.codes[column] = codes.astype(np.int32)
+                    self.set_categories(column, list(uniques))
+
+            self.ids = [str(item_id) for item_id in df["id"]] if "id" in df.columns else [str(i) for i in range(len(df))]
+            self.rowids = [int(rowid) for rowid in rowids]
+            self.positions = {rowid: position for position, rowid in enumerate(self.rowids)}
+            self.item_positions = {}
+            for position, item_id in enumerate(self.ids):
+                self.item_positions.setdefault(item_id, set()).add(position)
+            self.size = len(df)
+            self.alive = np.ones(self.size, dtype=bool)
+            self.needs_reload = False
+            self.pending = set()
+
+    def set_categories(self, column, values):
+        self.categories[column] = values
+        self.category_codes[column] = {value: code for code, value in enumerate(values)}
+        self.search_text[column] = [str(value).lower() for value in values]
+
+    #
+    #   Returns the code of a value, adding it to the column's dictionary if needed
+    #
+    def encode(self, column, value):
+        if value is None:
+            return -1
+        code = self.category_codes[column].get(value)
+        if code is None:
+            code = len(self.categories[column])
+            self.categories[column].append(value)
+            self.category_codes[column][value] = code
+            self.search_text[column].append(str(value).lower())
+        return code
+
+    #
+    #   Writes the re-read rows of the changed items into the arrays (rows start with their rowid):
+    #   updates in place, appends new rows, drops the rows of the items that were not read back
+    #
+    def apply_rows(self, item_ids, rows):
+        if rows.columns[1:] != self.columns:
+            # A column was added or removed without a schema notification
+            self.reload()
+            return
+
+        id_index = rows.index["id"]
+        seen = set()
+        appended = []
+        for row in rows:
+            position = self.positions.get(row[0])
+            if position is None:
+                appended.append(row)
+                continue
+            seen.add(position)
+            self.set_id(position, str(row[id_index]))
+            self.write_row(position, row[1:])
+
+        for item_id in item_ids:
+            for position in self.item_positions.get(str(item_id), set()) - seen:
+                self.remove_row(position)
+
+        if appended:
+            self.grow(len(appended))
+            for row in appended:
+                position = self.size
+                self.size += 1
+                self.ids.append(str(row[id_index]))
+                self.rowids.append(row[0])
+                self.positions[row[0]] = position
+                self.item_positions.setdefault(self.ids[-1], set()).add(position)
+                self.write_row(position, row[1:])
+                self.alive[position] = True
+
+    #
+    #   Moves a row to another id (an update that changed the item's id)
+    #
+    def set_id(self, position, item_id):
+        previous = self.ids[position]
+        if previous == item_id:
+            return
+        self.discard_position(previous, position)
+        self.ids[position] = item_id
+        self.item_positions.setdefault(item_id, set()).add(position)
+
+    def remove_row(self, position):
+        self.alive[position] = False
+        self.positions.pop(self.rowids[position], None)
+        self.discard_position(self.ids[position], position)
+
+    def discard_position(self, item_id, position):
+        positions = self.item_positions.get(item_id)
+        if positions is not None:
+            positions.discard(position)
+            if not positions:
+                del self.item_positions[item_id]
+
+    def write_row(self, position, row):
+        for column, value in zip(self.columns, row):
+            if column in self.numeric:
+                try:
+                    self.numeric[column][position] = np.nan if value is None or value == "" else float(value)
+                except (TypeError, ValueError):
+                    self.numeric[column][position] = np.nan
+            else:
+                self.codes[column][position] = self.encode(column, value)
+
+    #
+    #   Makes room for count more rows (capacity doubles so appends stay cheap)
+    #
+    def grow(self, count):
+        capacity = len(self.alive)
+        if self.size + count <= capacity:
+            return
+        capacity = max(self.size + count, capacity * 2, 64)
+        extra = capacity - len(self.alive)
+        self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+        for column in self.numeric:
+            self.numeric[column] = np.concatenate([self.numeric[column], np.full(extra, np.nan)])
+        for column in self.codes:
+            self.codes[column] = np.concatenate([self.codes[column], np.full(extra, -1, dtype=np.int32)])
+
+    #
+    #   Returns a boolean array of the rows matching every filter
+    #
+    def mask(self, filters=None):
+        self.refresh()
+        with self.lock:
+            mask = self.alive[:self.size].copy()
+            for column, condition in (filters or {}).items():
+                if column not in self.numeric and column not in self.codes:
+                    raise ValueError(f"Unknown column '{column}'")
+                operator, value = parse_condition(condition)
+                mask &= self.evaluate(column, operator, value)
+            return mask
+
+    def evaluate(self, column, operator, value):
+        if operator not in FILTER_OPERATORS and operator != "contains":
+            raise ValueError(f"Unknown filter operator '{operator}'")
+
+        if column in self.numeric:
+            values = self.numeric[column][:self.size]
+            if operator == "is null":
+                return np.isnan(values)
+            if operator == "is not null":
+                return ~np.isnan(values)
+            if operator in ("in", "not in"):
+                matches = np.isin(values, np.array([float(item) for item in value], dtype=np.float64))
+                return matches if operator == "in" else ~matches & ~np.isnan(values)
+            if operator == "range":
+                low, high = value
+                matches = ~np.isnan(values)
+                if low is not None:
+                    matches &= values >= float(low)
+                if high is not None:
+                    matches &= values < float(high)
+                return matches
+            if operator in ("contains", "like"):
+                return self.contains(column, value)
+            value = float(value)
+            return {"=": values == value, "!=": values != value, "<": values < value, "<=": values <= value,
+                    ">": values > value, ">=": values >= value}[operator]
+
+        codes = self.codes[column][:self.size]
+        if operator == "is null":
+            return codes == -1
+        if operator == "is not null":
+            return codes != -1
+        if operator in ("=", "!="):
+            code = self.category_codes[column].get(value, -2)
+            return codes == code if operator == "=" else (codes != code) & (codes != -1)
+        if operator in ("in", "not in"):
+            wanted = [self.category_codes[column][item] for item in value if item in self.category_codes[column]]
+            matches = np.isin(codes, np.array(wanted, dtype=np.int32))
+            return matches if operator == "in" else ~matches & (codes != -1)
+        if operator == "range":
+            raise ValueError(f"Range filters need a numeric column, '{column}' is not")
+        if operator in ("contains", "like"):
+            return self.contains(column, value)
+        # Ordering comparisons on text: evaluated on the distinct values
+        compare = {"<": lambda item: item < value, "<=": lambda item: item <= value,
+                   ">": lambda item: item > value, ">=": lambda item: item >= value}[operator]
+        wanted = [code for code, item in enumerate(self.categories[column]) if isinstance(item, str) and compare(item)]
+        return np.isin(codes, np.array(wanted, dtype=np.int32))
+
+    #
+    #   Case-insensitive text search of one column, returns a boolean array over the rows
+    #       - positions limits the search to these rows (the array is then over positions)
+    #       - Each distinct value is only looked at once, numbers as the table shows them
+    #
+    def contains(self, column, value, positions=None):
+        text = str(value).lower().strip("%")
+        if column in self.numeric:
+            values = self.numeric[column][:self.size] if positions is None else self.numeric[column][positions]
+            distinct = np.unique(values[~np.isnan(values)])
+            found = [number for number in distinct if text in format_number(number).lower()]
+            return np.isin(values, np.array(found, dtype=np.float64))
+
+        searchable = self.search_text[column]
+        if positions is None:
+            codes = self.codes[column][:self.size]
+            candidates = range(len(searchable))
+        else:
+            codes = self.codes[column][positions]
+            candidates = np.unique(codes[codes >= 0])
+        wanted = [code for code in candidates if text in searchable[code]]
+        return np.isin(codes, np.array(wanted, dtype=np.int32))
+
+    #
+    #   Returns the ids of the matching items (in table order)
+    #
+    def ids_where(self, filters=None):
+        mask = self.mask(filters)
+        with self.lock:
+            return [self.ids[position] for position in np.flatnonzero(mask)]
+
+    #
+    #   Returns the ids of the items containing text in any of the columns (case-insensitive)
+    #   that also match the filters
+    #       - within: only these items are searched, ex. the results of a shorter search that the
+    #         text extends, which only looks at their values instead of every distinct value
+    #
+    def search(self, columns, text, filters=None, within=None):
+        mask = self.mask(filters)
+        with self.lock:
+            positions = None
+            if within is not None:
+                positions = np.array(sorted({position for item_id in within for position in self.item_positions.get(item_id, ())}), dtype=np.intp)
+                positions = positions[mask[positions]]
+            found = np.zeros(self.size if positions is None else len(positions), dtype=bool)
+            for column in columns:
+                if column in self.numeric or column in self.codes:
+                    found |= self.contains(column, text, positions)
+            rows = np.flatnonzero(mask & found) if positions is None else positions[found]
+            return [self.ids[position] for position in rows]
+
+    def count(self, filters=None):
+        return int(self.mask(filters).sum())
+
+    #
+    #   Returns the values of a numeric column for the matching items
+    #       - Without filters and deleted rows the array itself is used, no copy is made
+    #
+    def selected(self, column, filters=None):
+        mask = self.mask(filters)
+        values = self.numeric[column][:self.size]
+        return values if mask.all() else values[mask]
+
+    #
+    #   Sum of a numeric column over the matching items (NULLs count as 0)
+    #
+    def sum(self, column, filters=None):
+        with self.lock:
+            return float(np.nansum(self.selected(column, filters)))
+
+    #
+    #   Sum of price * quantity over the matching items
+    #
+    def total_value(self, price="price", quantity="quantity", filters=None):
+        with self.lock:
+            self.refresh()
+            if price not in self.numeric or quantity not in self.numeric:
+                return 0.0
+            return float(np.nansum(self.selected(price, filters) * self.selected(quantity, filters)))
+
+
+#
+#   Formats a stored number like the inventory table shows it (5.0 -> "5")
+#
+def format_number(number):
+    return str(int(number)) if float(number).is_integer() else str(number)
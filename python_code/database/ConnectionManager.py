@@ -0,0 +1,228 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from database.StorageProfiles import DEFAULT_STORAGE_PROFILE, get_storage_profile
+
+#   ConnectionManager Class
+#
+#   Hands out the SQLite connections of one database file:
+#       - A single writer connection, serialized by a re-entrant lock. Writes (and reads that must
+#         see a transaction's own uncommitted changes) use it while holding the lock
+#       - One read-only connection per thread (PRAGMA query_only), so background readers such as
+#         searches or the AI assistant do not wait on the writer
+#
+#   Every connection is configured by a storage profile (see StorageProfiles). The profiles use WAL
+#   journaling so readers keep reading the last committed data while a write is in progress, and
+#   can be switched at runtime (ex. bulk-load during an import). A background thread checkpoints
+#   the WAL every checkpoint_interval seconds of the active profile.
+#   Every connection waits up to busy_timeout milliseconds for a lock held by another process
+#   instead of failing immediately.
+#   In-memory databases cannot be shared between connections, so readers fall back to the writer.
+#
+#   stats() reports how often and how long threads waited for the writer.
+#
+
+# Milliseconds a connection waits for a lock held by another connection
+DEFAULT_BUSY_TIMEOUT = 5000
+
+
+class ConnectionManager:
+    def __init__(self, path, busy_timeout=DEFAULT_BUSY_TIMEOUT, profile=DEFAULT_STORAGE_PROFILE):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.in_memory = path == ":memory:" or "mode=memory" in str(path)
+        self.profile = get_storage_profile(profile)
+        # Readers re-apply the profile when this changes
+        self.profile_version = 0
+
+        self.writer = self.connect()
+        self.journal_mode = None
+        self.set_journal_mode(self.profile.journal_mode)
+
+        self.write_lock = threading.RLock()
+        # Thread currently holding the writer and how many times it acquired it
+        self.owner = None
+        self.depth = 0
+
+        self.local = threading.local()
+        self.readers = []
+        self.readers_lock = threading.Lock()
+
+        # Lock wait statistics
+        self.write_acquisitions = 0
+        self.write_waits = 0
+        self.write_wait_seconds = 0.0
+        self.max_write_wait = 0.0
+        self.checkpoints = 0
+
+        self.closing = threading.Event()
+        self.checkpointer = None
+        if not self.in_memory:
+            self.checkpointer = threading.Thread(target=self.run_checkpoints, name="WalCheckpointer", daemon=True)
+            self.checkpointer.start()
+
+    def connect(self, read_only=False):
+        # Connections are only used by one thread at a time, but may be closed from another one
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        self.profile.apply(conn)
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def set_journal_mode(self, journal_mode):
+        if self.in_memory:
+            return
+        self.journal_mode = self.writer.execute(f"PRAGMA journal_mode = {journal_mode}").fetchone()[0]
+
+    #
+    #   Returns the read-only connection of the calling thread (created on first use)
+    #
+    def reader(self):
+        if self.in_memory:
+            return self.writer
+        conn = getattr(self.local, "reader", None)
+        if conn is None:
+            conn = self.connect(read_only=True)
+            self.local.reader = conn
+            self.local.profile_version = self.profile_version
+            with self.readers_lock:
+                self.readers.append(conn)
+        elif self.local.profile_version != self.profile_version:
+            # The profile was switched since this thread's last read
+            self.profile.apply(conn)
+            self.local.profile_version = self.profile_version
+        return conn
+
+    #
+    #   Switches every connection to another storage profile, returns the previous one
+    #       - The writer changes immediately, readers change before their next query
+    #       - Leaving a profile that does not sync (bulk-load) checkpoints the WAL into the database
+    #
+    def set_profile(self, profile):
+        profile = get_storage_profile(profile)
+        with self.write():
+            previous = self.profile
+            self.profile = profile
+            self.profile_version += 1
+            profile.apply(self.writer)
+            if profile.journal_mode.lower() != str(self.journal_mode).lower():
+                self.set_journal_mode(profile.journal_mode)
+            if previous.synchronous == "OFF" and profile.synchronous != "OFF":
+                self.checkpoint("TRUNCATE")
+        return previous
+
+    #
+    #   with manager.use_profile("bulk-load"): ... switches profile for the block only
+    #
+    @contextmanager
+    def use_profile(self, profile):
+        previous = self.set_profile(profile)
+        try:
+            yield self.profile
+        finally:
+            self.set_profile(previous)
+
+    #
+    #   Copies the WAL back into the database file, returns (busy, wal pages, pages checkpointed)
+    #
+    def checkpoint(self, mode="PASSIVE"):
+        if self.in_memory:
+            return None
+        with self.write():
+            # A checkpoint cannot run inside an open transaction of the same connection
+            if self.writer.in_transaction:
+                return None
+            result = self.writer.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            self.checkpoints += 1
+            return result
+
+    #
+    #   Background checkpoints use their own connection, so they never wait on the writer lock
+    #
+    def run_checkpoints(self):
+        conn = None
+        try:
+            while True:
+                interval = self.profile.checkpoint_interval
+                if self.closing.wait(interval if interval else 1.0):
+                    return
+                if not interval:
+                    continue
+                try:
+                    if conn is None:
+                        conn = self.connect()
+                    conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                    self.checkpoints += 1
+                except sqlite3.Error:
+                    # Busy, the next interval tries again
+                    pass
+        finally:
+            if conn is not None:
+                conn.close()
+
+    #
+    #   Takes the writer lock (re-entrant) and returns the writer connection
+    #
+    def acquire_writer(self):
+        waited = 0.0
+        if not self.write_lock.acquire(blocking=False):
+            started = time.perf_counter()
+            self.write_lock.acquire()
+            waited = time.perf_counter() - started
+
+        self.owner = threading.get_ident()
+        self.depth += 1
+        if self.depth == 1:
+            self.write_acquisitions += 1
+            if waited:
+                self.write_waits += 1
+                self.write_wait_seconds += waited
+                self.max_write_wait = max(self.max_write_wait, waited)
+        return self.writer
+
+    def release_writer(self):
+        self.depth -= 1
+        if self.depth == 0:
+            self.owner = None
+        self.write_lock.release()
+
+    #
+    #   Returns True if the calling thread currently holds the writer
+    #
+    def holds_writer(self):
+        return self.owner == threading.get_ident()
+
+    #
+    #   with manager.write() as conn: ... runs with exclusive use of the writer connection
+    #
+    @contextmanager
+    def write(self):
+        conn = self.acquire_writer()
+        try:
+            yield conn
+        finally:
+            self.release_writer()
+
+    def stats(self):
+        return {
+            "profile": self.profile.name,
+            "journal_mode": self.journal_mode,
+            "checkpoints": self.checkpoints,
+            "readers": len(self.readers),
+            "write_acquisitions": self.write_acquisitions,
+            "write_waits": self.write_waits,
+            "write_wait_seconds": self.write_wait_seconds,
+            "max_write_wait_seconds": self.max_write_wait,
+        }
+
+    def close(self):
+        self.closing.set()
+        if self.checkpointer is not None and self.checkpointer is not threading.current_thread():
+            self.checkpointer.join()
+        with self.readers_lock:
+            for conn in self.readers:
+                conn.close()
+            self.readers = []
+        self.writer.close()
@@ -1,707 +1,1687 @@
-import pandas as pd
-import json
-from PyQt6.QtWidgets import QMessageBox, QInputDialog, QWidget, QLineEdit
-from datetime import datetime
-from ui import *
-import sqlite3
-import os
-
-#   InventorySystem Class
-#
-#   This class is for handling operations of a database
-#
-
-class DatabaseSystem:
-    def __init__(self, name: str, file: str):
-        # Define name of databse instance
-        self.name = name
-        
-        self.ui = None  # Initialize UI later
-        
-        # Define SQLite database file name and table names for reference
-        self.db = file
-        self.items_table = "products"
-        self.images_table = "images"
-        self.fields_table = "fields"
-        self.login_table = "login"
-        
-        # We get the log file in append mode
-        self.log_file = self.getLogFile(name, ".txt")
-        
-        self.username = ""
-        self.password = ""
-        self.logged_in = False
-        
-        # Create/Connect SQLite3 Database "products" (and table)
-        self.conn = sqlite3.connect(self.db)
-        self.cursor = self.conn.cursor()
-        
-        # Check if main table 'product' exists & Create 'products table if it does not exist'
-        products_exists = self.table_exists(self.items_table)
-        if not products_exists:
-            self.create_fields_table()
-            self.create_products_table()
-            self.create_images_table()
-            self.create_login_table()
-    
-    #
-    #   This function returns the log file for the database in append mode
-    #       - Will create a new file if it does not exist
-    #
-    def getLogFile(self, name: str, type: str):
-        log_file_path = f"{name}{type}"
-        # Ensure file exists before opening
-        if not os.path.exists(log_file_path):
-            with open(log_file_path, 'w') as file:
-                file.write("")  # Create an empty file
-        
-        # Open file in append mode and return the file object
-        return open(log_file_path, 'a')
-    
-    #
-    #   This function writes a message to the log file
-    # 
-    def log_message(self, message: str):
-        # Create the time of the message
-        timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        
-        self.log_file.write(f"{timestamp} {message}\n")
-        self.log_file.flush()
-            
-    
-    
-    def set_ui(self, ui):
-        self.ui = ui
-        
-    #
-    #   This function returns a boolean value for whether a given table exists in the database
-    #
-    def table_exists(self, table_name):
-        # Check if the 'products' table exists. Return True if it does, False otherwise.
-        self.cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}';")
-        table_exists = self.cursor.fetchone()
-        return bool(table_exists)  # True if table exists, False otherwise
-    
-    
-    
-    #
-    # Creates the default table for fields (only called if products table does not exist)
-    #
-    def create_fields_table(self):
-        # Creates a new table (if it doesn't already exist) for input fields
-        self.cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS {self.fields_table} (
-                field_name TEXT PRIMARY KEY,
-                entry_type TEXT CHECK(entry_type IN ('small_box', 'large_box', 'image_box')),
-                validation_type TEXT CHECK(validation_type IN ('string', 'int', 'float')),
-                required INTEGER CHECK(required IN (0, 1))
-            )
-        ''')
-        self.conn.commit()
-        
-        # Define the default input fields
-        default_fields = [
-            ('id', 'small_box', 'string', 1),
-            ('name', 'small_box', 'string', 1),
-            ('quantity', 'small_box', 'int', 1),
-            ('price', 'small_box', 'float', 1),
-            ('category', 'small_box', 'string', 1),
-            ('brand', 'small_box', 'string', 1),
-            ('description', 'large_box', 'string', 0),
-            # ('images', 'image_box', 'string', 0)
-        ]
-        # Insert the default input fields into the database's field table
-        self.cursor.executemany(f"INSERT OR IGNORE INTO {self.fields_table} VALUES (?, ?, ?, ?)", default_fields)
-        self.conn.commit()
-    
-    
-    #
-    #   This function creates the login table which holds:
-    #       - username
-    #       - password
-    #       - login required for performing database operations
-    #
-    def create_login_table(self):
-        # Create the login table if it doesn't already exist
-        self.cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS {self.login_table} (
-                username TEXT PRIMARY KEY,
-                password TEXT NOT NULL,
-                requires_login INTEGER CHECK(requires_login IN (0, 1)) NOT NULL
-            )
-        ''')
-        self.conn.commit()
-        
-        # Insert default login credentials if the table is empty
-        self.cursor.execute(f"SELECT COUNT(*) FROM {self.login_table}")
-        if self.cursor.fetchone()[0] == 0:
-            default_login = ("", "", 0)  # Default username, password, and requires_login flag
-            self.cursor.execute(f"INSERT INTO {self.login_table} VALUES (?, ?, ?)", default_login)
-            self.conn.commit()
-    
-    
-    #
-    #   Returns whether logging in is required to perform database actions
-    #
-    def login_required(self):
-        try:
-            # Get login required value
-            self.cursor.execute(f"SELECT requires_login FROM {self.login_table} LIMIT 1")
-            result = self.cursor.fetchone()
-
-            # Return true if the result is valid and login is set to required
-            if result and result[0] == 1:
-                return True
-            return False
-        except Exception as e:
-            self.log_message(f"Error checking login requirement: {str(e)}")
-            return False
-    
-    #
-    #   Returns whether account exists
-    #
-    def account_exists(self):
-        try:
-            # Query the login table for any non-empty username and password
-            self.cursor.execute(f"SELECT username, password FROM {self.login_table} WHERE username != '' AND password != '' LIMIT 1")
-            result = self.cursor.fetchone()
-
-            # Return True if a valid account exists
-            return bool(result)
-        except Exception as e:
-            self.log_message(f"Error checking account existence: {str(e)}")
-            return False
-        # try:
-        #     # Query the login table for any non-empty username and password
-        #     self.cursor.execute(f"SELECT username, password FROM {self.login_table} LIMIT 1")
-        #     result = self.cursor.fetchone()
-
-        #     # Check if username and password are not empty
-        #     if result and result[0] and result[1]:
-        #         return True
-        #     return False
-        # except Exception as e:
-        #     self.log_message(f"Error checking account existence: {str(e)}")
-        #     return False
-    
-    #
-    #   Modifies account credentials if the old credentials match
-    #
-    def set_account_credentials(self, newUsername, newPassword, login_required):
-        try:
-            # Get password from the login table
-            self.cursor.execute(f"SELECT password FROM {self.login_table} WHERE username=?", (self.username,))
-            result = self.cursor.fetchone()
-
-            # If username exists and password matches the usernames stored password
-            if not result or result[0] != self.password:
-                self.log_message("Failed to update credentials: Invalid old username or password.")
-                return False
-
-            # Update account credentials with the new values
-            self.cursor.execute(f'''
-                UPDATE {self.login_table}
-                SET username=?, password=?, requires_login=?
-                WHERE username=?
-            ''', (newUsername, newPassword, login_required, self.username))
-            self.conn.commit()
-
-            self.log_message(f"Account credentials updated successfully: New username '{newUsername}'.")
-            return True
-        except Exception as e:
-            self.log_message(f"Error updating account credentials: {str(e)}")
-            return False
-        
-        
-    #
-    #   Attempts to log in the user using credentials
-    #
-    def login(self, username, password):
-        try:
-            # Query the login table for the provided username
-            self.cursor.execute(f"SELECT password, requires_login FROM {self.login_table} WHERE username=?", (username,))
-            result = self.cursor.fetchone()
-
-            # If no user is found or login is not required
-            if not result:
-                self.log_message(f"Login failed: Username '{username}' not found.")
-                return False
-            # if result[1] == 0:  # requires_login is False
-            #     self.log_message("Login not required, access granted.")
-            #     return True
-
-            # Check if the provided password matches the stored password
-            stored_password = result[0]
-            if password == stored_password:
-                self.logged_in = True
-                self.log_message(f"LOGIN: Username '{username}'.")
-                
-                # set database username
-                self.username = username
-                self.password = password
-                
-                return True
-            else:
-                self.log_message(f"Login failed: Incorrect password for username '{username}'.")
-                return False
-        except Exception as e:
-            self.log_message(f"Login error: {str(e)}")
-            return False
-    
-    
-    
-    #
-    #   This function creates the main table of the database
-    #   The products table will hold all the inventory
-    #   The products table is created with each column corresponding to each field from the field table
-    #
-    def create_products_table(self):
-        # Gets all field names from fields table (to get columns for main table)
-        self.cursor.execute(f"SELECT field_name, validation_type FROM {self.fields_table}")
-        fields = self.cursor.fetchall()
-
-        # Associate validation type to fields
-        column_definitions = []
-        for field, field_type in fields:
-            sql_type = {"string": "TEXT", "int": "INTEGER", "float": "REAL"}[field_type]
-            column_definitions.append(f"{field} {sql_type}")
-           
-        # Add image column to the database 
-        # column_definitions.append("images TEXT")
-
-        # Create table with the new fields
-        sql = f"CREATE TABLE IF NOT EXISTS {self.items_table} ({', '.join(column_definitions)})"
-        self.cursor.execute(sql)
-        self.conn.commit()
-        
-    def create_images_table(self):
-        try:
-            self.cursor.execute(f"""
-                CREATE TABLE IF NOT EXISTS {self.images_table} (
-                    image_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    product_id INTEGER NOT NULL,
-                    image_data BLOB NOT NULL,
-                    FOREIGN KEY (product_id) REFERENCES {self.items_table}(id) ON DELETE CASCADE
-                )
-            """)
-            self.conn.commit()
-            self.log_message("Images table created successfully.")
-        except Exception as e:
-            self.log_message(f"Error creating images table: {str(e)}")
-            raise e
-        
-        
-        
-    #
-    #   This function adds a new field into the fields table
-    #   When the user adds a product to the inventory, they are prompted to fill out each field
-    #   By adding fields, we allow the user to input more information when adding a product
-    #
-    def add_to_fields_table(self, field_name, entry_type, validation_type, required):
-        
-        # Convert the required parameter to integer (0 or 1)
-        # This handles both string values ("0"/"1") and integer values (0/1)
-        if isinstance(required, str):
-            required_int = 1 if required == "1" else 0
-        else:
-            required_int = 1 if required else 0
-            
-        try:
-            # Check if field already exists in fields table
-            self.cursor.execute(f"SELECT COUNT(*) FROM {self.fields_table} WHERE field_name=?", (field_name,))
-            if self.cursor.fetchone()[0] > 0:
-                raise ValueError(f"Field '{field_name}' already exists in fields table")
-                
-            # Insert field and its info to fields table
-            self.cursor.execute(f"INSERT INTO {self.fields_table} VALUES (?, ?, ?, ?)", 
-                               (field_name, entry_type, validation_type, required_int))
-            self.conn.commit()
-            
-            # Check if the column already exists in the products table
-            self.cursor.execute(f"PRAGMA table_info({self.items_table})")
-            existing_columns = [column[1] for column in self.cursor.fetchall()]
-        
-            # If the column doesn't exist, add it to the products table
-            if field_name not in existing_columns:
-                sql_type = {"string": "TEXT", "int": "INTEGER", "float": "REAL"}[validation_type]
-                self.cursor.execute(f"ALTER TABLE {self.items_table} ADD COLUMN {field_name} {sql_type}")
-                self.conn.commit()
-            else:
-                # If column exists but not in fields table, we have a sync issue
-                raise ValueError(f"Column '{field_name}' already exists in products table but was not in fields table")
-            
-            # LOG MESSAGE
-            self.log_message(f"Field Added: field_name:{str(field_name)}, entry_type:{str(entry_type)}, validation_type:{str(validation_type)}, required:{str(required_int)}")
-            return True
-        except sqlite3.IntegrityError as e:
-            # LOG MESSAGE
-            self.log_message(f"ERROR: Field Added Attempted: field_name:{str(field_name)}, entry_type:{str(entry_type)}, validation_type:{str(validation_type)}, required:{str(required_int)}")
-            raise ValueError(f"Database integrity error: {str(e)}")
-        except Exception as e:
-            self.log_message(f"ERROR: Field Added Attempted: field_name:{str(field_name)}, entry_type:{str(entry_type)}, validation_type:{str(validation_type)}, required:{str(required_int)}")
-            raise e
-        return False
-
-    
-    
-    #
-    #   This function removes a field from the fields table
-    #   When a field is removed, the user will no longer be prompted to enter that field when adding an item to inventory
-    #
-    def remove_to_fields_table(self, field_name):
-        # This function adds field to the fields table
-        self.cursor.execute(f"DELETE FROM {self.fields_table} WHERE field_name = ?", (field_name,))
-        self.conn.commit()
-        # LOG MESSAGE
-        self.log_message(f"Field Removed: field_name:{str(field_name)}")
-    
-    
-
-    
-    #
-    #   This function:
-    #       - Retrieves product data from the UI function display_add_item()
-    #       - Inputs the products data into its categories in the database
-    #
-    def add_item_to_database(self, product_data):
-        # Fetch field names and required status from the database
-        self.cursor.execute(f"SELECT field_name, required FROM {self.fields_table}")
-        field_info = {row[0]: row[1] for row in self.cursor.fetchall()}
-        
-        print(f"Field info from database: {field_info}")
-        print(f"Product info from database: {product_data}")
-        
-        # Get all field names (except form images)
-        # fields = list(field_info.keys())
-        fields = [field for field in field_info.keys() if field != "images"]
-        
-        # Check for missing fields
-        missing_fields = [field for field in fields if field not in product_data]
-        if missing_fields:
-            print(f"Missing fields: {missing_fields}")
-            return False
-        
-        # Check for required fields with empty values
-        empty_required_fields = [field for field, required in field_info.items() 
-                                if required == 1 and field in product_data and not product_data[field]]
-        
-        if empty_required_fields:
-            print(f"Empty required fields: {empty_required_fields}")
-            return False
-    
-    
-    
-        # Prepare dynamic SQL query
-        placeholders = ", ".join(["?" for _ in fields])
-        field_names = ", ".join(fields)
-        values = tuple(product_data.get(field, "") for field in fields)
-        
-        try:
-            # Insert the product data into the products table
-            self.cursor.execute(f"INSERT INTO {self.items_table} ({field_names}) VALUES ({placeholders})", values)
-            product_id = self.cursor.lastrowid  # Get the ID of the newly inserted product
-
-            # Insert image data into the images table
-            if "images" in product_data and product_data["images"]:
-                for image_path in product_data["images"]:
-                    try:
-                        with open(image_path, "rb") as image_file:
-                            image_data = image_file.read()  # Read the image as binary data
-                            self.cursor.execute(f"INSERT INTO {self.images_table} (product_id, image_data) VALUES (?, ?)", (product_id, image_data))
-                    except Exception as e:
-                        self.log_message(f"Error reading image file '{image_path}': {str(e)}")
-                        print(f"Error reading image file '{image_path}': {str(e)}")
-
-            self.conn.commit()
-            
-            # LOG MESSAGE
-            self.log_message(f"Item Added: {product_data}")
-            return True
-        except Exception as e:
-            self.log_message(f"Error adding item to database: {str(e)}")
-            print(f"Error adding item to database: {str(e)}")
-            return False
-    
-        # # Add items to database
-        # self.cursor.execute(f"INSERT INTO {self.items_table} ({field_names}) VALUES ({placeholders})", values)
-        # self.conn.commit()
-        
-        # # LOG MESSAGE
-        # self.log_message(f"Item Added: field_name:{str(product_data)}")
-        # return True
-    
-    
-    
-    #
-    #   This function:
-    #       - Retreives the ID and count of the item to be removed
-    #       - Ensures item exists, if so decreases quantity by requested amount
-    #       - Ensures the user cannot remove more of an item than currently exists
-    #
-    def remove_item_from_database(self, item_id, item_count):
-        # Directly select the quantity column
-        self.cursor.execute(f"SELECT quantity FROM {self.items_table} WHERE id=?", (item_id,))
-        item = self.cursor.fetchone()
-
-        # If item is not found
-        if not item:
-            raise ValueError("Item not found.")
-        
-        # 'quantity' will be at index 0
-        current_quantity = item[0]
-        
-        item_count = int(item_count)
-
-        # Check if the number of items to remove exceeds the available quantity
-        if item_count > current_quantity:
-            raise ValueError("Cannot remove more items than are available in the inventory.")
-
-        # Decrease the item count by the specified amount
-        new_quantity = current_quantity - item_count
-        self.cursor.execute(f"UPDATE {self.items_table} SET quantity=? WHERE id=?", (new_quantity, item_id))
-        self.conn.commit()
-        
-        self.log_message(f"Item Removed: id:{str(item_id)}, count:{str(item_count)}")
-        
-    #
-    #   Returns all images for a product specified by its ID in the form of a list of binary data
-    #
-    def get_images_for_product(self, product_id):
-        try:
-            self.cursor.execute(f"SELECT image_data FROM {self.images_table} WHERE product_id = ?", (product_id,))
-            images = self.cursor.fetchall()
-            return [image[0] for image in images]  # Return a list of binary image data
-        except Exception as e:
-            self.log_message(f"Error retrieving images for product_id {product_id}: {str(e)}")
-            raise e
-    #
-    #   Removes an image from a product specified by its ID, and matching image data. Does not return status of whether the image was or wasn't found
-    #
-    def remove_image(self, product_id, image_data):
-        try:
-            self.cursor.execute(f"DELETE FROM {self.images_table} WHERE product_id = ? AND image_data = ?", (product_id, image_data))
-            self.conn.commit()
-            self.log_message(f"Image removed for product_id {product_id}")
-        except Exception as e:
-            self.log_message(f"Error removing image for product_id {product_id}: {str(e)}")
-            raise e
-    
-    #
-    #   Adds an image to a product specified by its ID
-    #
-    def add_image_to_product(self, product_id, image_data):
-        try:
-            self.cursor.execute(f"INSERT INTO {self.images_table} (product_id, image_data) VALUES (?, ?)", (product_id, image_data))
-            self.conn.commit()
-            self.log_message(f"Image added for product_id {product_id}")
-        except Exception as e:
-            self.log_message(f"Error adding image for product_id {product_id}: {str(e)}")
-            raise e
-        
-    #
-    #   Returns all items as a dataframe
-    #
-    def get_all_items(self):
-        # Execute query to select all records from the products table
-        self.cursor.execute(f"SELECT * FROM {self.items_table}")
-        items = self.cursor.fetchall()
-        
-        # Get column names using cursor description
-        columns = [desc[0] for desc in self.cursor.description]
-        
-        return pd.DataFrame(items, columns=columns)
-
-    #
-    #   This function searches the database for items that match the query
-    #
-    def search_items(self, fields, query):
-        # If no fields are selected, return an empty DataFrame (wiht the field columns)
-        if not fields:
-            # We select all items from the database
-            self.cursor.execute(f"SELECT * FROM {self.items_table}")
-            # Then we take only the columns
-            columns = [desc[0] for desc in self.cursor.description]
-            return pd.DataFrame(columns=columns)
-
-        # Make List for conditions and parameters
-        conditions = []
-        params = []
-        # Iterate over each column name (field)
-        for field in fields:
-            conditions.append(f"{field} LIKE ?")
-            # '%' is a wildcard, and means we can match any occurence of the query (ex. "23" in "1234")
-            params.append(f"%{query}%")
-            
-        # Make final SQL query with all conditions
-        sql = (f"SELECT * FROM {self.items_table} WHERE " + " OR ".join(conditions))
-        
-        # Execute SQL query and get results
-        self.cursor.execute(sql, params)
-        search_results = self.cursor.fetchall()
-        
-        # Return the results as a DataFrame, with the search result items, and the extracted column names
-        return pd.DataFrame(search_results, columns=[desc[0] for desc in self.cursor.description])
-        
-    def update_item(self, item_id, new_data):
-        # Create the SET query dynamically (e.g. "name=?, price=?, ...")
-        set_clause = ", ".join([f"{column}=?" for column in new_data])
-        # extract the new item data from the parameter
-        values = list(new_data.values())
-        # add the values
-        values.append(item_id)
-        
-        try:
-            # Check if the ID is being updated (so the linking images in the image table have their key updated)
-            new_id = new_data.get("id")
-            if new_id and new_id != item_id:
-                # Update the product ID in the images table first
-                self.cursor.execute(f"UPDATE {self.images_table} SET product_id=? WHERE product_id=?", (new_id, item_id))
-            
-            # Execute update statement
-            sql = f"UPDATE {self.items_table} SET {set_clause} WHERE id=?"
-            self.cursor.execute(sql, values)
-            self.conn.commit()
-            
-            # LOG MESSAGE
-            self.log_message(f"Item Modified: id:{str(item_id)}, new_data:{str(new_data)}")
-            
-            return True
-        except Exception as e:
-            print(f"Error updating item: {e}")
-            return False
-        
-        
-    #
-    #    This function returns a dataframe of the result of the list of ids it was given
-    #
-    def get_products_by_id(self, ids):
-        if not ids:
-            # if ids are empty, returns an empty dataframe
-            return pd.DataFrame(columns=[desc[0] for desc in self.cursor.description])
-
-        try:
-            # Make Placeholder
-            placeholders = ", ".join(["?"] * len(ids))
-            sql = f"SELECT * FROM {self.items_table} WHERE id IN ({placeholders})"
-            
-            self.cursor.execute(sql, ids)
-            results = self.cursor.fetchall()
-
-            # Get columns
-            columns = [desc[0] for desc in self.cursor.description]
-
-            return pd.DataFrame(results, columns=columns)
-        except Exception as e:
-            self.log_message(f"Error retrieving products by IDs: {str(e)}")
-            raise e
-        
-        
-    #
-    #   This function is temporary for testing, it simply clears the 'products' table of the database
-    #   You can also just delete the database file for a fresh start
-    #
-    def clear_database(self):
-        # Show confirmation dialog using PyQt6
-        if self.account_exists():
-            password, ok = QInputDialog.getText(
-                None, "Confirm Password", "Enter your password to clear the database:", QLineEdit.EchoMode.Password
-            )
-            if not ok:
-                return False
-
-            # Verify password
-            if password != self.password:
-                QMessageBox.critical(None, "Authentication Failed", "The password you entered is incorrect.")
-                return False
-
-
-        # Show confirmation dialog
-        confirm = QMessageBox.question(
-            None, "Confirm", "Are you sure you want to clear the database? This action will delete all inventory data and custom fields.",)
-        
-        
-        if confirm == QMessageBox.StandardButton.Yes:
-            try:
-                # Drop the products table completely instead of just deleting rows
-                self.cursor.execute(f"DROP TABLE IF EXISTS {self.items_table}")
-                self.cursor.execute(f"DROP TABLE IF EXISTS {self.images_table}")
-                
-                # Clear custom fields (but keep the built-in fields)
-                built_in_fields = ["brand", "category", "description", "id", "name", "price", "quantity"]
-                placeholders = ", ".join(["?" for _ in built_in_fields])
-                self.cursor.execute(f"DELETE FROM {self.fields_table} WHERE field_name NOT IN ({placeholders})", built_in_fields)
-                
-                # Recreate the products table with the remaining fields
-                self.create_products_table()
-                self.create_images_table()
-                
-                self.conn.commit()
-                QMessageBox.information(None, "Success", "Database cleared, all inventory data and custom fields have been deleted.")
-                # LOG MESSAGE
-                self.log_message("Database Cleared! (Items and custom fields)")
-                return True
-            except Exception as e:
-                QMessageBox.critical(None, "Error", f"Failed to clear database: {str(e)}")
-                print(f"Error clearing database: {str(e)}")
-                return False
-        return False
-
-    def remove_field_from_database(self, field_name):
-        try:
-            # check if field exists
-            self.cursor.execute(f"SELECT COUNT(*) FROM {self.fields_table} WHERE field_name=?", (field_name,))
-            if self.cursor.fetchone()[0] == 0:
-                raise ValueError(f"Field '{field_name}' does not exist")
-                
-            # Remove field from the fields table
-            self.cursor.execute(f"DELETE FROM {self.fields_table} WHERE field_name=?", (field_name,))
-            
-            # SQLite doesn't support DROP COLUMN directly
-            # 1. Get all columns except the one to remove
-            self.cursor.execute(f"PRAGMA table_info({self.items_table})")
-            columns = [column[1] for column in self.cursor.fetchall() if column[1] != field_name]
-            
-            # 2. Create a new table without the column
-            columns_str = ", ".join(columns)
-            self.cursor.execute(f"CREATE TABLE temp_table AS SELECT {columns_str} FROM {self.items_table}")
-            
-            # 3. Drop the old table
-            self.cursor.execute(f"DROP TABLE {self.items_table}")
-            
-            # 4. Rename the new table
-            self.cursor.execute(f"ALTER TABLE temp_table RENAME TO {self.items_table}")
-            
-            self.conn.commit()
-            self.log_message(f"Field Removed: field_name:{str(field_name)}")
-            return True
-        except Exception as e:
-            self.log_message(f"ERROR: Field Removal Attempted: field_name:{str(field_name)}")
-            raise e
-
-    # Method to get field information including required status
-    def get_field_info(self, field_name=None):
-        """Get information about fields including their required status"""
-        try:
-            if field_name:
-                self.cursor.execute(f"SELECT field_name, entry_type, validation_type, required FROM {self.fields_table} WHERE field_name=?", (field_name,))
-                result = self.cursor.fetchone()
-                if result:
-                    return {
-                        'field_name': result[0],
-                        'entry_type': result[1],
-                        'validation_type': result[2],
-                        'required': bool(result[3])  # Convert 0/1 to False/True
-                    }
-                return None
-            else:
-                self.cursor.execute(f"SELECT field_name, entry_type, validation_type, required FROM {self.fields_table}")
-                results = self.cursor.fetchall()
-                return [{
-                    'field_name': row[0],
-                    'entry_type': row[1],
-                    'validation_type': row[2],
-                    'required': bool(row[3])  # Convert 0/1 to False/True
-                } for row in results]
-        except Exception as e:
-            print(f"Error getting field info: {str(e)}")
-            return [] if field_name is None else None
+import pandas as pd
+import json
+from PyQt6.QtWidgets import QMessageBox, QInputDialog, QWidget, QLineEdit
+from datetime import datetime
+from ui import *
+from database.BlobStore import DatabaseBlobStore, CHUNK_SIZE, iter_chunks, open_blob_store
+from database.SchemaChange import SchemaChangeEngine
+from database.SchemaMigrations import SchemaMigrator
+from database.ConnectionManager import ConnectionManager
+from database.StorageProfiles import DEFAULT_STORAGE_PROFILE
+from database.PickList import PickListEngine
+from database.StockLedger import StockLedger
+from database.ItemQuery import build_item_queries, build_count_query, build_filters, PAGE_SIZE
+from database.Rows import RowSet
+from database.ColumnStore import ColumnStore
+from database.FieldDictionaries import FieldDictionaries
+from database.FacetCounts import FacetCounts, DEFAULT_BUCKETS
+from database.QueryLanguage import parse_query, compile_query
+from database.PrefixIndex import PrefixIndex, DEFAULT_LIMIT
+from database.ChangeEvents import (ChangeBus, ChangeEvent, ITEM_ADDED, ITEM_UPDATED, FIELD_ADDED,
+                                   FIELD_REMOVED, IMAGES_CHANGED, ITEMS_RELOADED, ItemChangeListener)
+from database.ChangeLog import ChangeLog, DEFAULT_KEEP
+from database.ImageHashIndex import BKTree, dhash_bytes, dhash_file, hash_to_sql, hash_from_sql
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import hashlib
+import sqlite3
+import os
+
+# Number of threads used to read image files before an insert
+IMAGE_PREFETCH_WORKERS = 8
+# Files larger than this are streamed inside the transaction instead of being read into memory
+IMAGE_PREFETCH_MAX_BYTES = 16 * 1024 * 1024
+# Id lookups with up to this many ids use IN lists of at most ID_CHUNK_SIZE ids (SQLite limits the parameters per query)
+ID_LOOKUP_JOIN_THRESHOLD = 2000
+ID_CHUNK_SIZE = 500
+# UPDATE ... RETURNING needs SQLite 3.35
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+#
+#   Returns a file extension for image bytes based on their signature
+#
+def image_extension(header: bytes):
+    signatures = {
+        b"\x89PNG": ".png",
+        b"\xff\xd8": ".jpg",
+        b"GIF8": ".gif",
+        b"BM": ".bmp",
+    }
+    for signature, extension in signatures.items():
+        if header.startswith(signature):
+            return extension
+    return ".bin"
+
+#   InventorySystem Class
+#
+#   This class is for handling operations of a database
+#
+
+class DatabaseSystem:
+    def __init__(self, name: str, file: str, blob_store=None, storage_profile=DEFAULT_STORAGE_PROFILE):
+        # Define name of databse instance
+        self.name = name
+        
+        self.ui = None  # Initialize UI later
+        
+        # Backend that holds image bytes, the store saved with the database unless one is given (see saved_blob_store)
+        self.blob_store = blob_store if blob_store is not None else DatabaseBlobStore()
+        
+        # Define SQLite database file name and table names for reference
+        self.db = file
+        self.items_table = "products"
+        self.images_table = "images"
+        self.fields_table = "fields"
+        self.login_table = "login"
+        self.movements_table = "stock_movements"
+        self.changes_table = "changes"
+        self.settings_table = "settings"
+        
+        # Encoding of the fields stored as codes into value tables (see FieldDictionaries)
+        self.dictionaries = FieldDictionaries(self.items_table, self.fields_table)
+        
+        # We get the log file in append mode
+        self.log_file = self.getLogFile(name, ".txt")
+        
+        self.username = ""
+        self.password = ""
+        self.logged_in = False
+        
+        # Create/Connect SQLite3 Database "products" (and table)
+        # Writes go through the single writer connection, reads can use a per-thread reader (see read_cursor)
+        # SQLite settings come from a named storage profile (see StorageProfiles)
+        self.connections = ConnectionManager(self.db, profile=storage_profile)
+        self.conn = self.connections.writer
+        self.cursor = self.conn.cursor()
+        
+        # Savepoints opened by a caller that groups several changes into one commit (see WriteQueue)
+        self.savepoints = []
+        # Work that has to wait until the grouped changes are committed (ex. deleting unused blobs)
+        self.pending_after_commit = []
+        # What the methods changed, published to the views and indexes after each commit (see publish_change)
+        self.changes = ChangeBus(self.log_message)
+        # (savepoint depth, event) of the changes that are not committed yet
+        self.pending_changes = []
+        # Changes recorded by triggers in the database, from every connection and process (see ChangeLog)
+        self.change_log = ChangeLog(self)
+        self.columns_snapshot = None
+        self.facet_counts = None
+        self.completions = None
+        
+        # Check if main table 'product' exists & Create 'products table if it does not exist'
+        products_exists = self.table_exists(self.items_table)
+        if not products_exists:
+            self.create_fields_table()
+            self.create_products_table()
+            self.create_images_table()
+            self.create_login_table()
+        
+        # Bring new and existing databases up to the latest schema version
+        self.migrator = SchemaMigrator(self.conn, {"items": self.items_table, "images": self.images_table,
+                                                   "fields": self.fields_table, "login": self.login_table,
+                                                   "movements": self.movements_table, "changes": self.changes_table,
+                                                   "settings": self.settings_table}, self.log_message)
+        self.migrator.migrate()
+        
+        # Images moved out of SQLite are read from the store they were moved to (see migrate_image_storage)
+        if blob_store is None:
+            self.blob_store = self.saved_blob_store()
+    
+    #
+    #   Returns a setting saved in the database (any JSON value), default if it was never set
+    #
+    def get_setting(self, key, default=None):
+        cursor = self.read_cursor()
+        cursor.execute(f"SELECT value FROM {self.settings_table} WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        return json.loads(row[0]) if row else default
+    
+    def set_setting(self, key, value):
+        with self.transaction():
+            self.cursor.execute(f"INSERT OR REPLACE INTO {self.settings_table} (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+    
+    #
+    #   Opens the blob store saved with the database, images stay inside SQLite when none was saved
+    #       - Paths are saved relative to the database file, so both can be moved together
+    #
+    def saved_blob_store(self):
+        try:
+            settings = self.get_setting("blob_store")
+            return open_blob_store(settings, os.path.dirname(os.path.abspath(self.db))) if settings else DatabaseBlobStore()
+        except (TypeError, ValueError, KeyError, sqlite3.Error) as e:
+            self.log_message(f"ERROR: Blob Store Setting Unreadable: error:{str(e)}")
+            return DatabaseBlobStore()
+    
+    def save_blob_store(self, store):
+        self.set_setting("blob_store", store.settings(os.path.dirname(os.path.abspath(self.db))))
+    
+    #
+    #   This function returns the log file for the database in append mode
+    #       - Will create a new file if it does not exist
+    #
+    def getLogFile(self, name: str, type: str):
+        log_file_path = f"{name}{type}"
+        # Ensure file exists before opening
+        if not os.path.exists(log_file_path):
+            with open(log_file_path, 'w') as file:
+                file.write("")  # Create an empty file
+        
+        # Open file in append mode and return the file object
+        return open(log_file_path, 'a')
+    
+    #
+    #   This function writes a message to the log file
+    # 
+    def log_message(self, message: str):
+        # Create the time of the message
+        timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
+        
+        self.log_file.write(f"{timestamp} {message}\n")
+        self.log_file.flush()
+            
+    
+    
+    def set_ui(self, ui):
+        self.ui = ui
+    
+    #
+    #   Commits the changes of a mutating method
+    #       - While a savepoint is open the changes are part of a larger group, whose owner commits them
+    #
+    def commit(self):
+        if self.savepoints:
+            return
+        self.conn.commit()
+        self.run_after_commit()
+    
+    #
+    #   Runs a callback once the current changes are committed (immediately if nothing is being grouped)
+    #
+    def after_commit(self, callback):
+        if self.savepoints:
+            self.pending_after_commit.append(callback)
+        else:
+            callback()
+    
+    def run_after_commit(self):
+        callbacks, self.pending_after_commit = self.pending_after_commit, []
+        changes, self.pending_changes = self.pending_changes, []
+        for callback in callbacks:
+            callback()
+        for _, event in changes:
+            self.changes.publish(event)
+    
+    #
+    #   Publishes a ChangeEvent (see ChangeEvents) once the current changes are committed
+    #       - Inside a transaction the event waits for the commit and is dropped if its savepoint is rolled back
+    #
+    def publish_change(self, kind, item_ids=None, field=None, renamed=None):
+        event = ChangeEvent(kind, item_ids, field, renamed)
+        if self.savepoints:
+            self.pending_changes.append((len(self.savepoints), event))
+        else:
+            self.changes.publish(event)
+    
+    #
+    #   Keeps the events of the savepoint at this depth for the enclosing savepoint (it was released)
+    #
+    def release_changes(self, depth):
+        self.pending_changes = [(min(event_depth, depth - 1), event) for event_depth, event in self.pending_changes]
+    
+    #
+    #   Drops the events of the savepoint at this depth and of the savepoints inside it (it was rolled back)
+    #
+    def discard_changes(self, depth):
+        self.pending_changes = [(event_depth, event) for event_depth, event in self.pending_changes if event_depth < depth]
+    
+    #
+    #   Returns the changes recorded after seq as a RowSet (see ChangeLog), for consumers that keep their
+    #   own copy of the data and update it incrementally, including changes made by other processes
+    #       - Raises ChangesCompacted (a ValueError) if they were compacted: re-read the tables instead
+    #
+    def changes_since(self, seq=0, limit=None, table=None):
+        return self.change_log.changes_since(seq, limit, table)
+    
+    def latest_change(self):
+        return self.change_log.latest()
+    
+    #
+    #   Deletes old entries of the change log, all but the newest keep by default
+    #
+    def compact_changes(self, through=None, keep=DEFAULT_KEEP):
+        return self.change_log.compact(through, keep)
+    
+    #
+    #   Registers a callback(item_ids) run after items were changed, item_ids is None when the
+    #   whole table may have changed (ex. a field was added)
+    #
+    def add_change_listener(self, callback):
+        self.changes.subscribe(ItemChangeListener(callback))
+    
+    def remove_change_listener(self, callback):
+        self.changes.unsubscribe(ItemChangeListener(callback))
+    
+    #
+    #   Returns the in-memory column snapshot of the items table (see ColumnStore), created on first use
+    #
+    def column_store(self):
+        if self.columns_snapshot is None:
+            self.columns_snapshot = ColumnStore(self)
+            self.add_change_listener(self.columns_snapshot.items_changed)
+        return self.columns_snapshot
+    
+    #
+    #   Returns the facet counter of the inventory view (see FacetCounts), created on first use
+    #
+    def facets(self):
+        if self.facet_counts is None:
+            self.facet_counts = FacetCounts(self)
+            self.add_change_listener(self.facet_counts.items_changed)
+        return self.facet_counts
+    
+    #
+    #   Returns the autocomplete index of ids, names and brands (see PrefixIndex), created on first use
+    #
+    def prefix_index(self):
+        if self.completions is None:
+            self.completions = PrefixIndex(self)
+            self.add_change_listener(self.completions.items_changed)
+        return self.completions
+    
+    #
+    #   Returns up to limit values of the indexed fields starting with the prefix (ex. for a QCompleter)
+    #       - field: complete only this field (ex. "id" for the removal view)
+    #       - wait=False returns no completions while the index is being built instead of waiting (for the views)
+    #
+    def complete_values(self, prefix, field=None, limit=DEFAULT_LIMIT, wait=True):
+        return self.prefix_index().complete(prefix, field, limit, wait)
+    
+    #
+    #   Groups several changes into one atomic unit of work:
+    #       with database.transaction():
+    #           database.update_item(...)
+    #           database.remove_image_by_id(...)
+    #       - Methods called inside the block do not commit, the outermost block commits once at the end
+    #       - An exception undoes the block's changes and is re-raised, nested blocks are savepoints
+    #         so they only undo their own part
+    #
+    @contextmanager
+    def transaction(self):
+        # Other threads wait here until the outermost block of this thread has finished
+        self.connections.acquire_writer()
+        try:
+            outermost = not self.savepoints
+            if outermost and not self.conn.in_transaction:
+                # Take the database write lock up front instead of failing halfway through the block
+                self.conn.execute("BEGIN IMMEDIATE")
+            savepoint = f"transaction_{len(self.savepoints)}"
+            self.conn.execute(f"SAVEPOINT {savepoint}")
+            self.savepoints.append(savepoint)
+            try:
+                yield self
+            except BaseException:
+                self.conn.execute(f"ROLLBACK TO {savepoint}")
+                self.conn.execute(f"RELEASE {savepoint}")
+                # The changes of the block did not happen
+                self.discard_changes(len(self.savepoints))
+                self.savepoints.pop()
+                if outermost:
+                    self.conn.rollback()
+                    self.pending_changes = []
+                    # Blob releases only delete payloads no row references, so they are still safe to run
+                    self.run_after_commit()
+                raise
+            self.conn.execute(f"RELEASE {savepoint}")
+            self.release_changes(len(self.savepoints))
+            self.savepoints.pop()
+            if outermost:
+                self.commit()
+        finally:
+            self.connections.release_writer()
+    
+    #
+    #   Switches the SQLite settings of every connection at runtime, returns the previous profile
+    #       - "durable", "balanced" or "bulk-load" (see StorageProfiles)
+    #
+    def set_storage_profile(self, profile):
+        previous = self.connections.set_profile(profile)
+        self.log_message(f"Storage Profile Changed: {previous.name} -> {self.connections.profile.name}")
+        return previous
+    
+    #
+    #   Uses another storage profile for a block only, ex. during an import:
+    #       with database.storage_profile("bulk-load"):
+    #           ...
+    #
+    @contextmanager
+    def storage_profile(self, profile):
+        previous = self.set_storage_profile(profile)
+        try:
+            yield self
+        finally:
+            self.set_storage_profile(previous)
+    
+    #
+    #   Returns a cursor for read-only queries
+    #       - Inside a transaction of this thread it reads from the writer, so the changes made so far are visible
+    #       - Otherwise it uses this thread's read-only connection, which does not wait on writes
+    #
+    def read_cursor(self):
+        if self.connections.holds_writer():
+            return self.conn.cursor()
+        return self.connections.reader().cursor()
+        
+    #
+    #   This function returns a boolean value for whether a given table exists in the database
+    #
+    def table_exists(self, table_name):
+        # Check if the 'products' table exists. Return True if it does, False otherwise.
+        cursor = self.read_cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+        table_exists = cursor.fetchone()
+        return bool(table_exists)  # True if table exists, False otherwise
+    
+    
+    
+    #
+    # Creates the default table for fields (only called if products table does not exist)
+    #
+    def create_fields_table(self):
+        # Creates a new table (if it doesn't already exist) for input fields
+        self.cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.fields_table} (
+                field_name TEXT PRIMARY KEY,
+                entry_type TEXT CHECK(entry_type IN ('small_box', 'large_box', 'image_box')),
+                validation_type TEXT CHECK(validation_type IN ('string', 'int', 'float')),
+                required INTEGER CHECK(required IN (0, 1))
+            )
+        ''')
+        self.conn.commit()
+        
+        # Define the default input fields
+        default_fields = [
+            ('id', 'small_box', 'string', 1),
+            ('name', 'small_box', 'string', 1),
+            ('quantity', 'small_box', 'int', 1),
+            ('price', 'small_box', 'float', 1),
+            ('category', 'small_box', 'string', 1),
+            ('brand', 'small_box', 'string', 1),
+            ('description', 'large_box', 'string', 0),
+            # ('images', 'image_box', 'string', 0)
+        ]
+        # Insert the default input fields into the database's field table
+        self.cursor.executemany(f"INSERT OR IGNORE INTO {self.fields_table} (field_name, entry_type, validation_type, required) VALUES (?, ?, ?, ?)", default_fields)
+        self.conn.commit()
+    
+    
+    #
+    #   This function creates the login table which holds:
+    #       - username
+    #       - password
+    #       - login required for performing database operations
+    #
+    def create_login_table(self):
+        # Create the login table if it doesn't already exist
+        self.cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.login_table} (
+                username TEXT PRIMARY KEY,
+                password TEXT NOT NULL,
+                requires_login INTEGER CHECK(requires_login IN (0, 1)) NOT NULL
+            )
+        ''')
+        self.conn.commit()
+        
+        # Insert default login credentials if the table is empty
+        self.cursor.execute(f"SELECT COUNT(*) FROM {self.login_table}")
+        if self.cursor.fetchone()[0] == 0:
+            default_login = ("", "", 0)  # Default username, password, and requires_login flag
+            self.cursor.execute(f"INSERT INTO {self.login_table} VALUES (?, ?, ?)", default_login)
+            self.conn.commit()
+    
+    
+    #
+    #   Returns whether logging in is required to perform database actions
+    #
+    def login_required(self):
+        try:
+            # Get login required value
+            cursor = self.read_cursor()
+            cursor.execute(f"SELECT requires_login FROM {self.login_table} LIMIT 1")
+            result = cursor.fetchone()
+
+            # Return true if the result is valid and login is set to required
+            if result and result[0] == 1:
+                return True
+            return False
+        except Exception as e:
+            self.log_message(f"Error checking login requirement: {str(e)}")
+            return False
+    
+    #
+    #   Returns whether account exists
+    #
+    def account_exists(self):
+        try:
+            # Query the login table for any non-empty username and password
+            cursor = self.read_cursor()
+            cursor.execute(f"SELECT username, password FROM {self.login_table} WHERE username != '' AND password != '' LIMIT 1")
+            result = cursor.fetchone()
+
+            # Return True if a valid account exists
+            return bool(result)
+        except Exception as e:
+            self.log_message(f"Error checking account existence: {str(e)}")
+            return False
+        # try:
+        #     # Query the login table for any non-empty username and password
+        #     self.cursor.execute(f"SELECT username, password FROM {self.login_table} LIMIT 1")
+        #     result = self.cursor.fetchone()
+
+        #     # Check if username and password are not empty
+        #     if result and result[0] and result[1]:
+        #         return True
+        #     return False
+        # except Exception as e:
+        #     self.log_message(f"Error checking account existence: {str(e)}")
+        #     return False
+    
+    #
+    #   Modifies account credentials if the old credentials match
+    #
+    def set_account_credentials(self, newUsername, newPassword, login_required):
+        try:
+            # Get password from the login table
+            cursor = self.read_cursor()
+            cursor.execute(f"SELECT password FROM {self.login_table} WHERE username=?", (self.username,))
+            result = cursor.fetchone()
+
+            # If username exists and password matches the usernames stored password
+            if not result or result[0] != self.password:
+                self.log_message("Failed to update credentials: Invalid old username or password.")
+                return False
+
+            # Update account credentials with the new values
+            with self.transaction():
+                self.cursor.execute(f'''
+                    UPDATE {self.login_table}
+                    SET username=?, password=?, requires_login=?
+                    WHERE username=?
+                ''', (newUsername, newPassword, login_required, self.username))
+
+            self.log_message(f"Account credentials updated successfully: New username '{newUsername}'.")
+            return True
+        except Exception as e:
+            self.log_message(f"Error updating account credentials: {str(e)}")
+            return False
+        
+        
+    #
+    #   Attempts to log in the user using credentials
+    #
+    def login(self, username, password):
+        try:
+            # Query the login table for the provided username
+            cursor = self.read_cursor()
+            cursor.execute(f"SELECT password, requires_login FROM {self.login_table} WHERE username=?", (username,))
+            result = cursor.fetchone()
+
+            # If no user is found or login is not required
+            if not result:
+                self.log_message(f"Login failed: Username '{username}' not found.")
+                return False
+            # if result[1] == 0:  # requires_login is False
+            #     self.log_message("Login not required, access granted.")
+            #     return True
+
+            # Check if the provided password matches the stored password
+            stored_password = result[0]
+            if password == stored_password:
+                self.logged_in = True
+                self.log_message(f"LOGIN: Username '{username}'.")
+                
+                # set database username
+                self.username = username
+                self.password = password
+                
+                return True
+            else:
+                self.log_message(f"Login failed: Incorrect password for username '{username}'.")
+                return False
+        except Exception as e:
+            self.log_message(f"Login error: {str(e)}")
+            return False
+    
+    
+    
+    #
+    #   This function creates the main table of the database
+    #   The products table will hold all the inventory
+    #   The products table is created with each column corresponding to each field from the field table
+    #
+    def create_products_table(self):
+        # Gets all field names from fields table (to get columns for main table)
+        self.cursor.execute(f"SELECT field_name, validation_type FROM {self.fields_table}")
+        fields = self.cursor.fetchall()
+
+        # Associate validation type to fields
+        column_definitions = []
+        for field, field_type in fields:
+            sql_type = {"string": "TEXT", "int": "INTEGER", "float": "REAL"}[field_type]
+            column_definitions.append(f"{field} {sql_type}")
+           
+        # Add image column to the database 
+        # column_definitions.append("images TEXT")
+
+        # Create table with the new fields
+        sql = f"CREATE TABLE IF NOT EXISTS {self.items_table} ({', '.join(column_definitions)})"
+        self.cursor.execute(sql)
+        self.commit()
+        
+    def create_images_table(self):
+        try:
+            self.cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.images_table} (
+                    image_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    product_id INTEGER NOT NULL,
+                    image_data BLOB NOT NULL,
+                    image_ref TEXT,
+                    phash INTEGER,
+                    FOREIGN KEY (product_id) REFERENCES {self.items_table}(id) ON DELETE CASCADE
+                )
+            """)
+            self.commit()
+            self.log_message("Images table created successfully.")
+        except Exception as e:
+            self.log_message(f"Error creating images table: {str(e)}")
+            raise e
+    
+    #
+    #   This function adds a new field into the fields table
+    #   When the user adds a product to the inventory, they are prompted to fill out each field
+    #   By adding fields, we allow the user to input more information when adding a product
+    #
+    def add_to_fields_table(self, field_name, entry_type, validation_type, required):
+        
+        # Convert the required parameter to integer (0 or 1)
+        # This handles both string values ("0"/"1") and integer values (0/1)
+        if isinstance(required, str):
+            required_int = 1 if required == "1" else 0
+        else:
+            required_int = 1 if required else 0
+            
+        try:
+            # Check if field already exists in fields table
+            self.cursor.execute(f"SELECT COUNT(*) FROM {self.fields_table} WHERE field_name=?", (field_name,))
+            if self.cursor.fetchone()[0] > 0:
+                raise ValueError(f"Field '{field_name}' already exists in fields table")
+                
+            # The field entry and its column are added together, or not at all
+            with self.transaction():
+                # Insert field and its info to fields table
+                self.cursor.execute(f"INSERT INTO {self.fields_table} (field_name, entry_type, validation_type, required) VALUES (?, ?, ?, ?)", 
+                                   (field_name, entry_type, validation_type, required_int))
+                
+                # Check if the column already exists in the products table
+                self.cursor.execute(f"PRAGMA table_info({self.items_table})")
+                existing_columns = [column[1] for column in self.cursor.fetchall()]
+            
+                # If the column doesn't exist, add it to the products table
+                if field_name not in existing_columns:
+                    sql_type = {"string": "TEXT", "int": "INTEGER", "float": "REAL"}[validation_type]
+                    self.cursor.execute(f"ALTER TABLE {self.items_table} ADD COLUMN {field_name} {sql_type}")
+                else:
+                    # If column exists but not in fields table, we have a sync issue
+                    raise ValueError(f"Column '{field_name}' already exists in products table but was not in fields table")
+                # The change triggers list the columns, recreate them with the new one
+                self.change_log.install(self.cursor)
+                self.publish_change(FIELD_ADDED, field=field_name)
+            
+            # LOG MESSAGE
+            self.log_message(f"Field Added: field_name:{str(field_name)}, entry_type:{str(entry_type)}, validation_type:{str(validation_type)}, required:{str(required_int)}")
+            return True
+        except sqlite3.IntegrityError as e:
+            # LOG MESSAGE
+            self.log_message(f"ERROR: Field Added Attempted: field_name:{str(field_name)}, entry_type:{str(entry_type)}, validation_type:{str(validation_type)}, required:{str(required_int)}")
+            raise ValueError(f"Database integrity error: {str(e)}")
+        except Exception as e:
+            self.log_message(f"ERROR: Field Added Attempted: field_name:{str(field_name)}, entry_type:{str(entry_type)}, validation_type:{str(validation_type)}, required:{str(required_int)}")
+            raise e
+        return False
+
+    
+    
+    #
+    #   This function removes a field from the fields table
+    #   When a field is removed, the user will no longer be prompted to enter that field when adding an item to inventory
+    #
+    def remove_to_fields_table(self, field_name):
+        # This function adds field to the fields table
+        with self.transaction():
+            self.cursor.execute(f"DELETE FROM {self.fields_table} WHERE field_name = ?", (field_name,))
+        # LOG MESSAGE
+        self.log_message(f"Field Removed: field_name:{str(field_name)}")
+    
+    
+
+    
+    #
+    #   This function:
+    #       - Retrieves product data from the UI function display_add_item()
+    #       - Inputs the products data into its categories in the database
+    #
+    def add_item_to_database(self, product_data):
+        # Fetch field names and required status from the database
+        cursor = self.read_cursor()
+        cursor.execute(f"SELECT field_name, required FROM {self.fields_table}")
+        field_info = {row[0]: row[1] for row in cursor.fetchall()}
+        
+        print(f"Field info from database: {field_info}")
+        print(f"Product info from database: {product_data}")
+        
+        # Get all field names (except form images)
+        # fields = list(field_info.keys())
+        fields = [field for field in field_info.keys() if field != "images"]
+        
+        # Check for missing fields
+        missing_fields = [field for field in fields if field not in product_data]
+        if missing_fields:
+            print(f"Missing fields: {missing_fields}")
+            return False
+        
+        # Check for required fields with empty values
+        empty_required_fields = [field for field, required in field_info.items() 
+                                if required == 1 and field in product_data and not product_data[field]]
+        
+        if empty_required_fields:
+            print(f"Empty required fields: {empty_required_fields}")
+            return False
+    
+    
+    
+        # Prepare dynamic SQL query
+        placeholders = ", ".join(["?" for _ in fields])
+        field_names = ", ".join(fields)
+        values = tuple(product_data.get(field, "") for field in fields)
+        
+        # Read (and hash) every image before the transaction starts, so the write lock is not held while waiting on disk
+        prefetched_images = self.prefetch_image_files(product_data.get("images") or [])
+        
+        try:
+            with self.transaction():
+                # Encoded fields are stored as the codes of their values
+                values = tuple(self.dictionaries.encode_record(self.cursor, dict(zip(fields, values))).values())
+                # Insert the product data into the products table
+                self.cursor.execute(f"INSERT INTO {self.items_table} ({field_names}) VALUES ({placeholders})", values)
+                # Images are linked through the product's id column (falls back to the rowid if the id field was removed)
+                product_id = product_data.get("id") or self.cursor.lastrowid
+                try:
+                    quantity = int(product_data.get("quantity"))
+                except (TypeError, ValueError):
+                    quantity = None
+                if quantity:
+                    StockLedger(self).record([(product_id, quantity, quantity, "add")])
+                self.publish_change(ITEM_ADDED, [product_id])
+
+                # Insert the prefetched images in a single statement, large files are streamed afterwards
+                image_rows = [(product_id, image["data"], image["ref"], image["phash"]) for image in prefetched_images if image["path"] is None]
+                if image_rows:
+                    self.cursor.executemany(f"INSERT INTO {self.images_table} (product_id, image_data, image_ref, phash) VALUES (?, ?, ?, ?)", image_rows)
+                for image in prefetched_images:
+                    if image["path"] is not None:
+                        self.insert_image_from_file(product_id, image["path"], phash=image["phash"])
+            
+            # LOG MESSAGE
+            self.log_message(f"Item Added: {product_data}")
+            return True
+        except Exception as e:
+            # Payloads written to an external store for this item are no longer referenced
+            self.release_image_refs(image["ref"] for image in prefetched_images)
+            self.log_message(f"Error adding item to database: {str(e)}")
+            print(f"Error adding item to database: {str(e)}")
+            return False
+    
+    #
+    #   Reads and hashes image files concurrently in a thread pool
+    #       - Returns one entry per readable file: {"data", "ref", "digest", "phash", "path"}
+    #       - External blob stores receive their payloads here, outside of any transaction
+    #       - Files over IMAGE_PREFETCH_MAX_BYTES keep their "path" so they can be streamed later
+    #       - The same file contents selected twice are only stored once
+    #
+    def prefetch_image_files(self, image_paths):
+        if not image_paths:
+            return []
+
+        def read_image(image_path):
+            if self.blob_store.inline and os.path.getsize(image_path) > IMAGE_PREFETCH_MAX_BYTES:
+                return {"data": None, "ref": None, "digest": None, "phash": hash_to_sql(dhash_file(image_path)), "path": image_path}
+            if not self.blob_store.inline:
+                # External stores hash while streaming, so memory stays bounded
+                with open(image_path, "rb") as image_file:
+                    stored_data, image_ref = self.blob_store.put_stream(image_file)
+                return {"data": stored_data, "ref": image_ref, "digest": image_ref, "phash": hash_to_sql(dhash_file(image_path)), "path": None}
+            with open(image_path, "rb") as image_file:
+                image_data = image_file.read()
+            return {"data": image_data, "ref": None, "digest": hashlib.sha256(image_data).hexdigest(), "phash": hash_to_sql(dhash_bytes(image_data)), "path": None}
+
+        prefetched = []
+        seen_digests = set()
+        with ThreadPoolExecutor(max_workers=min(IMAGE_PREFETCH_WORKERS, len(image_paths))) as executor:
+            futures = [(image_path, executor.submit(read_image, image_path)) for image_path in image_paths]
+            for image_path, future in futures:
+                try:
+                    image = future.result()
+                except Exception as e:
+                    self.log_message(f"Error reading image file '{image_path}': {str(e)}")
+                    print(f"Error reading image file '{image_path}': {str(e)}")
+                    continue
+                if image["digest"] is not None:
+                    if image["digest"] in seen_digests:
+                        continue
+                    seen_digests.add(image["digest"])
+                prefetched.append(image)
+        return prefetched
+    
+        # # Add items to database
+        # self.cursor.execute(f"INSERT INTO {self.items_table} ({field_names}) VALUES ({placeholders})", values)
+        # self.conn.commit()
+        
+        # # LOG MESSAGE
+        # self.log_message(f"Item Added: field_name:{str(product_data)}")
+        # return True
+    
+    
+    
+    #
+    #   This function:
+    #       - Retreives the ID and count of the item to be removed
+    #       - Ensures item exists, if so decreases quantity by requested amount
+    #       - Ensures the user cannot remove more of an item than currently exists
+    #
+    def remove_item_from_database(self, item_id, item_count):
+        item_count = int(item_count)
+        with self.transaction():
+            self.apply_stock_delta(item_id, -item_count, "remove")
+        
+        self.log_message(f"Item Removed: id:{str(item_id)}, count:{str(item_count)}")
+    
+    #
+    #   Changes the quantity of an item by delta in a single conditional UPDATE (does not commit)
+    #       - The check and the change happen in one statement, so concurrent removals of the same
+    #         item (other registers, other processes) can never take the quantity below zero
+    #       - The change is recorded in the stock ledger with the given reason
+    #       - Returns the new quantity, raises ValueError if the item is missing or does not have enough stock
+    #
+    def apply_stock_delta(self, item_id, delta, reason="adjust"):
+        delta = int(delta)
+        # Removing n items needs at least n in stock, adding needs nothing
+        required = max(0, -delta)
+        if SUPPORTS_RETURNING:
+            self.cursor.execute(f"UPDATE {self.items_table} SET quantity = quantity + ? WHERE id = ? AND quantity >= ? RETURNING quantity", (delta, item_id, required))
+            rows = self.cursor.fetchall()
+        else:
+            self.cursor.execute(f"UPDATE {self.items_table} SET quantity = quantity + ? WHERE id = ? AND quantity >= ?", (delta, item_id, required))
+            rows = []
+            if self.cursor.rowcount:
+                self.cursor.execute(f"SELECT quantity FROM {self.items_table} WHERE id = ?", (item_id,))
+                rows = self.cursor.fetchall()
+        
+        if rows:
+            StockLedger(self).record([(item_id, delta, rows[0][0], reason)])
+            self.publish_change(ITEM_UPDATED, [item_id])
+            return rows[0][0]
+        
+        # Nothing was updated, find out why
+        self.cursor.execute(f"SELECT quantity FROM {self.items_table} WHERE id = ?", (item_id,))
+        if not self.cursor.fetchone():
+            raise ValueError("Item not found.")
+        raise ValueError("Cannot remove more items than are available in the inventory.")
+    
+    #
+    #   Atomically adds delta to an item's quantity (negative to remove), returns the new quantity
+    #
+    def adjust_stock(self, item_id, delta):
+        with self.transaction():
+            new_quantity = self.apply_stock_delta(item_id, delta)
+        self.log_message(f"Stock Adjusted: id:{str(item_id)}, delta:{str(delta)}, quantity:{str(new_quantity)}")
+        return new_quantity
+    
+    #
+    #   Applies many stock changes in one transaction: [(item_id, delta), ...]
+    #       - Either every change is applied or, if one fails, none are (the ValueError names the item)
+    #       - Returns {item_id: new quantity}
+    #
+    def adjust_stock_batch(self, deltas):
+        quantities = {}
+        with self.transaction():
+            for item_id, delta in deltas:
+                try:
+                    quantities[item_id] = self.apply_stock_delta(item_id, delta)
+                except ValueError as e:
+                    raise ValueError(f"{item_id}: {str(e)}") from e
+        self.log_message(f"Stock Adjusted: items:{len(quantities)}, changes:{str(quantities)}")
+        return quantities
+    
+    #
+    #   Applies a pick list: [(item_id, delta), ...] or PickLines from parse_pick_list / read_pick_list_file
+    #       - Every line is checked against the stock with one query and applied in one transaction
+    #       - Returns a PickListReport with the outcome of every line, nothing is applied if a line
+    #         fails unless partial is True
+    #
+    def apply_pick_list(self, entries, partial=False):
+        report = PickListEngine(self).apply(entries, partial)
+        if report.applied:
+            self.log_message(f"Pick List Applied: {report.summary()}, changes:{str(report.changes())}")
+        else:
+            self.log_message(f"ERROR: Pick List Rejected: {report.summary()}")
+        return report
+    
+    #
+    #   Returns the stock movements of an item, newest first (see StockLedger)
+    #       - start and end (datetime or unix time) limit the history to [start, end)
+    #
+    def get_stock_history(self, item_id, start=None, end=None, limit=None):
+        return StockLedger(self).history(item_id, start, end, limit)
+    
+    #
+    #   Returns units in, units out, net change and movement count per "hour", "day" or "week"
+    #       - For one item (item_id), every item together, or every item separately (by_item)
+    #
+    def get_stock_totals(self, period="day", start=None, end=None, item_id=None, by_item=False):
+        return StockLedger(self).totals(period, start, end, item_id, by_item)
+    
+    #
+    #   Stores image bytes through the blob store and inserts the matching row (does not commit)
+    #
+    def insert_image(self, product_id, image_data, digest=None):
+        stored_data, image_ref = self.blob_store.put(image_data, digest)
+        phash = hash_to_sql(dhash_bytes(image_data))
+        self.cursor.execute(f"INSERT INTO {self.images_table} (product_id, image_data, image_ref, phash) VALUES (?, ?, ?, ?)", (product_id, stored_data, image_ref, phash))
+    
+    #
+    #   Releases external payloads that are no longer referenced by any image row
+    #
+    def release_image_refs(self, image_refs):
+        image_refs = set(image_refs)
+        if self.savepoints:
+            # The rows are only gone once the group is committed
+            self.after_commit(lambda: self.release_image_refs(image_refs))
+            return
+        cursor = self.read_cursor()
+        for image_ref in image_refs:
+            if not image_ref:
+                continue
+            cursor.execute(f"SELECT COUNT(*) FROM {self.images_table} WHERE image_ref = ?", (image_ref,))
+            if cursor.fetchone()[0] == 0:
+                self.blob_store.delete(image_ref)
+    
+    #
+    #   Returns all images for a product specified by its ID in the form of a list of binary data
+    #
+    def get_images_for_product(self, product_id):
+        cursor = self.read_cursor()
+        try:
+            cursor.execute(f"SELECT image_data, image_ref FROM {self.images_table} WHERE product_id = ?", (product_id,))
+            images = cursor.fetchall()
+            return [self.blob_store.get(image[0], image[1]) for image in images]  # Return a list of binary image data
+        except Exception as e:
+            self.log_message(f"Error retrieving images for product_id {product_id}: {str(e)}")
+            raise e
+    #
+    #   Removes an image from a product specified by its ID, and matching image data. Does not return status of whether the image was or wasn't found
+    #
+    def remove_image(self, product_id, image_data):
+        try:
+            if self.blob_store.inline:
+                with self.transaction():
+                    self.cursor.execute(f"DELETE FROM {self.images_table} WHERE product_id = ? AND image_data = ?", (product_id, image_data))
+                    self.publish_change(IMAGES_CHANGED, [product_id])
+            else:
+                # External payloads are compared after loading them back through the store
+                self.cursor.execute(f"SELECT image_id, image_data, image_ref FROM {self.images_table} WHERE product_id = ?", (product_id,))
+                matches = [(row[0], row[2]) for row in self.cursor.fetchall() if self.blob_store.get(row[1], row[2]) == image_data]
+                with self.transaction():
+                    for image_id, _ in matches:
+                        self.cursor.execute(f"DELETE FROM {self.images_table} WHERE image_id = ?", (image_id,))
+                    self.publish_change(IMAGES_CHANGED, [product_id])
+                self.release_image_refs(image_ref for _, image_ref in matches)
+            self.log_message(f"Image removed for product_id {product_id}")
+        except Exception as e:
+            self.log_message(f"Error removing image for product_id {product_id}: {str(e)}")
+            raise e
+    
+    #
+    #   Adds an image to a product specified by its ID
+    #
+    def add_image_to_product(self, product_id, image_data):
+        try:
+            with self.transaction():
+                self.insert_image(product_id, image_data)
+                self.publish_change(IMAGES_CHANGED, [product_id])
+            self.log_message(f"Image added for product_id {product_id}")
+        except Exception as e:
+            self.log_message(f"Error adding image for product_id {product_id}: {str(e)}")
+            raise e
+    
+    #
+    #   Stores an image read chunk by chunk from a path, file object or socket (does not commit)
+    #       - Inline images are written with sqlite3's incremental blob API
+    #       - Returns the image_id of the new row
+    #
+    def insert_image_from_file(self, product_id, source, size=None, chunk_size=CHUNK_SIZE, phash=None):
+        if isinstance(source, str):
+            # Files on disk can be hashed by Qt directly (other sources are hashed later by update_image_hashes)
+            if phash is None:
+                phash = hash_to_sql(dhash_file(source))
+            with open(source, "rb") as source_file:
+                return self.insert_image_from_file(product_id, source_file, os.fstat(source_file.fileno()).st_size, chunk_size, phash)
+
+        if not self.blob_store.inline:
+            stored_data, image_ref = self.blob_store.put_stream(source, chunk_size)
+            self.cursor.execute(f"INSERT INTO {self.images_table} (product_id, image_data, image_ref, phash) VALUES (?, ?, ?, ?)", (product_id, stored_data, image_ref, phash))
+            return self.cursor.lastrowid
+
+        if size is None:
+            raise ValueError("The size of the image must be known to stream it into the database.")
+
+        # Reserve the space first, then fill it in place
+        self.cursor.execute(f"INSERT INTO {self.images_table} (product_id, image_data, image_ref, phash) VALUES (?, zeroblob(?), NULL, ?)", (product_id, size, phash))
+        image_id = self.cursor.lastrowid
+        written = 0
+        if hasattr(self.conn, "blobopen"):
+            with self.conn.blobopen(self.images_table, "image_data", image_id) as blob:
+                for chunk in iter_chunks(source, chunk_size):
+                    blob.write(chunk)
+                    written += len(chunk)
+        else:
+            # Older Python versions have no blobopen, so the blob is rebuilt one chunk at a time
+            self.cursor.execute(f"UPDATE {self.images_table} SET image_data = X'' WHERE image_id = ?", (image_id,))
+            for chunk in iter_chunks(source, chunk_size):
+                self.cursor.execute(f"UPDATE {self.images_table} SET image_data = image_data || ? WHERE image_id = ?", (chunk, image_id))
+                written += len(chunk)
+
+        if written != size:
+            raise ValueError(f"Expected {size} bytes for the image but read {written}.")
+        return image_id
+    
+    #
+    #   Adds an image to a product by streaming it from a path, file object or socket
+    #
+    def add_image_from_file(self, product_id, source, size=None):
+        try:
+            with self.transaction():
+                image_id = self.insert_image_from_file(product_id, source, size)
+                self.publish_change(IMAGES_CHANGED, [product_id])
+            self.log_message(f"Image added for product_id {product_id}")
+            return image_id
+        except Exception as e:
+            self.log_message(f"Error adding image for product_id {product_id}: {str(e)}")
+            raise e
+    
+    #
+    #   Returns the IDs of the images of a product, so they can be streamed one at a time
+    #
+    def get_image_ids_for_product(self, product_id):
+        cursor = self.read_cursor()
+        cursor.execute(f"SELECT image_id FROM {self.images_table} WHERE product_id = ? ORDER BY image_id", (product_id,))
+        return [row[0] for row in cursor.fetchall()]
+    
+    #
+    #   Yields the bytes of a stored image in chunks of at most chunk_size
+    #
+    def iter_image_chunks(self, image_id, chunk_size=CHUNK_SIZE):
+        read_cursor = self.read_cursor()
+        read_cursor.execute(f"SELECT image_ref, length(image_data) FROM {self.images_table} WHERE image_id = ?", (image_id,))
+        row = read_cursor.fetchone()
+        if not row:
+            raise ValueError("Image not found.")
+        image_ref, length = row
+
+        if image_ref:
+            with self.blob_store.open_stream(image_ref) as payload:
+                yield from iter_chunks(payload, chunk_size)
+        elif hasattr(read_cursor.connection, "blobopen"):
+            with read_cursor.connection.blobopen(self.images_table, "image_data", image_id, readonly=True) as blob:
+                yield from iter_chunks(blob, chunk_size)
+        else:
+            # substr() is 1-indexed
+            for offset in range(0, length, chunk_size):
+                read_cursor.execute(f"SELECT substr(image_data, ?, ?) FROM {self.images_table} WHERE image_id = ?", (offset + 1, chunk_size, image_id))
+                yield read_cursor.fetchone()[0]
+    
+    #
+    #   Copies a stored image to a path, file object or socket in fixed-size chunks
+    #       - Returns the number of bytes written
+    #
+    def stream_image_to(self, image_id, destination, chunk_size=CHUNK_SIZE):
+        if isinstance(destination, str):
+            with open(destination, "wb") as destination_file:
+                return self.stream_image_to(image_id, destination_file, chunk_size)
+
+        # Sockets are written with sendall, everything else with write
+        write = destination.sendall if hasattr(destination, "sendall") else destination.write
+        written = 0
+        for chunk in self.iter_image_chunks(image_id, chunk_size):
+            write(chunk)
+            written += len(chunk)
+        return written
+    
+    #
+    #   Exports every image of a product into a directory, one streamed file per image
+    #       - Returns the list of written file paths
+    #
+    def export_product_images(self, product_id, directory):
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for image_id in self.get_image_ids_for_product(product_id):
+            # Look at the first bytes to pick a file extension
+            chunks = self.iter_image_chunks(image_id, 16)
+            first_chunk = next(chunks, b"")
+            chunks.close()
+            extension = image_extension(first_chunk)
+            path = os.path.join(directory, f"{product_id}_{image_id}{extension}")
+            self.stream_image_to(image_id, path)
+            paths.append(path)
+        self.log_message(f"Images Exported: product_id:{str(product_id)}, count:{len(paths)}, directory:{directory}")
+        return paths
+    
+    #
+    #   Removes a single image by its ID
+    #
+    def remove_image_by_id(self, image_id):
+        try:
+            with self.transaction():
+                self.cursor.execute(f"SELECT product_id, image_ref FROM {self.images_table} WHERE image_id = ?", (image_id,))
+                row = self.cursor.fetchone()
+                if not row:
+                    return
+                self.cursor.execute(f"DELETE FROM {self.images_table} WHERE image_id = ?", (image_id,))
+                self.publish_change(IMAGES_CHANGED, [row[0]])
+            self.release_image_refs([row[1]])
+            self.log_message(f"Image removed for product_id {row[0]}")
+        except Exception as e:
+            self.log_message(f"Error removing image {image_id}: {str(e)}")
+            raise e
+    
+    #
+    #   Computes the perceptual hash of images that do not have one yet (ex. images added before hashing existed)
+    #       - Returns the number of images hashed
+    #
+    def update_image_hashes(self):
+        cursor = self.read_cursor()
+        cursor.execute(f"SELECT image_id FROM {self.images_table} WHERE phash IS NULL")
+        image_ids = [row[0] for row in cursor.fetchall()]
+        hashes = []
+        for image_id in image_ids:
+            # One image is held in memory at a time, the writer is only taken to store the hashes
+            phash = hash_to_sql(dhash_bytes(b"".join(self.iter_image_chunks(image_id))))
+            if phash is not None:
+                hashes.append((phash, image_id))
+        if hashes:
+            with self.transaction():
+                self.cursor.executemany(f"UPDATE {self.images_table} SET phash = ? WHERE image_id = ?", hashes)
+        return len(hashes)
+    
+    #
+    #   Builds a BK-tree over the perceptual hashes of every image, items are (image_id, product_id)
+    #
+    def build_image_hash_index(self):
+        self.update_image_hashes()
+        index = BKTree()
+        cursor = self.read_cursor()
+        cursor.execute(f"SELECT image_id, product_id, phash FROM {self.images_table} WHERE phash IS NOT NULL")
+        for image_id, product_id, phash in cursor.fetchall():
+            index.add(hash_from_sql(phash), (image_id, product_id))
+        return index
+    
+    #
+    #   Returns images that look like the given image: [(distance, image_id, product_id), ...]
+    #
+    def find_similar_images(self, image_id, max_distance=6, index=None):
+        cursor = self.read_cursor()
+        cursor.execute(f"SELECT phash FROM {self.images_table} WHERE image_id = ?", (image_id,))
+        row = cursor.fetchone()
+        if not row:
+            raise ValueError("Image not found.")
+        if row[0] is None:
+            return []
+
+        index = index or self.build_image_hash_index()
+        return [(distance, other_id, product_id)
+                for distance, (other_id, product_id) in index.search(hash_from_sql(row[0]), max_distance)
+                if other_id != image_id]
+    
+    #
+    #   Returns a dataframe of image pairs that belong to different products but look the same
+    #       - Each image is looked up in the BK-tree, so the whole catalog is not compared pairwise
+    #
+    def find_duplicate_images(self, max_distance=6):
+        index = self.build_image_hash_index()
+        cursor = self.read_cursor()
+        cursor.execute(f"SELECT image_id, product_id, phash FROM {self.images_table} WHERE phash IS NOT NULL")
+        pairs = []
+        for image_id, product_id, phash in cursor.fetchall():
+            for distance, (other_id, other_product_id) in index.search(hash_from_sql(phash), max_distance):
+                # Report each pair once, and only across different products
+                if other_id > image_id and str(other_product_id) != str(product_id):
+                    pairs.append((product_id, image_id, other_product_id, other_id, distance))
+
+        columns = ["product_id", "image_id", "duplicate_product_id", "duplicate_image_id", "distance"]
+        return pd.DataFrame(pairs, columns=columns).sort_values(["distance", "product_id"], ignore_index=True)
+    
+    #
+    #   Writes the duplicate photo report to a CSV file and returns the number of pairs found
+    #
+    def write_duplicate_image_report(self, path, max_distance=6):
+        report = self.find_duplicate_images(max_distance)
+        report.to_csv(path, index=False)
+        self.log_message(f"Duplicate Image Report: pairs:{len(report)}, max_distance:{max_distance}, file:{path}")
+        return len(report)
+    
+    #
+    #   Moves every stored image into another blob store and switches the database to use it
+    #       - Use a FileBlobStore/PackFileBlobStore to move BLOBs out of SQLite
+    #       - Use a DatabaseBlobStore to move them back in
+    #       - Rows are moved in batches, each its own transaction, so a large migration can be interrupted and resumed
+    #       - The store is saved with the database, later sessions open it by themselves
+    #
+    def migrate_image_storage(self, target_store, batch_size=200):
+        source_store = self.blob_store
+        moved = 0
+        last_id = 0
+        try:
+            # An external store also returns the bytes of inline rows, so it can serve a half moved
+            # database and is saved first; SQLite cannot read references, it is saved once all are moved
+            if not target_store.inline:
+                self.save_blob_store(target_store)
+            while True:
+                old_refs = []
+                with self.transaction():
+                    self.cursor.execute(
+                        f"SELECT image_id, image_data, image_ref FROM {self.images_table} WHERE image_id > ? ORDER BY image_id LIMIT ?",
+                        (last_id, batch_size))
+                    rows = self.cursor.fetchall()
+                    for image_id, image_data, image_ref in rows:
+                        last_id = image_id
+                        # Skip rows already moved by an interrupted run (inline rows have no reference)
+                        already_moved = image_ref is None if target_store.inline else (image_ref is not None and source_store.inline)
+                        if already_moved:
+                            continue
+                        payload = image_data if image_ref is None else source_store.get(image_data, image_ref)
+                        stored_data, new_ref = target_store.put(payload)
+                        self.cursor.execute(f"UPDATE {self.images_table} SET image_data = ?, image_ref = ? WHERE image_id = ?", (stored_data, new_ref, image_id))
+                        if image_ref:
+                            old_refs.append(image_ref)
+                        moved += 1
+                if not rows:
+                    break
+
+                # Old external payloads can only be released once the batch pointing away from them is committed
+                self.release_image_refs(old_refs)
+
+            self.blob_store = target_store
+            self.save_blob_store(target_store)
+            self.log_message(f"Image Storage Migrated: from:{source_store.name}, to:{target_store.name}, images:{moved}")
+            return moved
+        except Exception as e:
+            self.log_message(f"Error migrating image storage: {str(e)}")
+            raise e
+        
+    #
+    #   Returns all items as a dataframe
+    #
+    def get_all_items(self):
+        return self.fetch_all_items().to_dataframe()
+    
+    #
+    #   Returns all items as a RowSet (tuples, see Rows), for views that only iterate the rows
+    #       - with_rowid: the first column is the rowid (ids are not unique, the rowid tells rows apart)
+    #
+    def fetch_all_items(self, with_rowid=False):
+        cursor = self.read_cursor()
+        # Execute query to select all records from the products table
+        cursor.execute(f"SELECT {'rowid, ' if with_rowid else ''}* FROM {self.items_table}")
+        return self.dictionaries.decode(cursor, RowSet.from_cursor(cursor))
+    
+    #
+    #   Returns the column names of the items table
+    #
+    def item_columns(self):
+        cursor = self.read_cursor()
+        cursor.execute(f"PRAGMA table_info({self.items_table})")
+        return [column[1] for column in cursor.fetchall()]
+    
+    #
+    #   Reads only what the caller needs from the items table (see ItemQuery), returns a DataFrame
+    #       - columns:  ex. ["id", "name"], all columns by default
+    #       - filters:  ex. {"category": "Audio", "quantity": ("<=", 5)}
+    #       - order_by / descending: sort column and direction, ties are sorted by rowid
+    #       - after / limit: keyset pagination, pass the (sort value, rowid) after returned by fetch_page
+    #         (ids are not unique, so the last row's id cannot tell where the page ended)
+    #
+    def query_items(self, columns=None, filters=None, order_by="id", descending=False, after=None, limit=None):
+        return self.fetch_items(columns, filters, order_by, descending, after, limit).to_dataframe()
+    
+    #
+    #   Same as query_items, returns a RowSet without building a DataFrame
+    #
+    def fetch_items(self, columns=None, filters=None, order_by="id", descending=False, after=None, limit=None):
+        self.check_item_query(columns, filters, order_by)
+        cursor = self.read_cursor()
+        return self.read_items(cursor, columns, filters, order_by, descending, after, limit)
+    
+    #
+    #   Reads one page of items in sort order (ex. for the inventory table), returns (RowSet, after)
+    #       - order_by: sort column, or "rowid" for the table order; ties are sorted by rowid
+    #       - after: None for the first page, then the after returned with the previous page
+    #         (None once there are no more rows)
+    #   On an indexed column (see the facet indexes), every page is read straight from the index.
+    #
+    def fetch_page(self, columns=None, filters=None, order_by="rowid", descending=False, after=None, limit=PAGE_SIZE):
+        self.check_item_query(columns, filters, order_by)
+        cursor = self.read_cursor()
+        rows = self.read_items(cursor, columns, filters, order_by, descending, after, limit, with_position=True)
+        # The last two columns are the sort value and rowid of the row
+        width = len(rows.columns) - 2
+        page = RowSet(rows.columns[:width], [row[:width] for row in rows])
+        next_after = tuple(rows.rows[-1][width:]) if len(rows) == limit else None
+        return page, next_after
+    
+    #
+    #   Raises ValueError for columns that are not in the items table (they go into the SQL as names)
+    #
+    def check_item_query(self, columns, filters, order_by):
+        known_columns = self.item_columns()
+        for column in list(columns or []) + list(filters or {}) + ([] if order_by == "rowid" else [order_by]):
+            if column not in known_columns:
+                raise ValueError(f"Unknown column '{column}'")
+    
+    #
+    #   Runs an item query (see ItemQuery.build_item_queries) and returns the decoded rows
+    #
+    def read_items(self, cursor, columns, filters, order_by, descending, after, limit, with_position=False):
+        # Encoded fields are filtered on their codes and sorted by their values
+        filters = self.dictionaries.encode_filters(cursor, filters)
+        if order_by != "rowid":
+            order_by = self.dictionaries.sort_expression(cursor, order_by)
+        rows = None
+        for sql, params in build_item_queries(self.items_table, columns, filters, order_by, descending, after, limit, with_position):
+            cursor.execute(sql, params)
+            if rows is None:
+                rows = RowSet.from_cursor(cursor)
+            else:
+                rows.rows.extend(cursor.fetchall())
+            if limit is not None and len(rows) >= limit:
+                rows.rows = rows.rows[:limit]
+                break
+        return self.dictionaries.decode(cursor, rows)
+    
+    #
+    #   Returns the number of items matching the filters (all items by default)
+    #
+    def count_items(self, filters=None):
+        known_columns = self.item_columns()
+        for column in filters or {}:
+            if column not in known_columns:
+                raise ValueError(f"Unknown column '{column}'")
+        cursor = self.read_cursor()
+        sql, params = build_count_query(self.items_table, self.dictionaries.encode_filters(cursor, filters))
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+    
+    #
+    #   Yields DataFrames of at most page_size items, read page by page with keyset pagination (see fetch_page)
+    #
+    def iter_items(self, columns=None, filters=None, order_by="id", descending=False, page_size=1000):
+        after = None
+        while True:
+            page, after = self.fetch_page(columns, filters, order_by, descending, after, page_size)
+            if page.empty:
+                return
+            yield page.to_dataframe()
+            if after is None:
+                return
+
+    #
+    #   This function searches the database for items that match the query
+    #
+    def search_items(self, fields, query):
+        return self.fetch_search_results(fields, query).to_dataframe()
+    
+    #
+    #   Same as search_items, returns a RowSet
+    #
+    def fetch_search_results(self, fields, query):
+        cursor = self.read_cursor()
+        # If no fields are selected, return an empty result (with the field columns)
+        if not fields:
+            return RowSet(self.item_columns(), [])
+
+        # Make List for conditions and parameters
+        conditions = []
+        params = []
+        # Iterate over each column name (field)
+        for field in fields:
+            # Encoded fields search their value table
+            conditions.append(self.dictionaries.search_condition(cursor, field))
+            # '%' is a wildcard, and means we can match any occurence of the query (ex. "23" in "1234")
+            params.append(f"%{query}%")
+            
+        # Make final SQL query with all conditions
+        sql = (f"SELECT * FROM {self.items_table} WHERE " + " OR ".join(conditions))
+        
+        # Execute SQL query and get results
+        cursor.execute(sql, params)
+        
+        # Return the search result items with the extracted column names
+        return self.dictionaries.decode(cursor, RowSet.from_cursor(cursor))
+    
+    #
+    #   Runs a search box query (see QueryLanguage), ex. 'brand:sony price<200 "noise cancelling"', returns a RowSet
+    #       - fields: the fields searched by words and phrases, all fields by default
+    #       - filters: ItemQuery filters the items must match as well (ex. the checked facets)
+    #       - order_by / descending: sort column and direction, table order by default
+    #       - Raises QuerySyntaxError (a ValueError) for a query that cannot be read or names an unknown field
+    #
+    def fetch_query_results(self, query, fields=None, filters=None, limit=None, order_by=None, descending=False):
+        known_columns = self.item_columns()
+        for column in list(fields or []) + list(filters or {}) + ([order_by] if order_by else []):
+            if column not in known_columns:
+                raise ValueError(f"Unknown column '{column}'")
+        validation_types = {info['field_name']: info['validation_type'] for info in self.get_field_info() or []}
+        field_types = {column: validation_types.get(column, "string") for column in known_columns}
+        
+        cursor = self.read_cursor()
+        encoded = {field: self.dictionaries.value_table(field) for field in self.dictionaries.fields(cursor)}
+        where, params = compile_query(parse_query(query), field_types, known_columns if fields is None else list(fields), encoded)
+        conditions, filter_params = build_filters(self.dictionaries.encode_filters(cursor, filters))
+        
+        # Table order like the other searches, unless sorted on a column (ties in table order)
+        direction = "DESC" if descending else "ASC"
+        order = f"rowid {direction}"
+        if order_by:
+            order = f"{self.dictionaries.sort_expression(cursor, order_by)} {direction}, " + order
+        sql = f"SELECT * FROM {self.items_table} WHERE " + " AND ".join([where] + conditions) + f" ORDER BY {order}"
+        params += filter_params
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        cursor.execute(sql, params)
+        return self.dictionaries.decode(cursor, RowSet.from_cursor(cursor))
+        
+    def update_item(self, item_id, new_data):
+        # Create the SET query dynamically (e.g. "name=?, price=?, ...")
+        set_clause = ", ".join([f"{column}=?" for column in new_data])
+        
+        try:
+            with self.transaction():
+                # Check if the ID is being updated (so the linking images in the image table have their key updated)
+                new_id = new_data.get("id")
+                old_quantity = None
+                if "quantity" in new_data:
+                    self.cursor.execute(f"SELECT quantity FROM {self.items_table} WHERE id=?", (item_id,))
+                    row = self.cursor.fetchone()
+                    old_quantity = row[0] if row else None
+                if new_id and new_id != item_id:
+                    # Update the product ID in the images table first
+                    self.cursor.execute(f"UPDATE {self.images_table} SET product_id=? WHERE product_id=?", (new_id, item_id))
+                
+                # Execute update statement (encoded fields are stored as codes)
+                sql = f"UPDATE {self.items_table} SET {set_clause} WHERE id=?"
+                self.cursor.execute(sql, list(self.dictionaries.encode_record(self.cursor, new_data).values()) + [item_id])
+                
+                # Edits of the quantity (ex. after a stock count) go to the ledger as well
+                try:
+                    new_quantity = int(new_data["quantity"]) if old_quantity is not None else None
+                except (TypeError, ValueError):
+                    new_quantity = None
+                if new_quantity is not None and new_quantity != old_quantity:
+                    StockLedger(self).record([(new_id or item_id, new_quantity - int(old_quantity), new_quantity, "edit")])
+                self.publish_change(ITEM_UPDATED, [new_id or item_id], renamed={item_id: new_id} if new_id and new_id != item_id else None)
+            
+            # LOG MESSAGE
+            self.log_message(f"Item Modified: id:{str(item_id)}, new_data:{str(new_data)}")
+            
+            return True
+        except Exception as e:
+            print(f"Error updating item: {e}")
+            return False
+        
+        
+    #
+    #    This function returns a dataframe of the result of the list of ids it was given
+    #       - Rows come back in the order of the ids, missing ids are left out
+    #
+    def get_products_by_id(self, ids):
+        try:
+            return self.fetch_products_by_id(ids).to_dataframe()
+        except Exception as e:
+            self.log_message(f"Error retrieving products by IDs: {str(e)}")
+            raise e
+    
+    #
+    #   Bulk id lookup, returns a RowSet without building a DataFrame
+    #       - Rows are in the order of the ids (repeated ids are looked up once), missing ids are left out
+    #       - Short lists are looked up with IN lists of ID_CHUNK_SIZE ids, long lists are passed as one
+    #         JSON array and joined against the id index, so any number of ids works
+    #       - with_rowid: the first column is the rowid (see fetch_all_items)
+    #
+    def fetch_products_by_id(self, ids, with_rowid=False):
+        # Ids are stored as text, the AI and imports may pass numbers
+        ids = list(dict.fromkeys(str(item_id) for item_id in ids))
+        cursor = self.read_cursor()
+        if not ids:
+            # Columns of the table, an empty lookup does not run a query
+            return RowSet((["rowid"] if with_rowid else []) + self.item_columns(), [])
+        
+        if len(ids) > ID_LOOKUP_JOIN_THRESHOLD:
+            cursor.execute(f"SELECT {'p.rowid, ' if with_rowid else ''}p.* FROM json_each(?) AS j JOIN {self.items_table} AS p ON p.id = j.value ORDER BY j.key", (json.dumps(ids),))
+            return self.dictionaries.decode(cursor, RowSet.from_cursor(cursor))
+        
+        # Every chunk reads the same snapshot of the table
+        own_transaction = not cursor.connection.in_transaction
+        if own_transaction:
+            cursor.execute("BEGIN")
+        try:
+            found = {}
+            for start in range(0, len(ids), ID_CHUNK_SIZE):
+                chunk = ids[start:start + ID_CHUNK_SIZE]
+                placeholders = ", ".join(["?"] * len(chunk))
+                cursor.execute(f"SELECT {'rowid, ' if with_rowid else ''}* FROM {self.items_table} WHERE id IN ({placeholders})", chunk)
+                columns = [desc[0] for desc in cursor.description]
+                id_index = columns.index("id")
+                for row in cursor.fetchall():
+                    found.setdefault(str(row[id_index]), []).append(row)
+            rows = self.dictionaries.decode(cursor, RowSet(columns, [row for item_id in ids for row in found.get(item_id, [])]))
+        finally:
+            if own_transaction:
+                cursor.execute("COMMIT")
+        return rows
+        
+        
+    #
+    #   This function is temporary for testing, it simply clears the 'products' table of the database
+    #   You can also just delete the database file for a fresh start
+    #
+    def clear_database(self):
+        # Show confirmation dialog using PyQt6
+        if self.account_exists():
+            password, ok = QInputDialog.getText(
+                None, "Confirm Password", "Enter your password to clear the database:", QLineEdit.EchoMode.Password
+            )
+            if not ok:
+                return False
+
+            # Verify password
+            if password != self.password:
+                QMessageBox.critical(None, "Authentication Failed", "The password you entered is incorrect.")
+                return False
+
+
+        # Show confirmation dialog
+        confirm = QMessageBox.question(
+            None, "Confirm", "Are you sure you want to clear the database? This action will delete all inventory data and custom fields.",)
+        
+        
+        if confirm == QMessageBox.StandardButton.Yes:
+            try:
+                # Everything is cleared in one transaction, a failure leaves the database as it was
+                with self.transaction():
+                    # Drop the products table completely instead of just deleting rows
+                    self.cursor.execute(f"DROP TABLE IF EXISTS {self.items_table}")
+                    self.cursor.execute(f"DROP TABLE IF EXISTS {self.images_table}")
+                    self.cursor.execute(f"DELETE FROM {self.movements_table}")
+                    self.dictionaries.reset(self.cursor)
+                    
+                    # Clear custom fields (but keep the built-in fields)
+                    built_in_fields = ["brand", "category", "description", "id", "name", "price", "quantity"]
+                    placeholders = ", ".join(["?" for _ in built_in_fields])
+                    self.cursor.execute(f"DELETE FROM {self.fields_table} WHERE field_name NOT IN ({placeholders})", built_in_fields)
+                    
+                    # Recreate the products table with the remaining fields
+                    self.create_products_table()
+                    self.create_images_table()
+                    # Restore the indexes and change triggers the migrations added to the old tables
+                    self.migrator.reapply()
+                    self.change_log.install(self.cursor)
+                    self.publish_change(ITEMS_RELOADED)
+                # External payloads are only deleted once no committed row points at them
+                self.blob_store.clear()
+                QMessageBox.information(None, "Success", "Database cleared, all inventory data and custom fields have been deleted.")
+                # LOG MESSAGE
+                self.log_message("Database Cleared! (Items and custom fields)")
+                return True
+            except Exception as e:
+                QMessageBox.critical(None, "Error", f"Failed to clear database: {str(e)}")
+                print(f"Error clearing database: {str(e)}")
+                return False
+        return False
+
+    def remove_field_from_database(self, field_name):
+        try:
+            # The column, the field entry and the change triggers change together, or not at all
+            with self.transaction():
+                # check if field exists
+                self.cursor.execute(f"SELECT COUNT(*) FROM {self.fields_table} WHERE field_name=?", (field_name,))
+                if self.cursor.fetchone()[0] == 0:
+                    raise ValueError(f"Field '{field_name}' does not exist")
+
+                # Drop the column in place where possible, otherwise rebuild the table with its types and indexes
+                # (the change triggers use the column, they are recreated without it afterwards)
+                with self.change_log.suspended():
+                    result = SchemaChangeEngine(self.conn, self.log_message).drop_column(self.items_table, field_name)
+
+                # Remove field from the fields table once the column is gone (with its value table if it was encoded)
+                self.cursor.execute(f"DELETE FROM {self.fields_table} WHERE field_name=?", (field_name,))
+                self.cursor.execute(f"DROP TABLE IF EXISTS {self.dictionaries.value_table(field_name)}")
+            self.dictionaries.invalidate()
+            self.publish_change(FIELD_REMOVED, field=field_name)
+            self.log_message(f"Field Removed: field_name:{str(field_name)}, method:{result['method']}, seconds:{result['seconds']:.3f}")
+            return True
+        except Exception as e:
+            self.log_message(f"ERROR: Field Removal Attempted: field_name:{str(field_name)}")
+            raise e
+
+    #
+    #   Turns dictionary encoding of a text field on or off (see FieldDictionaries)
+    #       - On:  the distinct values move to a value table and the column stores their INTEGER codes, indexed
+    #       - Off: the column stores the text again and the value table is dropped
+    #       - Reads and writes through DatabaseSystem keep using the text values either way
+    #   The column is swapped in three steps (new column, drop old, rename) in one transaction, so no
+    #   other write can run in between and a failure leaves the field as it was.
+    #
+    def set_field_dictionary(self, field_name, enabled=True):
+        info = self.get_field_info(field_name)
+        if info is None:
+            raise ValueError(f"Field '{field_name}' does not exist")
+        if field_name == "id" or info['validation_type'] != "string":
+            raise ValueError(f"Field '{field_name}' cannot be dictionary encoded, only text fields other than id can")
+        if (field_name in self.dictionaries.fields(self.cursor)) == enabled:
+            return False
+
+        new_column = f"{field_name}__dictionary"
+        try:
+            # Every row is rewritten, the change log records one schema change instead of an update per item
+            with self.change_log.suspended():
+                if enabled:
+                    self.dictionaries.encode_column(self.cursor, field_name, new_column)
+                else:
+                    self.dictionaries.decode_column(self.cursor, field_name, new_column)
+                # Drops the old column and its indexes
+                SchemaChangeEngine(self.conn, self.log_message).drop_column(self.items_table, field_name)
+                self.cursor.execute(f"ALTER TABLE {self.items_table} RENAME COLUMN {new_column} TO {field_name}")
+                self.cursor.execute(f"CREATE INDEX IF NOT EXISTS {self.items_table}_{field_name} ON {self.items_table}({field_name})")
+                self.cursor.execute(f"UPDATE {self.fields_table} SET dictionary=? WHERE field_name=?", (int(enabled), field_name))
+                if not enabled:
+                    self.cursor.execute(f"DROP TABLE IF EXISTS {self.dictionaries.value_table(field_name)}")
+            self.dictionaries.invalidate()
+            # The values are the same, but the column was replaced
+            self.publish_change(ITEMS_RELOADED)
+            self.log_message(f"Field Dictionary {'Enabled' if enabled else 'Disabled'}: field_name:{str(field_name)}")
+            return True
+        except Exception as e:
+            self.dictionaries.invalidate()
+            self.log_message(f"ERROR: Field Dictionary Change Attempted: field_name:{str(field_name)}, enabled:{enabled}, error:{str(e)}")
+            raise e
+
+    #
+    #   Returns the sorted distinct values of a field used by at least one item (ex. for a category filter)
+    #
+    def get_distinct_values(self, field_name):
+        if field_name not in self.item_columns():
+            raise ValueError(f"Unknown column '{field_name}'")
+        return self.dictionaries.distinct_values(self.read_cursor(), field_name)
+
+    #
+    #   Returns the facets of the inventory view as {field: "values" or "ranges"}
+    #       - category and brand count their values, int and float fields (built-in or custom) count ranges
+    #
+    def facet_fields(self):
+        facets = {}
+        for info in self.get_field_info() or []:
+            if info['field_name'] in ("category", "brand"):
+                facets[info['field_name']] = "values"
+            elif info['validation_type'] in ("int", "float"):
+                facets[info['field_name']] = "ranges"
+        return facets
+
+    #
+    #   Returns {field: [(label, condition, count), ...]} for the facets and selected filters (see FacetCounts)
+    #       - facets: {field: "values" or "ranges"}, facet_fields() by default
+    #       - filters: ItemQuery filters, ex. {"category": ("in", ["Audio"]), "price": ("range", (0, 20))}
+    #
+    def get_facet_counts(self, facets=None, filters=None, limit=None, buckets=DEFAULT_BUCKETS):
+        facets = self.facet_fields() if facets is None else facets
+        known_columns = self.item_columns()
+        for column in list(facets) + list(filters or {}):
+            if column not in known_columns:
+                raise ValueError(f"Unknown column '{column}'")
+        return self.facets().facet_counts(facets, filters, limit, buckets)
+
+    # Method to get field information including required status
+    def get_field_info(self, field_name=None):
+        """Get information about fields including their required status"""
+        cursor = self.read_cursor()
+        try:
+            if field_name:
+                cursor.execute(f"SELECT field_name, entry_type, validation_type, required FROM {self.fields_table} WHERE field_name=?", (field_name,))
+                result = cursor.fetchone()
+                if result:
+                    return {
+                        'field_name': result[0],
+                        'entry_type': result[1],
+                        'validation_type': result[2],
+                        'required': bool(result[3])  # Convert 0/1 to False/True
+                    }
+                return None
+            else:
+                cursor.execute(f"SELECT field_name, entry_type, validation_type, required FROM {self.fields_table}")
+                results = cursor.fetchall()
+                return [{
+                    'field_name': row[0],
+                    'entry_type': row[1],
+                    'validation_type': row[2],
+                    'required': bool(row[3])  # Convert 0/1 to False/True
+                } for row in results]
+        except Exception as e:
+            print(f"Error getting field info: {str(e)}")
+            return [] if field_name is None else None
@@ -0,0 +1,168 @@
+import math
+import threading
+from database.ChangeLog import FollowTimer
+from database.ItemQuery import build_filters
+
+#   FacetCounts Class
+#
+#   Counts for the facet panels of the inventory view, computed with grouped SQL queries:
+#       - value facets (ex. category, brand): number of items per distinct value
+#       - range facets (ex. price, quantity): number of items per bucket of equal width between the
+#         smallest and largest value of the whole table, so the buckets stay put while filters change
+#
+#   Facets combine like the filters of a shop: the counts of a facet use every filter except its
+#   own, so the other values of a facet stay visible (and countable) after one is selected.
+#   Results are cached per data version, the version moves on every committed change reported by
+#   DatabaseSystem.add_change_listener or found in the change log (changes of other processes, see
+#   ChangeLog). Selecting a value therefore only recounts the facets whose
+#   filters changed, the facet that was clicked is answered from the cache.
+#
+#   Every facet returns a list of (label, condition, count), where condition is the ItemQuery
+#   filter condition that selects the items of the value or bucket.
+#
+
+# Buckets of a range facet
+DEFAULT_BUCKETS = 5
+
+
+#
+#   Returns a hashable version of a filters dictionary (for the cache keys)
+#
+def freeze(filters):
+    def frozen(value):
+        if isinstance(value, (list, tuple, set)):
+            return tuple(frozen(item) for item in value)
+        return value
+    return tuple(sorted((column, frozen(condition)) for column, condition in (filters or {}).items()))
+
+
+#
+#   Formats a bucket edge for a label (5.0 -> "5", 2.333333 -> "2.33")
+#
+def format_edge(value):
+    value = round(value, 2)
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+class FacetCounts:
+    def __init__(self, database):
+        self.database = database
+        self.lock = threading.RLock()
+        self.version = 0
+        self.cache = {}
+        # Last change log entry seen, later entries start a new version
+        self.change_seq = self.database.change_log.latest()
+        self.follow_timer = FollowTimer()
+
+    #
+    #   Change listener registered with DatabaseSystem, any change starts a new data version
+    #
+    def items_changed(self, item_ids=None):
+        with self.lock:
+            self.version += 1
+            self.cache = {}
+
+    def cached(self, key, compute):
+        with self.lock:
+            if self.follow_timer.due():
+                self.change_seq = self.database.change_log.follow(self.change_seq, self.items_changed)
+            key = (self.version,) + key
+            if key not in self.cache:
+                self.cache[key] = compute()
+            return self.cache[key]
+
+    #
+    #   Returns the WHERE clause and params of the filters (encoded fields are matched on their codes)
+    #
+    def where(self, cursor, filters, extra=()):
+        conditions, params = build_filters(self.database.dictionaries.encode_filters(cursor, filters))
+        conditions = list(extra) + conditions
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    #
+    #   Counts per value of a field, largest first, limited to the first limit values
+    #
+    def value_counts(self, field, filters=None, limit=None):
+        return self.cached(("values", field, freeze(filters), limit), lambda: self.count_values(field, filters, limit))
+
+    def count_values(self, field, filters, limit):
+        cursor = self.database.read_cursor()
+        where, params = self.where(cursor, filters, [f"{field} IS NOT NULL"])
+        sql = f"SELECT {field}, COUNT(*) AS items FROM {self.database.items_table}{where} GROUP BY {field} ORDER BY items DESC, {field}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+        if field in self.database.dictionaries.fields(cursor):
+            values = self.database.dictionaries.values(cursor, field, {row[0] for row in rows})
+            rows = [(values.get(code), count) for code, count in rows]
+        return [(str(value), value, count) for value, count in rows]
+
+    #
+    #   Smallest and largest numeric value of a field over the whole table (None when there are none)
+    #
+    def bounds(self, field):
+        def compute():
+            cursor = self.database.read_cursor()
+            cursor.execute(f"SELECT MIN({field}), MAX({field}) FROM {self.database.items_table} WHERE typeof({field}) IN ('integer', 'real')")
+            low, high = cursor.fetchone()
+            return None if low is None else (low, high)
+        return self.cached(("bounds", field), compute)
+
+    #
+    #   Counts per bucket of a numeric field, empty buckets included
+    #       - Integer fields get whole number edges
+    #       - The last bucket includes the largest value
+    #
+    def range_counts(self, field, filters=None, buckets=DEFAULT_BUCKETS):
+        return self.cached(("ranges", field, freeze(filters), buckets), lambda: self.count_ranges(field, filters, buckets))
+
+    def count_ranges(self, field, filters, buckets):
+        bounds = self.bounds(field)
+        if bounds is None:
+            return []
+        low, high = bounds
+        if isinstance(low, int) and isinstance(high, int):
+            width = max(1, math.ceil((high - low + 1) / buckets))
+        else:
+            width = (high - low) / buckets or 1.0
+        buckets = min(buckets, math.floor((high - low) / width) + 1)
+
+        cursor = self.database.read_cursor()
+        where, params = self.where(cursor, filters, [f"typeof({field}) IN ('integer', 'real')"])
+        cursor.execute(f'''
+            SELECT MIN(CAST(({field} - ?) / ? AS INTEGER), ?) AS bucket, COUNT(*)
+            FROM {self.database.items_table}{where}
+            GROUP BY bucket
+        ''', [low, width, buckets - 1] + params)
+        counts = dict(cursor.fetchall())
+
+        result = []
+        for bucket in range(buckets):
+            start = low + bucket * width
+            last = bucket == buckets - 1
+            end = None if last else start + width
+            if isinstance(width, int):
+                label = f"{start} - {high if last else end - 1}"
+            else:
+                label = f"{format_edge(start)} - {format_edge(high if last else end)}"
+            result.append((label, ("range", (start, end)), counts.get(bucket, 0)))
+        return result
+
+    #
+    #   Returns {field: counts} of several facets for the selected filters
+    #       - facets: {field: "values" or "ranges"}
+    #       - filters: the filters of every facet (and any others), each facet ignores its own
+    #
+    def facet_counts(self, facets, filters=None, limit=None, buckets=DEFAULT_BUCKETS):
+        filters = dict(filters or {})
+        counts = {}
+        for field, kind in facets.items():
+            others = {column: condition for column, condition in filters.items() if column != field}
+            if kind == "ranges":
+                counts[field] = self.range_counts(field, others, buckets)
+            else:
+                counts[field] = self.value_counts(field, others, limit)
+        return counts
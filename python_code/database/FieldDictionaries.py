@@ -0,0 +1,199 @@
+import sqlite3
+from database.ItemQuery import parse_condition
+from database.Rows import RowSet
+
+#   FieldDictionaries Class
+#
+#   Dictionary encoding of low-cardinality text fields (ex. category, brand), opted in per field with
+#   the dictionary flag of the fields table (see DatabaseSystem.set_field_dictionary):
+#       - Every distinct value is stored once in a value table, {items}_{field}_values (code, value)
+#       - The items table stores the INTEGER code of the value in the field's column, which is indexed
+#       - Reads decode the codes back to values and writes encode values (adding new ones), so callers
+#         of DatabaseSystem keep seeing and passing text
+#       - Filters on an encoded field are turned into conditions on the codes, so a category filter is
+#         an integer comparison on the index
+#
+#   Codes are never reused or changed while a field stays encoded, so decoded values can be cached.
+#   Caches are only filled from committed data, so a rolled back value never reaches them.
+#
+
+class FieldDictionaries:
+    def __init__(self, items_table, fields_table):
+        self.items_table = items_table
+        self.fields_table = fields_table
+        # Encoded field names, and {field: {code: value}} (None / missing until first use)
+        self.field_cache = None
+        self.value_cache = {}
+
+    def value_table(self, field):
+        return f"{self.items_table}_{field}_values"
+
+    #
+    #   Forgets the cached fields and values (after a field is encoded or decoded)
+    #
+    def invalidate(self):
+        self.field_cache = None
+        self.value_cache = {}
+
+    #
+    #   Returns the set of encoded fields
+    #
+    def fields(self, cursor):
+        fields = self.field_cache
+        if fields is not None:
+            return fields
+        try:
+            cursor.execute(f"SELECT field_name FROM {self.fields_table} WHERE dictionary = 1")
+            fields = {row[0] for row in cursor.fetchall()}
+        except sqlite3.OperationalError:
+            # The dictionary column is added by schema migration 5
+            fields = set()
+        if not cursor.connection.in_transaction:
+            self.field_cache = fields
+        return fields
+
+    #
+    #   Returns {code: value} of an encoded field, re-read when a code is missing (ex. added by another process)
+    #
+    def values(self, cursor, field, codes=()):
+        values = self.value_cache.get(field)
+        if values is None or any(code is not None and code not in values for code in codes):
+            cursor.execute(f"SELECT code, value FROM {self.value_table(field)}")
+            values = dict(cursor.fetchall())
+            if not cursor.connection.in_transaction:
+                self.value_cache[field] = values
+        return values
+
+    #
+    #   Replaces the codes of the encoded columns of a RowSet by their values
+    #
+    def decode(self, cursor, rows):
+        fields = [field for field in self.fields(cursor) if field in rows.index]
+        if not fields or not rows.rows:
+            return rows
+
+        decoders = []
+        for field in fields:
+            position = rows.index[field]
+            decoders.append((position, self.values(cursor, field, {row[position] for row in rows.rows})))
+
+        decoded = []
+        for row in rows.rows:
+            row = list(row)
+            for position, values in decoders:
+                if row[position] is not None:
+                    row[position] = values.get(row[position])
+            decoded.append(tuple(row))
+        return RowSet(rows.columns, decoded)
+
+    #
+    #   Returns the code of a value, adding the value if it is new (inside the caller's write transaction)
+    #
+    def encode_value(self, cursor, field, value):
+        if value is None:
+            return None
+        value_table = self.value_table(field)
+        cursor.execute(f"INSERT OR IGNORE INTO {value_table} (value) VALUES (?)", (value,))
+        cursor.execute(f"SELECT code FROM {value_table} WHERE value = ?", (value,))
+        return cursor.fetchone()[0]
+
+    #
+    #   Encodes the values of a {field: value} record for an INSERT or UPDATE
+    #
+    def encode_record(self, cursor, record):
+        fields = self.fields(cursor)
+        return {field: self.encode_value(cursor, field, value) if field in fields else value for field, value in record.items()}
+
+    #
+    #   Returns the codes of the values matching an SQL condition on the value table, ex. ("like", "%audio%")
+    #
+    def matching_codes(self, cursor, field, operator, value):
+        cursor.execute(f"SELECT code FROM {self.value_table(field)} WHERE value {operator.upper()} ?", (value,))
+        return [row[0] for row in cursor.fetchall()]
+
+    #
+    #   Rewrites filters on encoded fields into filters on their codes (see ItemQuery)
+    #
+    def encode_filters(self, cursor, filters):
+        fields = self.fields(cursor)
+        if not filters or not fields.intersection(filters):
+            return filters
+
+        encoded = {}
+        for column, condition in filters.items():
+            if column not in fields:
+                encoded[column] = condition
+                continue
+            operator, value = parse_condition(condition)
+            if operator in ("=", "!="):
+                codes = self.matching_codes(cursor, column, "=", value)
+                # -1 is never a code, so an unknown value matches nothing
+                encoded[column] = (operator, codes[0] if codes else -1)
+            elif operator in ("in", "not in"):
+                codes = [code for item in value for code in self.matching_codes(cursor, column, "=", item)]
+                encoded[column] = (operator, codes)
+            elif operator in ("like", "<", "<=", ">", ">="):
+                encoded[column] = ("in", self.matching_codes(cursor, column, operator, value))
+            else:
+                encoded[column] = condition
+        return encoded
+
+    #
+    #   Returns the SQL expression that sorts an encoded field by its values
+    #
+    def sort_expression(self, cursor, field):
+        if field in self.fields(cursor):
+            return f"(SELECT value FROM {self.value_table(field)} WHERE code = {self.items_table}.{field})"
+        return field
+
+    #
+    #   Returns the SQL condition of a text search (LIKE ?) on a field
+    #
+    def search_condition(self, cursor, field):
+        if field in self.fields(cursor):
+            return f"{field} IN (SELECT code FROM {self.value_table(field)} WHERE value LIKE ?)"
+        return f"{field} LIKE ?"
+
+    #
+    #   Returns the sorted distinct values of a field that are used by at least one item
+    #
+    def distinct_values(self, cursor, field):
+        if field in self.fields(cursor):
+            # One index lookup per distinct value instead of reading the items
+            cursor.execute(f'''
+                SELECT value FROM {self.value_table(field)} AS v
+                WHERE EXISTS (SELECT 1 FROM {self.items_table} WHERE {field} = v.code)
+                ORDER BY value
+            ''')
+        else:
+            cursor.execute(f"SELECT DISTINCT {field} FROM {self.items_table} WHERE {field} IS NOT NULL ORDER BY {field}")
+        return [row[0] for row in cursor.fetchall()]
+
+    #
+    #   Fills the value table of a field and writes the codes into a new INTEGER column (does not commit)
+    #
+    def encode_column(self, cursor, field, code_column):
+        value_table = self.value_table(field)
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {value_table} (code INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)")
+        cursor.execute(f"INSERT OR IGNORE INTO {value_table} (value) SELECT DISTINCT {field} FROM {self.items_table} WHERE {field} IS NOT NULL ORDER BY {field}")
+        cursor.execute(f"ALTER TABLE {self.items_table} ADD COLUMN {code_column} INTEGER")
+        cursor.execute(f"UPDATE {self.items_table} SET {code_column} = (SELECT code FROM {value_table} WHERE value = {self.items_table}.{field})")
+
+    #
+    #   Writes the values of an encoded field into a new TEXT column (does not commit)
+    #
+    def decode_column(self, cursor, field, text_column):
+        cursor.execute(f"ALTER TABLE {self.items_table} ADD COLUMN {text_column} TEXT")
+        cursor.execute(f"UPDATE {self.items_table} SET {text_column} = (SELECT value FROM {self.value_table(field)} WHERE code = {self.items_table}.{field})")
+
+    #
+    #   Drops the value tables and clears every dictionary flag (when the items table is recreated)
+    #
+    def reset(self, cursor):
+        for field in self.fields(cursor):
+            cursor.execute(f"DROP TABLE IF EXISTS {self.value_table(field)}")
+        try:
+            cursor.execute(f"UPDATE {self.fields_table} SET dictionary = 0")
+        except sqlite3.OperationalError:
+            pass
+        self.invalidate()
@@ -0,0 +1,133 @@
+import numpy as np
+from PyQt6.QtGui import QImage
+from PyQt6.QtCore import Qt
+
+#   Perceptual Image Hashing
+#
+#   dHash ("difference hash") of an image:
+#       - The image is converted to grayscale and shrunk to (hash_size + 1) x hash_size pixels
+#       - Each bit records whether a pixel is brighter than its right-hand neighbour
+#   Resized, recompressed or slightly edited copies of a photo produce hashes that differ in only
+#   a few bits, so near-duplicates are found by Hamming distance.
+#
+#   BKTree indexes hashes by Hamming distance so a lookup only visits a small part of the catalog.
+#
+
+HASH_SIZE = 8
+
+
+#
+#   Returns the 64-bit dHash of a QImage, or None if the image is empty
+#
+def dhash_image(image: QImage, hash_size: int = HASH_SIZE):
+    if image is None or image.isNull():
+        return None
+
+    small = image.convertToFormat(QImage.Format.Format_Grayscale8).scaled(
+        hash_size + 1, hash_size,
+        Qt.AspectRatioMode.IgnoreAspectRatio,
+        Qt.TransformationMode.SmoothTransformation)
+
+    # Rows of a QImage are padded to 4 bytes, so only keep the visible width
+    bits = small.constBits()
+    bits.setsize(small.sizeInBytes())
+    pixels = np.frombuffer(bits, dtype=np.uint8).reshape(small.height(), small.bytesPerLine())[:, :small.width()]
+
+    differences = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(differences).tobytes(), "big")
+
+
+#
+#   Returns the dHash of encoded image bytes (png, jpg, ...) or None if they cannot be decoded
+#
+def dhash_bytes(image_data: bytes, hash_size: int = HASH_SIZE):
+    return dhash_image(QImage.fromData(image_data), hash_size)
+
+
+#
+#   Returns the dHash of an image file or None if it cannot be decoded
+#
+def dhash_file(image_path: str, hash_size: int = HASH_SIZE):
+    return dhash_image(QImage(image_path), hash_size)
+
+
+#
+#   SQLite integers are signed 64-bit, so hashes are stored shifted into that range
+#
+def hash_to_sql(image_hash):
+    if image_hash is None:
+        return None
+    return image_hash - (1 << 64) if image_hash >= (1 << 63) else image_hash
+
+
+def hash_from_sql(value):
+    if value is None:
+        return None
+    return value + (1 << 64) if value < 0 else value
+
+
+def hamming_distance(hash_a: int, hash_b: int):
+    return (hash_a ^ hash_b).bit_count()
+
+
+class BKTreeNode:
+    __slots__ = ("image_hash", "items", "children")
+
+    def __init__(self, image_hash, item):
+        self.image_hash = image_hash
+        self.items = [item]
+        # Child nodes keyed by their distance to this node
+        self.children = {}
+
+
+class BKTree:
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    #
+    #   Adds an item (ex. an image ID) under its hash
+    #
+    def add(self, image_hash, item):
+        self.size += 1
+        if self.root is None:
+            self.root = BKTreeNode(image_hash, item)
+            return
+
+        node = self.root
+        while True:
+            distance = hamming_distance(image_hash, node.image_hash)
+            if distance == 0:
+                node.items.append(item)
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = BKTreeNode(image_hash, item)
+                return
+            node = child
+
+    #
+    #   Returns [(distance, item), ...] for every item within max_distance of the hash, closest first
+    #       - By the triangle inequality only children whose edge is within max_distance of the
+    #         query's distance to the node can hold matches, the rest of the tree is skipped
+    #
+    def search(self, image_hash, max_distance):
+        matches = []
+        if self.root is None:
+            return matches
+
+        pending = [self.root]
+        while pending:
+            node = pending.pop()
+            distance = hamming_distance(image_hash, node.image_hash)
+            if distance <= max_distance:
+                matches.extend((distance, item) for item in node.items)
+            for edge, child in node.children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    pending.append(child)
+
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def __len__(self):
+        return self.size
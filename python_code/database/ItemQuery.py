@@ -0,0 +1,130 @@
+#   Item Queries
+#
+#   Builds the SELECT statements of DatabaseSystem.query_items and fetch_page:
+#       - columns:   only the listed columns are read (ex. ["id", "name"] skips the descriptions)
+#       - filters:   {column: value} for equality, or {column: (operator, value)} with an operator
+#                    from FILTER_OPERATORS, ex. {"quantity": ("<=", 5), "category": ("in", ["Audio", "Video"])}
+#                    ("range", (low, high)) selects low <= value < high, None leaves a side open
+#       - order_by:  sort column ("rowid" for the table order), ties (and the pagination) are resolved by rowid
+#       - after:     keyset pagination, the page starts after the row with this sort value and rowid
+#                    (the last row of the previous page), so reading page n does not skip n pages of rows
+#       - limit:     page size
+#
+#   Column names cannot be passed as parameters, so callers check them against the table first.
+#   SQLite sorts NULL first in ascending and last in descending order, the keyset conditions follow that.
+#
+
+FILTER_OPERATORS = {"=", "!=", "<", "<=", ">", ">=", "like", "in", "not in", "is null", "is not null", "range"}
+
+# Rows per page of the inventory table (see DatabaseSystem.fetch_page)
+PAGE_SIZE = 200
+
+
+#
+#   Splits a filter condition into (operator, value), a plain value means equality
+#
+def parse_condition(condition):
+    if isinstance(condition, tuple):
+        return condition[0].lower(), condition[1] if len(condition) > 1 else None
+    return "=", condition
+
+
+#
+#   Returns (where clause, params) for the filters, raises ValueError for unknown operators
+#
+def build_filters(filters):
+    conditions = []
+    params = []
+    for column, condition in (filters or {}).items():
+        operator, value = parse_condition(condition)
+        if operator not in FILTER_OPERATORS:
+            raise ValueError(f"Unknown filter operator '{operator}'")
+
+        if operator in ("is null", "is not null"):
+            conditions.append(f"{column} {operator.upper()}")
+        elif operator in ("in", "not in"):
+            values = list(value)
+            if not values:
+                # Nothing is IN an empty list, everything is NOT IN it
+                conditions.append("0" if operator == "in" else "1")
+                continue
+            conditions.append(f"{column} {operator.upper()} ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        elif operator == "range":
+            low, high = value
+            bounds = []
+            if low is not None:
+                bounds.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                bounds.append(f"{column} < ?")
+                params.append(high)
+            conditions.append("(" + " AND ".join(bounds) + ")" if bounds else f"{column} IS NOT NULL")
+        else:
+            conditions.append(f"{column} {operator.upper()} ?")
+            params.append(value)
+    return conditions, params
+
+
+#
+#   Returns the rows after (value, rowid) in the given order as [(condition, params), ...], ranges that
+#   are read one after the other
+#       - The rowid is unique and never changes, so ties are read exactly once
+#       - A row value comparison, (column, rowid) > (?, ?), lets SQLite start reading an index on the
+#         sort column (whose entries end with the rowid) right after the previous page
+#       - Missing values (NULL) are their own range: "... OR column IS NULL" in the same condition
+#         would make SQLite scan the index from the start instead
+#
+def build_keyset(order_by, descending, value, rowid):
+    if order_by == "rowid":
+        return [(("rowid < ?" if descending else "rowid > ?"), [rowid])]
+    if descending:
+        if value is None:
+            return [(f"{order_by} IS NULL AND rowid < ?", [rowid])]
+        return [(f"({order_by}, rowid) < (?, ?)", [value, rowid]), (f"{order_by} IS NULL", [])]
+    if value is None:
+        return [(f"{order_by} IS NULL AND rowid > ?", [rowid]), (f"{order_by} IS NOT NULL", [])]
+    return [(f"({order_by}, rowid) > (?, ?)", [value, rowid])]
+
+
+#
+#   Returns [(sql, params), ...] of a projected, filtered, ordered and paginated read of the items table
+#       - The statements are run in order until limit rows are read (only a page continuing after the
+#         previous one can have more than one, see build_keyset)
+#       - after is (sort value, rowid) of the last row already read
+#       - with_position adds the sort value and the rowid as the last two columns (the next page's after)
+#
+def build_item_queries(table, columns=None, filters=None, order_by="id", descending=False, after=None, limit=None, with_position=False):
+    conditions, params = build_filters(filters)
+    ranges = [(None, [])] if after is None else build_keyset(order_by, descending, after[0], after[1])
+
+    direction = "DESC" if descending else "ASC"
+    order = f"rowid {direction}" if order_by == "rowid" else f"{order_by} {direction}, rowid {direction}"
+    selected = ", ".join(columns) if columns else "*"
+    if with_position:
+        selected += f", {order_by} AS sort_value, rowid AS sort_rowid"
+
+    queries = []
+    for condition, keyset_params in ranges:
+        where = conditions + ([condition] if condition else [])
+        sql = f"SELECT {selected} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}"
+        query_params = params + keyset_params
+        if limit is not None:
+            sql += " LIMIT ?"
+            query_params.append(int(limit))
+        queries.append((sql, query_params))
+    return queries
+
+
+#
+#   Returns (sql, params) counting the items that match the filters
+#
+def build_count_query(table, filters=None):
+    conditions, params = build_filters(filters)
+    sql = f"SELECT COUNT(*) FROM {table}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql, params
@@ -0,0 +1,200 @@
+import csv
+import io
+import json
+from database.StockLedger import StockLedger
+from database.ChangeEvents import ITEM_UPDATED
+
+#   Pick Lists
+#
+#   Applies many stock changes at once, ex. the end-of-day sales of every register:
+#       - parse_pick_list reads "id, count" lines (comma, tab or space separated). A line with only an
+#         id counts as one unit, so a barcode scanner can type one line per scanned item
+#       - PickListEngine checks every line against the current stock with a single query, applies the
+#         lines in one transaction and returns a PickListReport with the outcome of every line
+#
+#   In removal mode (the default) counts are taken out of stock, "+5" puts 5 back.
+#   Lines are checked in order, so an item picked on several lines needs enough stock for all of them.
+#
+
+# Line outcomes
+OK = "ok"
+INVALID = "invalid"
+NOT_FOUND = "not found"
+INSUFFICIENT = "insufficient stock"
+SKIPPED = "not applied"
+
+
+class PickLine:
+    def __init__(self, line_number, item_id, delta, status=OK, quantity=None, message=""):
+        self.line_number = line_number
+        self.item_id = item_id
+        self.delta = delta
+        self.status = status
+        # Quantity of the item after this line
+        self.quantity = quantity
+        self.message = message
+
+    def __repr__(self):
+        return f"PickLine({self.line_number}, {self.item_id!r}, {self.delta}, {self.status!r})"
+
+
+class PickListReport:
+    def __init__(self, lines, applied):
+        self.lines = lines
+        # False when nothing was changed because a line failed (see PickListEngine.apply)
+        self.applied = applied
+
+    def failed(self):
+        return [line for line in self.lines if line.status not in (OK, SKIPPED)]
+
+    #
+    #   Returns the total change per item of the lines that were applied
+    #
+    def changes(self):
+        changes = {}
+        if self.applied:
+            for line in self.lines:
+                if line.status == OK:
+                    changes[line.item_id] = changes.get(line.item_id, 0) + line.delta
+        return changes
+
+    def summary(self):
+        applied = sum(1 for line in self.lines if line.status == OK) if self.applied else 0
+        return f"lines:{len(self.lines)}, applied:{applied}, failed:{len(self.failed())}"
+
+    def to_csv(self):
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(["line", "id", "delta", "status", "quantity", "message"])
+        for line in self.lines:
+            writer.writerow([line.line_number, line.item_id, line.delta, line.status,
+                             "" if line.quantity is None else line.quantity, line.message])
+        return output.getvalue()
+
+
+#
+#   Parses pick list text into PickLines, lines that cannot be read are kept with the INVALID status
+#       - Blank lines, comments (#) and a header line ("id,quantity") are ignored
+#
+def parse_pick_list(text, removal=True):
+    lines = []
+    header_allowed = True
+    for line_number, raw in enumerate(text.splitlines(), start=1):
+        raw = raw.strip()
+        if not raw or raw.startswith("#"):
+            continue
+
+        parts = [part.strip() for part in raw.replace("\t", ",").replace(";", ",").split(",") if part.strip()]
+        if len(parts) == 1:
+            parts = raw.split()
+        item_id = parts[0]
+
+        if len(parts) == 1:
+            count = "1"
+        elif len(parts) == 2:
+            count = parts[1]
+        else:
+            lines.append(PickLine(line_number, item_id, 0, INVALID, message="Expected an id and a count."))
+            continue
+
+        try:
+            delta = int(count)
+        except ValueError:
+            if header_allowed:
+                # Header line
+                header_allowed = False
+                continue
+            lines.append(PickLine(line_number, item_id, 0, INVALID, message=f"Invalid count '{count}'."))
+            continue
+
+        header_allowed = False
+        if removal and not count.startswith("+"):
+            delta = -delta
+        lines.append(PickLine(line_number, item_id, delta))
+    return lines
+
+
+def read_pick_list_file(path, removal=True):
+    with open(path, "r", encoding="utf-8-sig") as file:
+        return parse_pick_list(file.read(), removal)
+
+
+#
+#   Turns (id, delta) pairs into PickLines, PickLines are returned unchanged
+#
+def to_pick_lines(entries):
+    lines = []
+    for index, entry in enumerate(entries, start=1):
+        if isinstance(entry, PickLine):
+            lines.append(entry)
+            continue
+        item_id, delta = entry
+        try:
+            lines.append(PickLine(index, str(item_id), int(delta)))
+        except (TypeError, ValueError):
+            lines.append(PickLine(index, str(item_id), 0, INVALID, message=f"Invalid count '{delta}'."))
+    return lines
+
+
+class PickListEngine:
+    def __init__(self, database):
+        self.database = database
+
+    #
+    #   Returns {item_id: quantity} of the given items in one query (missing items are left out)
+    #       - The ids are passed as one JSON array, so the list can be any length
+    #
+    def current_stock(self, item_ids, cursor):
+        cursor.execute(f"SELECT p.id, p.quantity FROM {self.database.items_table} AS p "
+                       "WHERE p.id IN (SELECT value FROM json_each(?))", (json.dumps(list(item_ids)),))
+        return {str(item_id): quantity or 0 for item_id, quantity in cursor.fetchall()}
+
+    #
+    #   Sets the status and resulting quantity of every line against the current stock (changes nothing)
+    #
+    def validate(self, lines, cursor=None):
+        if cursor is None:
+            cursor = self.database.read_cursor()
+        stock = self.current_stock({line.item_id for line in lines if line.status != INVALID}, cursor)
+        for line in lines:
+            if line.status == INVALID:
+                continue
+            if line.item_id not in stock:
+                line.status, line.message = NOT_FOUND, "Item not found."
+                continue
+            if stock[line.item_id] + line.delta < 0:
+                line.status, line.quantity = INSUFFICIENT, stock[line.item_id]
+                line.message = f"Only {stock[line.item_id]} left, cannot remove {-line.delta}."
+                continue
+            stock[line.item_id] += line.delta
+            line.status, line.quantity, line.message = OK, stock[line.item_id], ""
+        return lines
+
+    #
+    #   Checks and applies the lines in one transaction, returns a PickListReport
+    #       - By default nothing is applied if any line fails, with partial=True the valid lines are applied
+    #       - Lines of the same item are combined into one UPDATE
+    #
+    def apply(self, entries, partial=False):
+        lines = to_pick_lines(entries)
+        with self.database.transaction():
+            # Checked while holding the writer, so the stock cannot change before the UPDATE
+            self.validate(lines, self.database.conn.cursor())
+            if any(line.status != OK for line in lines) and not partial:
+                for line in lines:
+                    if line.status == OK:
+                        line.status, line.message = SKIPPED, "Not applied, another line failed."
+                return PickListReport(lines, applied=False)
+
+            report = PickListReport(lines, applied=True)
+            changes = report.changes()
+            # The stock check is repeated by the UPDATE itself, a mismatch undoes the transaction
+            self.database.cursor.executemany(
+                f"UPDATE {self.database.items_table} SET quantity = quantity + ? WHERE id = ? AND quantity >= ?",
+                [(delta, item_id, max(0, -delta)) for item_id, delta in changes.items()])
+            if self.database.cursor.rowcount != len(changes):
+                raise ValueError("Stock changed while the pick list was applied.")
+            StockLedger(self.database).record([(line.item_id, line.delta, line.quantity, "pick list")
+                                               for line in lines if line.status == OK and line.delta])
+            self.database.publish_change(ITEM_UPDATED, changes)
+        return report
@@ -0,0 +1,191 @@
+import bisect
+import threading
+from collections import Counter
+from database.ChangeLog import FollowTimer
+
+#   PrefixIndex Class
+#
+#   Autocomplete for the search and removal views: the distinct values of a few fields (ids, names
+#   and brands by default), each kept as a sorted list of lowercase keys next to a list of the values,
+#   so completing a prefix is a binary search (bisect) followed by reading the next few entries.
+#
+#   Like ColumnStore, the index follows the changes of this process (see DatabaseSystem.add_change_listener)
+#   and of other processes (see ChangeLog): changed items are re-read before the next completion and only
+#   their values move in or out of the lists. A value stays listed while at least one item has it. Schema changes rebuild the index.
+#   Building takes seconds for a million items, complete(wait=False) builds on a background thread
+#   instead and has no completions until it is done, so typing is never blocked.
+#
+
+# Fields completed by default, in the order their completions are listed
+DEFAULT_FIELDS = ("id", "name", "brand")
+
+# Completions returned by default
+DEFAULT_LIMIT = 10
+
+
+#
+#   Returns the indexed text of a value, None for missing values
+#
+def text(value):
+    return None if value is None or value == "" else str(value)
+
+
+class PrefixIndex:
+    def __init__(self, database, fields=DEFAULT_FIELDS):
+        self.database = database
+        self.requested_fields = tuple(fields)
+        self.lock = threading.RLock()
+        # Ids reported as changed since the last completion (see ColumnStore.items_changed)
+        self.pending = set()
+        self.needs_reload = True
+        # Last change log entry applied to the index
+        self.change_seq = 0
+        self.follow_timer = FollowTimer()
+        # Background thread building the index (see complete)
+        self.builder = None
+
+        # Indexed fields that exist in the items table
+        self.fields = []
+        # {field: sorted lowercase keys} and {field: values in the same order}
+        self.keys = {}
+        self.values = {}
+        # {field: {value: number of items with it}}
+        self.counts = {}
+        # {id: values of self.fields}, to take an item's old values out when it changes
+        self.item_values = {}
+
+    def items_changed(self, item_ids=None):
+        with self.lock:
+            if item_ids is None:
+                self.needs_reload = True
+                self.pending = set()
+            elif not self.needs_reload:
+                self.pending.update(str(item_id) for item_id in item_ids)
+
+    def refresh(self):
+        with self.lock:
+            if not self.needs_reload and self.follow_timer.due():
+                self.change_seq = self.database.change_log.follow(self.change_seq, self.items_changed)
+            if self.needs_reload:
+                self.reload()
+            elif self.pending:
+                pending, self.pending = self.pending, set()
+                self.apply_rows(pending, self.database.fetch_products_by_id(list(pending)))
+
+    #
+    #   Starts building the index on a background thread unless it is built or being built
+    #
+    def build_in_background(self):
+        with self.lock:
+            if self.builder is not None or not self.needs_reload:
+                return
+            self.builder = threading.Thread(target=self.build, daemon=True)
+            self.builder.start()
+
+    def build(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error building the prefix index: {str(e)}")
+        finally:
+            self.builder = None
+
+    #
+    #   Rebuilds the index from the items table
+    #
+    def reload(self):
+        with self.lock:
+            self.change_seq = self.database.change_log.latest()
+            table_columns = self.database.item_columns()
+            self.fields = [field for field in self.requested_fields if field in table_columns]
+            rows = self.database.fetch_items(["id"] + [field for field in self.fields if field != "id"])
+
+            columns = [list(map(text, rows.column(field))) for field in self.fields]
+            self.counts = {field: Counter(value for value in values if value is not None) for field, values in zip(self.fields, columns)}
+            self.item_values = dict(zip(map(str, rows.column("id")), zip(*columns)))
+
+            for field in self.fields:
+                self.counts[field] = dict(self.counts[field])
+                ordered = sorted(self.counts[field], key=str.lower)
+                self.values[field] = ordered
+                self.keys[field] = [value.lower() for value in ordered]
+            self.needs_reload = False
+            self.pending = set()
+
+    #
+    #   Moves the values of re-read items into the index, items that were not found were deleted
+    #
+    def apply_rows(self, item_ids, rows):
+        if any(field not in rows.index for field in self.fields):
+            self.reload()
+            return
+        positions = [rows.index[field] for field in self.fields]
+        found = {}
+        for row in rows:
+            found[str(row[rows.index["id"]])] = tuple(text(row[position]) for position in positions)
+
+        for item_id in item_ids:
+            old_values = self.item_values.pop(item_id, None)
+            if old_values is not None:
+                for field, value in zip(self.fields, old_values):
+                    if value is not None:
+                        self.remove(field, value)
+            new_values = found.get(item_id)
+            if new_values is not None:
+                self.item_values[item_id] = new_values
+                for field, value in zip(self.fields, new_values):
+                    if value is not None:
+                        self.add(field, value)
+
+    def add(self, field, value):
+        counts = self.counts[field]
+        counts[value] = counts.get(value, 0) + 1
+        if counts[value] == 1:
+            key = value.lower()
+            position = bisect.bisect_right(self.keys[field], key)
+            self.keys[field].insert(position, key)
+            self.values[field].insert(position, value)
+
+    def remove(self, field, value):
+        counts = self.counts[field]
+        counts[value] -= 1
+        if counts[value] > 0:
+            return
+        del counts[value]
+        keys, values = self.keys[field], self.values[field]
+        # Values that only differ in case share a key
+        position = bisect.bisect_left(keys, value.lower())
+        while values[position] != value:
+            position += 1
+        del keys[position]
+        del values[position]
+
+    #
+    #   Returns up to limit values starting with the prefix (case-insensitive)
+    #       - field: complete one field, otherwise every indexed field in order (duplicates are left out)
+    #       - A field that is not indexed has no completions
+    #       - wait=False does not wait for the index to be (re)built, there are no completions until it is
+    #
+    def complete(self, prefix, field=None, limit=DEFAULT_LIMIT, wait=True):
+        if not wait and (self.needs_reload or self.builder is not None):
+            self.build_in_background()
+            return []
+        self.refresh()
+        key = str(prefix).lower()
+        with self.lock:
+            completions = []
+            seen = set()
+            for name in ([field] if field else self.fields):
+                keys = self.keys.get(name)
+                if keys is None:
+                    continue
+                values = self.values[name]
+                position = bisect.bisect_left(keys, key)
+                while position < len(keys) and len(completions) < limit and keys[position].startswith(key):
+                    if values[position] not in seen:
+                        seen.add(values[position])
+                        completions.append(values[position])
+                    position += 1
+                if len(completions) >= limit:
+                    break
+            return completions
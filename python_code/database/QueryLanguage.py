@@ -0,0 +1,273 @@
+import re
+
+#   Inventory Query Language
+#
+#   The search box accepts small structured queries, ex.
+#       brand:sony price<200 quantity<=5 "noise cancelling"
+#   parse_query turns the text into a tree of Term, Text, And, Or and Not nodes, and
+#   compile_query turns the tree into a parameterized WHERE clause for the items table.
+#
+#   Grammar (AND binds tighter than OR, terms next to each other are ANDed):
+#       query   := or
+#       or      := and ("OR" and)*
+#       and     := unary (["AND"] unary)*
+#       unary   := ("-" | "NOT") unary | "(" or ")" | term
+#       term    := field op value | word | "phrase"
+#       op      := ":" | "=" | "!=" | "<" | "<=" | ">" | ">="
+#
+#   - field:value contains the value on text fields (case-insensitive), equals it on number fields,
+#     and low..high selects a range (ex. price:10..50, either side can be left out)
+#   - field=value is an exact match, the comparisons use the field's order (numbers or text)
+#   - A word or "phrase" must appear in one of the searched fields
+#   - Values with spaces are quoted, ex. category:"power supplies"
+#
+#   Field names are checked against the table's columns before they go into the SQL and every value
+#   is a parameter, so a comparison on an indexed field can use the index.
+#
+
+TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<lparen>\() |
+        (?P<rparen>\)) |
+        (?P<neg>-)(?=[^\s)]) |
+        (?P<field>[A-Za-z_][A-Za-z0-9_]*)(?P<op><=|>=|!=|:|=|<|>)(?P<value>"[^"]*"?|[^\s()"]*) |
+        (?P<phrase>"[^"]*"?) |
+        (?P<word>[^\s()"]+)
+    )''', re.VERBOSE)
+
+
+# How tokens without a value are shown in error messages
+KEYWORDS = {"lparen": "(", "rparen": ")", "neg": "-", "and": "AND", "or": "OR", "not": "NOT"}
+
+
+class QuerySyntaxError(ValueError):
+    pass
+
+
+class Term:
+    def __init__(self, field, operator, value):
+        self.field = field
+        self.operator = operator
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Term) and (self.field, self.operator, self.value) == (other.field, other.operator, other.value)
+
+    def __repr__(self):
+        return f"Term({self.field!r}, {self.operator!r}, {self.value!r})"
+
+
+class Text:
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Text) and self.value == other.value
+
+    def __repr__(self):
+        return f"Text({self.value!r})"
+
+
+class And:
+    def __init__(self, children):
+        self.children = children
+
+    def __eq__(self, other):
+        return isinstance(other, And) and self.children == other.children
+
+    def __repr__(self):
+        return f"And({self.children!r})"
+
+
+class Or:
+    def __init__(self, children):
+        self.children = children
+
+    def __eq__(self, other):
+        return isinstance(other, Or) and self.children == other.children
+
+    def __repr__(self):
+        return f"Or({self.children!r})"
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+
+    def __eq__(self, other):
+        return isinstance(other, Not) and self.child == other.child
+
+    def __repr__(self):
+        return f"Not({self.child!r})"
+
+
+def unquote(value):
+    if value.startswith('"'):
+        return value[1:-1] if len(value) > 1 and value.endswith('"') else value[1:]
+    return value
+
+
+#
+#   Splits query text into (kind, value) tokens
+#
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise QuerySyntaxError(f"Cannot read the query at '{text[position:]}'")
+        position = match.end()
+        if match.group("field"):
+            if match.group("value") == "":
+                raise QuerySyntaxError(f"Missing value after '{match.group('field')}{match.group('op')}'")
+            tokens.append(("term", (match.group("field"), match.group("op"), unquote(match.group("value")))))
+        elif match.group("phrase"):
+            tokens.append(("text", unquote(match.group("phrase"))))
+        elif match.group("word") in ("AND", "OR", "NOT"):
+            tokens.append((match.group("word").lower(), None))
+        elif match.group("word"):
+            tokens.append(("text", match.group("word")))
+        else:
+            kind = next(name for name in ("lparen", "rparen", "neg") if match.group(name))
+            tokens.append((kind, None))
+    return tokens
+
+
+#
+#   Parses query text into a tree of nodes, returns None for an empty query
+#
+def parse_query(text):
+    tokens = tokenize(text or "")
+    if not tokens:
+        return None
+    position = 0
+
+    def peek():
+        return tokens[position][0] if position < len(tokens) else None
+
+    def parse_or():
+        nonlocal position
+        children = [parse_and()]
+        while peek() == "or":
+            position += 1
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and():
+        nonlocal position
+        children = [parse_unary()]
+        while peek() not in (None, "or", "rparen"):
+            if peek() == "and":
+                position += 1
+            children.append(parse_unary())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_unary():
+        nonlocal position
+        kind = peek()
+        if kind is None:
+            raise QuerySyntaxError("The query ends too early")
+        position += 1
+        if kind in ("neg", "not"):
+            return Not(parse_unary())
+        if kind == "lparen":
+            node = parse_or()
+            if peek() != "rparen":
+                raise QuerySyntaxError("Missing ')'")
+            position += 1
+            return node
+        if kind == "term":
+            return Term(*tokens[position - 1][1])
+        if kind == "text":
+            return Text(tokens[position - 1][1])
+        raise QuerySyntaxError(f"Unexpected '{KEYWORDS.get(kind, kind)}'")
+
+    node = parse_or()
+    if position < len(tokens):
+        raise QuerySyntaxError("Unexpected ')'")
+    return node
+
+
+#
+#   Returns True if the query is a single word or phrase (no fields or operators), ex. cable
+#
+def is_plain_text(node):
+    return isinstance(node, Text)
+
+
+#
+#   Compiles a query tree into (where clause, params)
+#       - field_types:  {column: "string", "int" or "float"} of the items table
+#       - text_fields:  columns searched by words and phrases
+#       - encoded:      {column: value table} of dictionary encoded fields (see FieldDictionaries)
+#
+def compile_query(node, field_types, text_fields, encoded=None):
+    encoded = encoded or {}
+    params = []
+
+    def condition(field, operator):
+        # Encoded fields compare their values in the value table and match on the codes
+        if field in encoded:
+            if operator == "!=":
+                return f"{field} NOT IN (SELECT code FROM {encoded[field]} WHERE value = ?)"
+            return f"{field} IN (SELECT code FROM {encoded[field]} WHERE value {operator} ?)"
+        return f"{field} {operator} ?"
+
+    def number(field, value):
+        try:
+            return int(value) if field_types[field] == "int" else float(value)
+        except ValueError:
+            raise QuerySyntaxError(f"'{value}' is not a number (field '{field}')")
+
+    def compile_term(term):
+        field, operator, value = term.field, term.operator, term.value
+        if field not in field_types:
+            raise QuerySyntaxError(f"Unknown field '{field}'")
+        numeric = field_types[field] in ("int", "float")
+
+        if operator == ":" and ".." in value:
+            low, high = value.split("..", 1)
+            bounds = []
+            for bound, comparison in ((low, ">="), (high, "<=")):
+                if bound:
+                    bounds.append(condition(field, comparison))
+                    params.append(number(field, bound) if numeric else bound)
+            if not bounds:
+                raise QuerySyntaxError(f"Empty range for field '{field}'")
+            return "(" + " AND ".join(bounds) + ")"
+        if operator == ":":
+            if numeric:
+                operator = "="
+            else:
+                params.append(f"%{value}%")
+                return condition(field, "LIKE")
+
+        params.append(number(field, value) if numeric else value)
+        return condition(field, operator)
+
+    def compile_text(text):
+        if not text_fields:
+            # Nothing to search in
+            return "0"
+        conditions = []
+        for field in text_fields:
+            conditions.append(condition(field, "LIKE"))
+            params.append(f"%{text.value}%")
+        return "(" + " OR ".join(conditions) + ")"
+
+    def compile_node(node):
+        if isinstance(node, Term):
+            return compile_term(node)
+        if isinstance(node, Text):
+            return compile_text(node)
+        if isinstance(node, Not):
+            # A missing value (NULL) does not match, so NOT of it does
+            return f"NOT COALESCE({compile_node(node.child)}, 0)"
+        joiner = " AND " if isinstance(node, And) else " OR "
+        return "(" + joiner.join(compile_node(child) for child in node.children) + ")"
+
+    if node is None:
+        return "1", []
+    return compile_node(node), params
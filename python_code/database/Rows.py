@@ -0,0 +1,168 @@
+import keyword
+import pandas as pd
+
+#   Result Rows
+#
+#   Query results for the views, without the cost of a pandas DataFrame:
+#       - RowSet keeps the rows exactly as sqlite3 returns them (tuples) with a map from column name to
+#         position, iterating it yields the tuples themselves
+#       - records() yields Row objects with attribute access (row.name), whose class is generated once
+#         per set of columns and uses __slots__, so a row costs about as much memory as its tuple
+#       - to_dataframe() builds a DataFrame for the analytics that need one
+#
+#   RowSet also has the DataFrame members the views used (columns, empty, len), so either can be
+#   passed to the table code.
+#
+
+# Row classes by column names
+ROW_CLASSES = {}
+
+
+#
+#   Returns a valid, unique attribute name for a column (ex. "unit price" -> "unit_price")
+#
+def attribute_name(column, position, taken):
+    name = "".join(character if character.isalnum() or character == "_" else "_" for character in str(column))
+    if not name or not name.isidentifier() or keyword.iskeyword(name) or name.startswith("_") or name in taken:
+        name = f"column_{position}"
+    return name
+
+
+#
+#   Orders values like SQLite: missing values (NULL) first, then numbers, text and blobs
+#
+def sort_key(value):
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, value)
+
+
+class Row:
+    __slots__ = ()
+    columns = ()
+    attributes = ()
+    index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return getattr(self, self.attributes[key])
+        return getattr(self, self.attributes[self.index[key]])
+
+    def get(self, column, default=None):
+        position = self.index.get(column)
+        return default if position is None else getattr(self, self.attributes[position])
+
+    def values(self):
+        return tuple(getattr(self, attribute) for attribute in self.attributes)
+
+    def to_dict(self):
+        return dict(zip(self.columns, self.values()))
+
+    def __eq__(self, other):
+        return isinstance(other, Row) and self.columns == other.columns and self.values() == other.values()
+
+    def __repr__(self):
+        return "Row(" + ", ".join(f"{column}={value!r}" for column, value in zip(self.columns, self.values())) + ")"
+
+
+#
+#   Returns the Row class for these columns, generating it on first use
+#
+def row_class(columns):
+    columns = tuple(columns)
+    cls = ROW_CLASSES.get(columns)
+    if cls is not None:
+        return cls
+
+    attributes = []
+    for position, column in enumerate(columns):
+        attributes.append(attribute_name(column, position, attributes))
+    # A generated __init__ assigns every slot directly, which is much faster than a setattr loop
+    arguments = ", ".join(attributes)
+    body = "".join(f"\n    self.{attribute} = {attribute}" for attribute in attributes) or "\n    pass"
+    namespace = {}
+    exec(f"def __init__(self, {arguments}):{body}" if attributes else f"def __init__(self):{body}", namespace)
+
+    cls = type("Row", (Row,), {
+        "__slots__": tuple(attributes),
+        "__init__": namespace["__init__"],
+        "columns": columns,
+        "attributes": tuple(attributes),
+        "index": {column: position for position, column in enumerate(columns)},
+    })
+    ROW_CLASSES[columns] = cls
+    return cls
+
+
+class RowSet:
+    __slots__ = ("columns", "rows", "index")
+
+    def __init__(self, columns, rows):
+        self.columns = list(columns)
+        self.rows = rows if isinstance(rows, list) else list(rows)
+        self.index = {column: position for position, column in enumerate(self.columns)}
+
+    #
+    #   Builds a RowSet from a cursor that has just executed a query
+    #
+    @classmethod
+    def from_cursor(cls, cursor):
+        rows = cursor.fetchall()
+        return cls([desc[0] for desc in cursor.description], rows)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        return cls(df.columns.tolist(), list(df.itertuples(index=False, name=None)))
+
+    @property
+    def empty(self):
+        return not self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, position):
+        return self.rows[position]
+
+    #
+    #   Returns every value of one column
+    #
+    def column(self, name):
+        position = self.index[name]
+        return [row[position] for row in self.rows]
+
+    #
+    #   Yields the rows as Row objects (row.id, row["unit price"], ...)
+    #
+    def records(self):
+        make = row_class(self.columns)
+        for row in self.rows:
+            yield make(*row)
+
+    #
+    #   Returns a RowSet of the rows the function accepts (called with the tuple)
+    #
+    def filter(self, function):
+        return RowSet(self.columns, [row for row in self.rows if function(row)])
+
+    #
+    #   Returns a RowSet sorted on one column the way SQLite's ORDER BY column, rowid sorts it
+    #   (rows already in table order), for results that were not read in that order
+    #
+    def sort(self, column, descending=False):
+        position = self.index[column]
+        rows = self.rows[::-1] if descending else self.rows
+        return RowSet(self.columns, sorted(rows, key=lambda row: sort_key(row[position]), reverse=descending))
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.rows, columns=self.columns)
+
+    def __repr__(self):
+        return f"RowSet(columns={self.columns}, rows={len(self.rows)})"
@@ -0,0 +1,272 @@
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+
+#   SchemaChangeEngine Class
+#
+#   This class changes the columns of a live table without the old
+#   "CREATE TABLE temp AS SELECT ... / DROP / RENAME" copy, which lost column types and indexes.
+#
+#   drop_column() uses ALTER TABLE ... DROP COLUMN when SQLite supports it (3.35+), otherwise it
+#   performs an online rebuild:
+#       1. Create the new table with the original column types, constraints and keys
+#       2. Install triggers that mirror every insert/update/delete on the old table into the new one
+#       3. Copy the rows in rowid-ordered batches, committing between batches so other work can run
+#       4. In one short transaction: drop the mirror triggers and the old table, rename the new one,
+#          and recreate the indexes and triggers that do not use the dropped column
+#
+#   Each step is an explicit transaction (SQLite does not put DDL in one by itself), so a failure
+#   rolls the step back and the original table is never lost. When the caller already has a
+#   transaction open (ex. DatabaseSystem.transaction) the steps are savepoints inside it instead,
+#   nothing is committed and the whole change succeeds or fails with the caller's transaction.
+#
+#   Every change returns (and logs) its timing so large tables can be planned for.
+#
+
+# Rows copied per batch during a rebuild
+REBUILD_BATCH_SIZE = 50000
+
+
+#
+#   Quotes an SQL identifier
+#
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class SchemaChangeEngine:
+    def __init__(self, conn, log=None, batch_size=REBUILD_BATCH_SIZE):
+        self.conn = conn
+        self.log = log
+        self.batch_size = batch_size
+
+    #
+    #   Returns True if this SQLite library can drop columns in place
+    #
+    @staticmethod
+    def supports_drop_column():
+        return sqlite3.sqlite_version_info >= (3, 35, 0)
+
+    #
+    #   Runs a block as one step: a transaction of its own, or a savepoint inside the caller's transaction
+    #
+    @contextmanager
+    def step(self, name):
+        if self.conn.in_transaction:
+            self.conn.execute(f"SAVEPOINT {quote(name)}")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute(f"ROLLBACK TO {quote(name)}")
+                self.conn.execute(f"RELEASE {quote(name)}")
+                raise
+            self.conn.execute(f"RELEASE {quote(name)}")
+        else:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+
+    def table_exists(self, table):
+        return self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+    #
+    #   Returns the column info of a table: [(cid, name, type, notnull, default, pk), ...]
+    #
+    def table_columns(self, table):
+        return self.conn.execute(f"PRAGMA table_info({quote(table)})").fetchall()
+
+    #
+    #   Returns [(name, sql), ...] of the explicitly created indexes and triggers of a table
+    #
+    def table_dependents(self, table, kind):
+        return self.conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = ? AND tbl_name = ? AND sql IS NOT NULL",
+            (kind, table)).fetchall()
+
+    #
+    #   Returns True if an SQL statement mentions the column
+    #
+    @staticmethod
+    def references_column(sql, column):
+        pattern = r'(?<![\w"])"?' + re.escape(column) + r'"?(?![\w"])'
+        return re.search(pattern, sql, re.IGNORECASE) is not None
+
+    #
+    #   Removes a column from a table
+    #       - Returns {"method", "rows", "batches", "seconds"} describing what was done
+    #
+    def drop_column(self, table, column):
+        columns = self.table_columns(table)
+        names = [info[1] for info in columns]
+        if column not in names:
+            raise ValueError(f"Column '{column}' does not exist in table '{table}'")
+        if len(names) == 1:
+            raise ValueError(f"Cannot remove the only column of table '{table}'")
+
+        started = time.perf_counter()
+        rows = self.conn.execute(f"SELECT COUNT(*) FROM {quote(table)}").fetchone()[0]
+
+        if self.can_alter_drop(table, column, columns):
+            try:
+                # Indexes on the column would block the drop and are meaningless afterwards,
+                # they are dropped in the same step so a failed drop restores them
+                with self.step("drop_column"):
+                    for index_name, index_sql in self.table_dependents(table, "index"):
+                        if self.references_column(index_sql, column):
+                            self.conn.execute(f"DROP INDEX {quote(index_name)}")
+                    self.conn.execute(f"ALTER TABLE {quote(table)} DROP COLUMN {quote(column)}")
+                return self.finish(table, column, "alter", rows, 0, started)
+            except sqlite3.OperationalError as e:
+                # ex. the column is used by a view, trigger or CHECK constraint
+                self.report(f"ALTER TABLE DROP COLUMN failed for {table}.{column} ({str(e)}), rebuilding instead")
+
+        batches = self.rebuild(table, [info for info in columns if info[1] != column], column)
+        return self.finish(table, column, "rebuild", rows, batches, started)
+
+    #
+    #   Returns True if ALTER TABLE DROP COLUMN can be attempted for the column
+    #       - SQLite refuses to drop PRIMARY KEY and UNIQUE columns and columns used by foreign keys
+    #
+    def can_alter_drop(self, table, column, columns):
+        if not self.supports_drop_column():
+            return False
+        if any(info[1] == column and info[5] for info in columns):
+            return False
+        for index in self.conn.execute(f"PRAGMA index_list({quote(table)})").fetchall():
+            # index_list: (seq, name, unique, origin, partial), origin 'u'/'pk' are constraints
+            if index[3] in ("u", "pk"):
+                indexed = [info[2] for info in self.conn.execute(f"PRAGMA index_info({quote(index[1])})").fetchall()]
+                if column in indexed:
+                    return False
+        for foreign_key in self.conn.execute(f"PRAGMA foreign_key_list({quote(table)})").fetchall():
+            if foreign_key[3] == column:
+                return False
+        return True
+
+    #
+    #   Builds the CREATE TABLE statement of a table with only the given columns
+    #       - Types, NOT NULL, defaults, primary keys, UNIQUE constraints and foreign keys are kept
+    #
+    def build_create_sql(self, table, new_table, keep_columns, dropped_column):
+        original_sql = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0] or ""
+
+        pk_columns = sorted((info for info in keep_columns if info[5]), key=lambda info: info[5])
+        single_pk = len(pk_columns) == 1
+
+        definitions = []
+        for cid, name, sql_type, notnull, default, pk in keep_columns:
+            definition = f"{quote(name)} {sql_type}".strip()
+            if pk and single_pk:
+                definition += " PRIMARY KEY"
+                if "AUTOINCREMENT" in original_sql.upper():
+                    definition += " AUTOINCREMENT"
+            if notnull:
+                definition += " NOT NULL"
+            if default is not None:
+                definition += f" DEFAULT {default}"
+            definitions.append(definition)
+
+        if len(pk_columns) > 1:
+            definitions.append(f"PRIMARY KEY ({', '.join(quote(info[1]) for info in pk_columns)})")
+
+        # UNIQUE constraints show up as automatic indexes
+        for index in self.conn.execute(f"PRAGMA index_list({quote(table)})").fetchall():
+            if index[3] == "u":
+                indexed = [info[2] for info in self.conn.execute(f"PRAGMA index_info({quote(index[1])})").fetchall()]
+                if dropped_column not in indexed:
+                    definitions.append(f"UNIQUE ({', '.join(quote(name) for name in indexed)})")
+
+        # Foreign keys: (id, seq, table, from, to, on_update, on_delete, match), grouped by id
+        foreign_keys = {}
+        for foreign_key in self.conn.execute(f"PRAGMA foreign_key_list({quote(table)})").fetchall():
+            foreign_keys.setdefault(foreign_key[0], []).append(foreign_key)
+        for parts in foreign_keys.values():
+            from_columns = [part[3] for part in parts]
+            if dropped_column in from_columns:
+                continue
+            to_columns = ", ".join(quote(part[4]) for part in parts if part[4] is not None)
+            reference = f"{quote(parts[0][2])}({to_columns})" if to_columns else quote(parts[0][2])
+            definitions.append(
+                f"FOREIGN KEY ({', '.join(quote(name) for name in from_columns)}) REFERENCES {reference}"
+                f" ON UPDATE {parts[0][5]} ON DELETE {parts[0][6]}")
+
+        return f"CREATE TABLE {quote(new_table)} ({', '.join(definitions)})"
+
+    #
+    #   Rebuilds a table with only keep_columns while it stays usable, returns the number of batches copied
+    #
+    def rebuild(self, table, keep_columns, dropped_column):
+        new_table = f"{table}__rebuild"
+        names = [info[1] for info in keep_columns]
+        column_list = ", ".join(quote(name) for name in names)
+        new_values = ", ".join(f"NEW.{quote(name)}" for name in names)
+
+        indexes = self.table_dependents(table, "index")
+        triggers = self.table_dependents(table, "trigger")
+
+        mirror_triggers = {
+            f"{new_table}_insert": f"AFTER INSERT ON {quote(table)} BEGIN INSERT OR REPLACE INTO {quote(new_table)} (rowid, {column_list}) VALUES (NEW.rowid, {new_values}); END",
+            f"{new_table}_update": f"AFTER UPDATE ON {quote(table)} BEGIN DELETE FROM {quote(new_table)} WHERE rowid = OLD.rowid; INSERT OR REPLACE INTO {quote(new_table)} (rowid, {column_list}) VALUES (NEW.rowid, {new_values}); END",
+            f"{new_table}_delete": f"AFTER DELETE ON {quote(table)} BEGIN DELETE FROM {quote(new_table)} WHERE rowid = OLD.rowid; END",
+        }
+        # 1 + 2. New table and the mirror triggers are created together
+        with self.step("rebuild_create"):
+            self.conn.execute(f"DROP TABLE IF EXISTS {quote(new_table)}")
+            self.conn.execute(self.build_create_sql(table, new_table, keep_columns, dropped_column))
+            for trigger_name, body in mirror_triggers.items():
+                self.conn.execute(f"CREATE TRIGGER {quote(trigger_name)} {body}")
+
+        try:
+            # 3. Copy in rowid order, rows already mirrored by the triggers are left alone
+            last_rowid = None
+            batches = 0
+            while True:
+                bounds = self.conn.execute(
+                    f"SELECT MIN(rowid), MAX(rowid), COUNT(*) FROM (SELECT rowid FROM {quote(table)}"
+                    f"{' WHERE rowid > ?' if last_rowid is not None else ''} ORDER BY rowid LIMIT ?)",
+                    ((last_rowid, self.batch_size) if last_rowid is not None else (self.batch_size,))).fetchone()
+                if not bounds[2]:
+                    break
+                with self.step("rebuild_copy"):
+                    self.conn.execute(
+                        f"INSERT OR IGNORE INTO {quote(new_table)} (rowid, {column_list}) "
+                        f"SELECT rowid, {column_list} FROM {quote(table)} WHERE rowid BETWEEN ? AND ?",
+                        (bounds[0], bounds[1]))
+                last_rowid = bounds[1]
+                batches += 1
+
+            # 4. Swap the tables, a failure rolls the whole swap back
+            with self.step("rebuild_swap"):
+                for trigger_name in mirror_triggers:
+                    self.conn.execute(f"DROP TRIGGER {quote(trigger_name)}")
+                self.conn.execute(f"DROP TABLE {quote(table)}")
+                self.conn.execute(f"ALTER TABLE {quote(new_table)} RENAME TO {quote(table)}")
+                for name, sql in indexes + triggers:
+                    if self.references_column(sql, dropped_column):
+                        self.report(f"Dropped {name} because it uses {table}.{dropped_column}")
+                        continue
+                    self.conn.execute(sql)
+            return batches
+        except Exception:
+            # Leave the original table untouched, the copy is only removed while the original still exists
+            if self.table_exists(table):
+                with self.step("rebuild_cleanup"):
+                    for trigger_name in mirror_triggers:
+                        self.conn.execute(f"DROP TRIGGER IF EXISTS {quote(trigger_name)}")
+                    self.conn.execute(f"DROP TABLE IF EXISTS {quote(new_table)}")
+            raise
+
+    def finish(self, table, column, method, rows, batches, started):
+        result = {"method": method, "rows": rows, "batches": batches, "seconds": time.perf_counter() - started}
+        self.report(f"Column Dropped: {table}.{column}, method:{method}, rows:{rows}, batches:{batches}, seconds:{result['seconds']:.3f}")
+        return result
+
+    def report(self, message):
+        if self.log:
+            self.log(message)
@@ -0,0 +1,290 @@
+import sqlite3
+import time
+from datetime import datetime
+from database.ChangeLog import create_changes_table, install_change_triggers
+
+#   Schema Migrations
+#
+#   Every change to the layout of an existing inventory database is a numbered Migration.
+#   SchemaMigrator brings a database up to the latest version at startup:
+#       - The applied versions are recorded in the schema_version table
+#       - Pending migrations run in order, each in its own transaction together with its
+#         schema_version row, so a failure leaves the database at the last good version
+#       - When the database is already current the check costs a single query
+#       - estimate() runs the pending migrations against a sample copy of the data and
+#         scales the timings to the real table sizes (a dry run that changes nothing)
+#
+#   Migrations must work on both freshly created and old databases, so each step checks
+#   what already exists (ex. CREATE INDEX IF NOT EXISTS).
+#   To change the schema, append a new Migration to MIGRATIONS, never edit an applied one.
+#
+
+# Default names of the inventory tables, DatabaseSystem passes its own
+DEFAULT_TABLES = {"items": "products", "images": "images", "fields": "fields", "login": "login", "movements": "stock_movements",
+                  "changes": "changes", "settings": "settings"}
+
+# Rows per table copied into the sample database used by estimate()
+ESTIMATE_SAMPLE_ROWS = 10000
+
+
+class Migration:
+    def __init__(self, version, description, apply, table=None):
+        self.version = version
+        self.description = description
+        # Function (conn, tables) that performs the change, must not commit
+        self.apply = apply
+        # Key of the table whose size dominates the cost of the migration (used by estimate())
+        self.table = table
+
+
+#
+#   Returns True if the table exists, migrations skip tables the database does not have
+#
+def table_exists(conn, table):
+    return bool(conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone())
+
+
+#
+#   Version 1: the layout used before migrations existed, nothing to change
+#
+def baseline(conn, tables):
+    pass
+
+
+#
+#   Version 2: images reference external blob storage and carry a perceptual hash
+#
+def add_image_columns(conn, tables):
+    if not table_exists(conn, tables["images"]):
+        return
+    columns = [column[1] for column in conn.execute(f"PRAGMA table_info({tables['images']})").fetchall()]
+    for column, sql_type in (("image_ref", "TEXT"), ("phash", "INTEGER")):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {tables['images']} ADD COLUMN {column} {sql_type}")
+
+
+#
+#   Version 3: images are always loaded by product, products are looked up by id
+#
+def add_lookup_indexes(conn, tables):
+    if table_exists(conn, tables["images"]):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {tables['images']}_product_id ON {tables['images']} (product_id)")
+    if table_exists(conn, tables["items"]):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {tables['items']}_id ON {tables['items']} (id)")
+
+
+#
+#   Version 4: append-only ledger of quantity changes (see StockLedger)
+#
+def add_stock_movements(conn, tables):
+    movements = tables["movements"]
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {movements} (
+            id INTEGER PRIMARY KEY,
+            product_id TEXT NOT NULL,
+            delta INTEGER NOT NULL,
+            quantity INTEGER,
+            reason TEXT NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+    ''')
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {movements}_product_time ON {movements} (product_id, created_at, delta)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {movements}_time ON {movements} (created_at, product_id, delta)")
+
+
+#
+#   Version 5: fields can opt in to dictionary encoding (see FieldDictionaries)
+#
+def add_field_dictionary_flag(conn, tables):
+    if not table_exists(conn, tables["fields"]):
+        return
+    columns = [column[1] for column in conn.execute(f"PRAGMA table_info({tables['fields']})").fetchall()]
+    if "dictionary" not in columns:
+        conn.execute(f"ALTER TABLE {tables['fields']} ADD COLUMN dictionary INTEGER NOT NULL DEFAULT 0 CHECK(dictionary IN (0, 1))")
+
+
+#
+#   Version 6: the facet panels group and count by category, brand, price and quantity (see FacetCounts)
+#
+def add_facet_indexes(conn, tables):
+    if not table_exists(conn, tables["items"]):
+        return
+    columns = [column[1] for column in conn.execute(f"PRAGMA table_info({tables['items']})").fetchall()]
+    for column in ("category", "brand", "price", "quantity"):
+        if column in columns:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {tables['items']}_{column} ON {tables['items']} ({column})")
+
+
+#
+#   Version 7: triggers record every change to products and images in the changes table (see ChangeLog)
+#
+def add_change_log(conn, tables):
+    create_changes_table(conn, tables)
+    install_change_triggers(conn, tables)
+
+
+#
+#   Version 8: key/value settings kept with the data (ex. which blob store holds the images)
+#
+def add_settings(conn, tables):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {tables['settings']} (key TEXT PRIMARY KEY, value TEXT)")
+
+
+MIGRATIONS = [
+    Migration(1, "Baseline schema", baseline),
+    Migration(2, "Add image_ref and phash to images", add_image_columns, table="images"),
+    Migration(3, "Index images.product_id and products.id", add_lookup_indexes, table="items"),
+    Migration(4, "Add the stock_movements ledger", add_stock_movements, table="movements"),
+    Migration(5, "Add the dictionary flag to fields", add_field_dictionary_flag, table="fields"),
+    Migration(6, "Index the facet fields of products", add_facet_indexes, table="items"),
+    Migration(7, "Add the change log of products and images", add_change_log, table="items"),
+    Migration(8, "Add the settings table", add_settings),
+]
+
+
+class SchemaMigrator:
+    def __init__(self, conn, tables=None, log=None, migrations=None):
+        self.conn = conn
+        self.tables = dict(DEFAULT_TABLES, **(tables or {}))
+        self.log = log
+        self.migrations = sorted(migrations if migrations is not None else MIGRATIONS, key=lambda migration: migration.version)
+
+        versions = [migration.version for migration in self.migrations]
+        if len(set(versions)) != len(versions):
+            raise ValueError("Migration versions must be unique")
+
+    @property
+    def latest_version(self):
+        return self.migrations[-1].version if self.migrations else 0
+
+    #
+    #   Returns the version recorded in the database (0 if it has never been migrated)
+    #
+    def current_version(self):
+        try:
+            row = self.conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+        except sqlite3.OperationalError:
+            # schema_version does not exist yet
+            return 0
+        return int(row[0]) if row and row[0] is not None else 0
+
+    #
+    #   Returns the migrations that have not been applied yet
+    #
+    def pending(self, current=None):
+        if current is None:
+            current = self.current_version()
+        return [migration for migration in self.migrations if migration.version > current]
+
+    #
+    #   Applies every pending migration, returns the number applied
+    #
+    def migrate(self):
+        # Fast path: one query when the database is up to date
+        current = self.current_version()
+        if current >= self.latest_version:
+            if current > self.latest_version:
+                self.report(f"WARNING: Database schema version {current} is newer than this program ({self.latest_version})")
+            return 0
+
+        pending = self.pending(current)
+        for migration in pending:
+            started = time.perf_counter()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute('''
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT NOT NULL,
+                        applied_at TEXT NOT NULL,
+                        seconds REAL
+                    )
+                ''')
+                migration.apply(self.conn, self.tables)
+                seconds = time.perf_counter() - started
+                self.conn.execute("INSERT INTO schema_version VALUES (?, ?, ?, ?)",
+                                  (migration.version, migration.description, datetime.now().isoformat(timespec="seconds"), seconds))
+                self.conn.commit()
+            except Exception as e:
+                self.conn.rollback()
+                self.report(f"ERROR: Schema Migration Failed: version:{migration.version}, error:{str(e)}")
+                raise e
+            self.report(f"Schema Migrated: version:{migration.version}, description:{migration.description}, seconds:{seconds:.3f}")
+        return len(pending)
+
+    #
+    #   Runs every migration again after tables were dropped and recreated (ex. clearing the database)
+    #       - Migrations are idempotent, so this only restores what the new tables are missing
+    #       - Does not commit
+    #
+    def reapply(self):
+        for migration in self.migrations:
+            migration.apply(self.conn, self.tables)
+
+    #
+    #   Dry run: estimates how long the pending migrations would take without changing the database
+    #       - The schema and up to sample_rows rows of every table are copied into memory,
+    #         the migrations are timed there and scaled by the size of each migration's table
+    #       - Returns [{"version", "description", "rows", "sample_rows", "sample_seconds", "estimated_seconds"}, ...]
+    #
+    def estimate(self, sample_rows=ESTIMATE_SAMPLE_ROWS):
+        current = self.current_version()
+        pending = self.pending(current)
+        if not pending:
+            return []
+
+        row_counts = {}
+        for key, table in self.tables.items():
+            try:
+                row_counts[key] = self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            except sqlite3.OperationalError:
+                row_counts[key] = 0
+
+        sample = self.sample_database(sample_rows)
+        try:
+            estimates = []
+            for migration in pending:
+                started = time.perf_counter()
+                migration.apply(sample, self.tables)
+                sample.commit()
+                sample_seconds = time.perf_counter() - started
+
+                rows = row_counts.get(migration.table, 0)
+                copied = min(rows, sample_rows)
+                scale = rows / copied if copied else 1
+                estimates.append({
+                    "version": migration.version,
+                    "description": migration.description,
+                    "rows": rows,
+                    "sample_rows": copied,
+                    "sample_seconds": sample_seconds,
+                    "estimated_seconds": sample_seconds * scale,
+                })
+            return estimates
+        finally:
+            sample.close()
+
+    #
+    #   Returns an in-memory copy of the schema with up to sample_rows rows of every table
+    #       - Triggers are left out, copying the rows must not log them in the changes table again
+    #
+    def sample_database(self, sample_rows):
+        schema = self.conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' AND type <> 'trigger' "
+            "ORDER BY CASE type WHEN 'table' THEN 0 ELSE 1 END").fetchall()
+
+        sample = sqlite3.connect(":memory:")
+        for object_type, name, sql in schema:
+            sample.execute(sql)
+        for object_type, name, sql in schema:
+            if object_type == "table":
+                rows = self.conn.execute(f'SELECT * FROM "{name}" LIMIT ?', (sample_rows,)).fetchall()
+                if rows:
+                    placeholders = ", ".join("?" for _ in rows[0])
+                    sample.executemany(f'INSERT INTO "{name}" VALUES ({placeholders})', rows)
+        sample.commit()
+        return sample
+
+    def report(self, message):
+        if self.log:
+            self.log(message)
@@ -0,0 +1,117 @@
+import time
+from datetime import datetime
+import pandas as pd
+
+#   Stock Ledger
+#
+#   Every change of an item's quantity is appended to the stock_movements table (created by
+#   schema migration 4), in the same transaction as the change itself:
+#       - product_id:  id of the item at the time of the movement
+#       - delta:       change of the quantity (negative for removals)
+#       - quantity:    quantity of the item after the change
+#       - reason:      what caused it ("add", "remove", "adjust", "edit", "pick list")
+#       - created_at:  unix time in seconds
+#
+#   Rows are never updated or deleted (except when the whole database is cleared). Two covering
+#   indexes keep the queries to index range scans however long the ledger grows:
+#       - (product_id, created_at, delta) for the history and totals of one item
+#       - (created_at, product_id, delta) for totals over every item in a time range
+#
+#   Periods are aligned to UTC, weeks start on Monday.
+#
+
+# Seconds per period and the offset that aligns the first period (1970-01-01 was a Thursday)
+PERIODS = {
+    "hour": (3600, 0),
+    "day": (86400, 0),
+    "week": (7 * 86400, 4 * 86400),
+}
+
+
+#
+#   Converts a datetime (or unix time) to unix seconds, None is kept as None
+#
+def to_timestamp(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+class StockLedger:
+    def __init__(self, database):
+        self.database = database
+        self.table = database.movements_table
+
+    #
+    #   Appends movements [(product_id, delta, quantity, reason), ...] with the database's cursor (does not commit)
+    #
+    def record(self, movements, created_at=None):
+        created_at = int(time.time()) if created_at is None else to_timestamp(created_at)
+        self.database.cursor.executemany(
+            f"INSERT INTO {self.table} (product_id, delta, quantity, reason, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(str(product_id), int(delta), quantity, reason, created_at) for product_id, delta, quantity, reason in movements])
+
+    #
+    #   Returns the movements of one item, newest first, optionally limited to [start, end)
+    #
+    def history(self, item_id, start=None, end=None, limit=None):
+        where, params = self.time_range("product_id = ?", [str(item_id)], start, end)
+        sql = f"SELECT id, product_id, delta, quantity, reason, created_at FROM {self.table} WHERE {where} ORDER BY created_at DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        cursor = self.database.read_cursor()
+        cursor.execute(sql, params)
+        history = pd.DataFrame(cursor.fetchall(), columns=[desc[0] for desc in cursor.description])
+        history["created_at"] = pd.to_datetime(history["created_at"], unit="s")
+        return history
+
+    #
+    #   Returns units added, units removed, net change and number of movements per period
+    #       - period is "hour", "day", "week" or a number of seconds
+    #       - item_id limits the totals to one item, by_item splits them per item
+    #
+    def totals(self, period="day", start=None, end=None, item_id=None, by_item=False):
+        if period in PERIODS:
+            seconds, offset = PERIODS[period]
+        else:
+            seconds, offset = int(period), 0
+        if seconds <= 0:
+            raise ValueError(f"Invalid period '{period}'")
+
+        if item_id is not None:
+            where, params = self.time_range("product_id = ?", [str(item_id)], start, end)
+        else:
+            where, params = self.time_range("1", [], start, end)
+
+        bucket = f"((created_at - {offset}) / {seconds}) * {seconds} + {offset}"
+        group = ["period", "product_id"] if by_item else ["period"]
+        sql = f'''
+            SELECT {bucket} AS period, {"product_id, " if by_item else ""}
+                   SUM(CASE WHEN delta > 0 THEN delta ELSE 0 END) AS units_in,
+                   SUM(CASE WHEN delta < 0 THEN -delta ELSE 0 END) AS units_out,
+                   SUM(delta) AS net,
+                   COUNT(*) AS movements
+            FROM {self.table}
+            WHERE {where}
+            GROUP BY {", ".join(group)}
+            ORDER BY {", ".join(group)}
+        '''
+        cursor = self.database.read_cursor()
+        cursor.execute(sql, params)
+        totals = pd.DataFrame(cursor.fetchall(), columns=[desc[0] for desc in cursor.description])
+        totals["period"] = pd.to_datetime(totals["period"], unit="s")
+        return totals
+
+    def time_range(self, where, params, start, end):
+        start, end = to_timestamp(start), to_timestamp(end)
+        if start is not None:
+            where += " AND created_at >= ?"
+            params.append(start)
+        if end is not None:
+            where += " AND created_at < ?"
+            params.append(end)
+        return where, params
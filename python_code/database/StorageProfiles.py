@@ -0,0 +1,68 @@
+#   Storage Profiles
+#
+#   Named sets of SQLite settings, applied to every connection by ConnectionManager:
+#       - journal_mode:        WAL lets readers keep reading while a write is in progress
+#       - synchronous:         FULL syncs every commit, NORMAL only syncs at checkpoints (a power
+#                              loss may undo the last commits but never corrupts), OFF never syncs
+#       - cache_size:          page cache per connection, negative values are KiB
+#       - mmap_size:           bytes of the file read through memory mapping instead of read() calls
+#       - temp_store:          where temporary tables and indexes (ex. for ORDER BY) are built
+#       - wal_autocheckpoint:  WAL pages before a commit copies them back into the database (0 = never)
+#       - checkpoint_interval: seconds between background checkpoints (None = none)
+#
+#   durable:   every commit is on disk when it returns (the default)
+#   balanced:  faster commits for day-to-day use, bigger caches for the read-heavy catalog
+#   bulk-load: for imports and migrations, nothing is synced until the profile is switched back
+#
+
+
+class StorageProfile:
+    def __init__(self, name, journal_mode, synchronous, cache_size, mmap_size, temp_store,
+                 wal_autocheckpoint, checkpoint_interval):
+        self.name = name
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.temp_store = temp_store
+        self.wal_autocheckpoint = wal_autocheckpoint
+        self.checkpoint_interval = checkpoint_interval
+
+    #
+    #   Applies the per-connection settings (the journal mode belongs to the database file, see ConnectionManager)
+    #
+    def apply(self, conn):
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+        conn.execute(f"PRAGMA wal_autocheckpoint = {int(self.wal_autocheckpoint)}")
+
+    def __repr__(self):
+        return f"StorageProfile({self.name})"
+
+
+STORAGE_PROFILES = {
+    "durable": StorageProfile("durable", journal_mode="WAL", synchronous="FULL", cache_size=-16 * 1024,
+                              mmap_size=64 * 1024 * 1024, temp_store="DEFAULT",
+                              wal_autocheckpoint=1000, checkpoint_interval=60),
+    "balanced": StorageProfile("balanced", journal_mode="WAL", synchronous="NORMAL", cache_size=-64 * 1024,
+                               mmap_size=256 * 1024 * 1024, temp_store="MEMORY",
+                               wal_autocheckpoint=1000, checkpoint_interval=30),
+    "bulk-load": StorageProfile("bulk-load", journal_mode="WAL", synchronous="OFF", cache_size=-256 * 1024,
+                                mmap_size=256 * 1024 * 1024, temp_store="MEMORY",
+                                wal_autocheckpoint=0, checkpoint_interval=None),
+}
+
+DEFAULT_STORAGE_PROFILE = "durable"
+
+
+#
+#   Returns a StorageProfile from its name (or the profile itself)
+#
+def get_storage_profile(profile):
+    if isinstance(profile, StorageProfile):
+        return profile
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile '{profile}', expected one of: {', '.join(STORAGE_PROFILES)}")
+    return STORAGE_PROFILES[profile]
@@ -0,0 +1,206 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from database.DatabaseSystem import DatabaseSystem
+
+#   GroupCommitWriter Class
+#
+#   A single background thread that applies DatabaseSystem mutations and commits them in groups.
+#   Calling a mutating method directly commits (and fsyncs) once per call, so a burst of scans
+#   costs one fsync per scan. The writer instead:
+#       - Accepts commands (the name of a mutating method and its arguments) and returns a Future
+#       - Collects the commands that arrive within latency seconds of the first one (up to max_batch)
+#       - Runs each command inside its own SAVEPOINT so a failing command is undone on its own
+#       - Commits the whole group once
+#
+#   Ordering: commands are applied in the order they were submitted, on a single connection.
+#   The commands run on a DatabaseSystem of their own (own connection, change log and log file handle)
+#   opened on the writer thread for the same file, tables and blob store. Its committed change events
+#   are published on the bus of the database the writer was created for, so its views and indexes
+#   hear about them exactly as if the database had made the change itself.
+#   Durability: a Future only completes after the commit of its group has returned, so with the
+#   durable storage profile a result means the change is on disk.
+#   If the commit fails, every Future of the group gets the error.
+#
+
+# Methods that may be submitted to the writer
+WRITE_COMMANDS = {
+    "add_item_to_database",
+    "remove_item_from_database",
+    "adjust_stock",
+    "adjust_stock_batch",
+    "apply_pick_list",
+    "update_item",
+    "add_image_to_product",
+    "add_image_from_file",
+    "remove_image",
+    "remove_image_by_id",
+}
+
+# Default time to wait for more commands before committing a group (seconds)
+GROUP_COMMIT_LATENCY = 0.05
+
+# Queue marker that stops the writer thread
+STOP = object()
+
+
+class GroupCommitWriter:
+    def __init__(self, database, latency=GROUP_COMMIT_LATENCY, max_batch=256):
+        # DatabaseSystem whose file, tables and blob store the writer uses (with its own connection)
+        self.database = database
+        self.latency = latency
+        self.max_batch = max_batch
+        self.commands = queue.Queue()
+        self.closed = False
+
+        # Statistics
+        self.commits = 0
+        self.commands_applied = 0
+
+        self.thread = threading.Thread(target=self.run, name="GroupCommitWriter", daemon=True)
+        self.thread.start()
+
+    #
+    #   Queues a mutating DatabaseSystem method, ex. submit("remove_item_from_database", "12", 1)
+    #       - Returns a Future with the method's return value (or exception) once it is committed
+    #
+    def submit(self, method, *args, **kwargs):
+        if method not in WRITE_COMMANDS:
+            raise ValueError(f"'{method}' cannot be run by the writer")
+        if self.closed:
+            raise RuntimeError("The writer has been closed")
+
+        future = Future()
+        self.commands.put((method, args, kwargs, future))
+        return future
+
+    #
+    #   Commits everything submitted so far without waiting for the latency window
+    #
+    def flush(self):
+        if self.closed:
+            return
+        future = Future()
+        self.commands.put((None, (), {}, future))
+        future.result()
+
+    #
+    #   Commits the remaining commands and stops the thread
+    #
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.commands.put(STOP)
+        self.thread.join()
+
+    #
+    #   Opens the DatabaseSystem the commands run on, created on the writer thread
+    #       - Nothing is shared with self.database but the blob store (which is thread safe)
+    #
+    def open_writer(self):
+        writer = DatabaseSystem(self.database.name, self.database.db, blob_store=self.database.blob_store,
+                                storage_profile=self.database.connections.profile)
+        writer.changes.subscribe(self.database.changes.publish)
+        return writer
+
+    def run(self):
+        writer = self.open_writer()
+        stopping = False
+        try:
+            while not stopping:
+                command = self.commands.get()
+                if command is STOP:
+                    break
+
+                # Collect the commands that arrive within the latency window
+                batch = [command]
+                deadline = time.monotonic() + self.latency
+                while len(batch) < self.max_batch and batch[-1][0] is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        command = self.commands.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if command is STOP:
+                        stopping = True
+                        break
+                    batch.append(command)
+
+                self.commit_batch(writer, batch)
+
+            # Commands that raced with close() are not applied
+            while True:
+                try:
+                    command = self.commands.get_nowait()
+                except queue.Empty:
+                    break
+                if command is not STOP:
+                    command[3].set_exception(RuntimeError("The writer has been closed"))
+        finally:
+            writer.connections.close()
+            writer.log_file.close()
+
+    #
+    #   Applies a group of commands in one transaction and completes their Futures after the commit
+    #
+    def commit_batch(self, writer, batch):
+        outcomes = []
+        # Holding the writer makes the commands' reads see the group's earlier changes
+        writer.connections.acquire_writer()
+        try:
+            writer.conn.execute("BEGIN IMMEDIATE")
+            for index, (method, args, kwargs, future) in enumerate(batch):
+                if not future.set_running_or_notify_cancel():
+                    outcomes.append(None)
+                    continue
+                if method is None:
+                    # flush() marker
+                    outcomes.append((True, None))
+                    continue
+
+                savepoint = f"command_{index}"
+                writer.conn.execute(f"SAVEPOINT {savepoint}")
+                writer.savepoints.append(savepoint)
+                try:
+                    outcomes.append((True, getattr(writer, method)(*args, **kwargs)))
+                    writer.release_changes(len(writer.savepoints))
+                except Exception as e:
+                    writer.conn.execute(f"ROLLBACK TO {savepoint}")
+                    # The command's change events are dropped with its changes
+                    writer.discard_changes(len(writer.savepoints))
+                    outcomes.append((False, e))
+                finally:
+                    writer.savepoints.pop()
+                    writer.conn.execute(f"RELEASE {savepoint}")
+
+            writer.conn.commit()
+        except Exception as e:
+            # Nothing in the group was committed
+            if writer.conn.in_transaction:
+                writer.conn.rollback()
+            writer.savepoints = []
+            writer.pending_after_commit = []
+            writer.pending_changes = []
+            writer.log_message(f"ERROR: Group commit failed: commands:{len(batch)}, error:{str(e)}")
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            writer.connections.release_writer()
+
+        self.commits += 1
+        self.commands_applied += sum(1 for command, outcome in zip(batch, outcomes) if command[0] is not None and outcome is not None)
+        writer.run_after_commit()
+        for (_, _, _, future), outcome in zip(batch, outcomes):
+            if outcome is None:
+                continue
+            succeeded, value = outcome
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
@@ -0,0 +1,47 @@
+import argparse
+from database.DatabaseSystem import DatabaseSystem
+from database.BlobStore import DatabaseBlobStore, FileBlobStore, PackFileBlobStore
+
+#   Image Storage Migration Tool
+#
+#   Moves product images between SQLite and an external blob store, ex.
+#       python migrate_images.py out --files image_store
+#       python migrate_images.py back
+#
+#   The database remembers the store the images were moved to, the program and "back" open it by
+#   themselves (giving --files/--pack to "back" overrides it).
+#
+
+
+def build_store(args):
+    if args.files:
+        return FileBlobStore(args.files)
+    if args.pack:
+        return PackFileBlobStore(args.pack)
+    raise SystemExit("Specify an external store with --files DIR or --pack FILE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move product images in or out of the SQLite database")
+    parser.add_argument("direction", choices=["out", "back"], help="'out' moves BLOBs to the external store, 'back' moves them into SQLite")
+    parser.add_argument("--db", default="inventory.db", help="SQLite database file")
+    parser.add_argument("--files", help="Directory for a sharded file store")
+    parser.add_argument("--pack", help="Path of an append-only pack file store")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.direction == "out":
+        database = DatabaseSystem("Electronics Database", args.db)
+        moved = database.migrate_image_storage(build_store(args), args.batch_size)
+    else:
+        external_store = build_store(args) if args.files or args.pack else None
+        database = DatabaseSystem("Electronics Database", args.db, blob_store=external_store)
+        moved = database.migrate_image_storage(DatabaseBlobStore(), args.batch_size)
+
+    # Reclaim the pages freed by the moved BLOBs
+    database.conn.execute("VACUUM")
+    print(f"Moved {moved} images")
+
+
+if __name__ == "__main__":
+    main()
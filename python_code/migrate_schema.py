@@ -0,0 +1,40 @@
+import argparse
+import sqlite3
+from database.SchemaMigrations import SchemaMigrator
+
+#   Schema Migration Tool
+#
+#   Shows or applies the pending schema migrations of an inventory database, ex.
+#       python migrate_schema.py --dry-run
+#       python migrate_schema.py --db store.db
+#
+#   The program also applies migrations itself at startup, this tool is for checking
+#   how long a large database will take before opening it.
+#
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply or estimate pending schema migrations")
+    parser.add_argument("--db", default="inventory.db", help="SQLite database file")
+    parser.add_argument("--dry-run", action="store_true", help="Estimate the migration time without changing the database")
+    parser.add_argument("--sample-rows", type=int, default=10000, help="Rows per table used for the estimate")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    migrator = SchemaMigrator(conn, log=print)
+    print(f"Schema version {migrator.current_version()}, latest {migrator.latest_version}")
+
+    if args.dry_run:
+        total = 0.0
+        for estimate in migrator.estimate(args.sample_rows):
+            total += estimate["estimated_seconds"]
+            print(f"  {estimate['version']}: {estimate['description']} "
+                  f"(rows:{estimate['rows']}, estimated seconds:{estimate['estimated_seconds']:.3f})")
+        print(f"Estimated total: {total:.3f} seconds")
+    else:
+        print(f"Applied {migrator.migrate()} migrations")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,54 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch
 from database.DatabaseSystem import DatabaseSystem
-from PyQt6.QtWidgets import QMessageBox, QInputDialog
+from database.BlobStore import DatabaseBlobStore, FileBlobStore
+from database.ImageHashIndex import BKTree
+from database.SchemaChange import SchemaChangeEngine
+from database.SchemaMigrations import SchemaMigrator
+from database.WriteQueue import GroupCommitWriter
+from database.StockLedger import StockLedger
+from database.Rows import RowSet, row_class
+from database.PickList import parse_pick_list, OK, NOT_FOUND, INSUFFICIENT, INVALID, SKIPPED
+from database.QueryLanguage import parse_query, QuerySyntaxError, Term, Text, And, Or, Not
+from database.ChangeLog import ChangesCompacted
+from database.ChangeEvents import ChangeEvent, ITEM_UPDATED, FIELD_ADDED, FIELD_REMOVED, IMAGES_CHANGED
+from ui.search_pipeline import SearchPipeline, SearchRequest
+import sqlite3
+import threading
+import multiprocessing
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt6.QtGui import QImage, QColor
+from PyQt6.QtWidgets import QApplication, QMessageBox, QInputDialog
 from ui.login_view import LoginView
 
+
+# (id, name, quantity) of the items most tests start from
+CATALOG = [("1", "Cable", 100), ("2", "Plug", 1000)]
+
+
+#
+#   Stress test worker: removes stock from the same items as the other processes
+#
+def stress_adjust_stock(db_file, log_name, attempts, results):
+    db_system = DatabaseSystem(log_name, db_file)
+    removed = 0
+    for attempt in range(attempts):
+        try:
+            if attempt % 2:
+                db_system.adjust_stock("1", -1)
+                removed += 1
+            else:
+                db_system.adjust_stock_batch([("1", -1), ("2", -1)])
+                removed += 1
+        except ValueError:
+            pass
+    db_system.connections.close()
+    db_system.log_file.close()
+    results.put(removed)
+
+
 class TestAddToFieldsTable(unittest.TestCase):
     def setUp(self):
         # Mock the database connection and cursor
@@ -93,8 +138,8 @@ class TestAddToFieldsTable(unittest.TestCase):
         initial_quantity = 10
         expected_new_quantity = initial_quantity - count_to_remove
 
-        # Mock fetchone 
-        self.mock_cursor.fetchone.return_value = (initial_quantity,)
+        # Mock the quantity returned by the conditional update
+        self.mock_cursor.fetchall.return_value = [(expected_new_quantity,)]
 
         # Reset mock 
         self.mock_cursor.reset_mock() 
@@ -107,10 +152,9 @@ class TestAddToFieldsTable(unittest.TestCase):
         except ValueError as e:
             self.fail(f"remove_item_from_database raised ValueError unexpectedly: {e}")
 
-        select_sql = f"SELECT quantity FROM {self.db_system.items_table} WHERE id=?"
-        self.mock_cursor.execute.assert_any_call(select_sql, (item_id_to_remove,))
-        update_sql = f"UPDATE {self.db_system.items_table} SET quantity=? WHERE id=?"
-        self.mock_cursor.execute.assert_any_call(update_sql, (expected_new_quantity, item_id_to_remove))
+        # The check and the decrement are a single statement
+        update_sql = f"UPDATE {self.db_system.items_table} SET quantity = quantity + ? WHERE id = ? AND quantity >= ? RETURNING quantity"
+        self.mock_cursor.execute.assert_called_once_with(update_sql, (-count_to_remove, item_id_to_remove, count_to_remove))
 
         self.mock_conn.commit.assert_called_once()
 
@@ -176,5 +220,994 @@ class TestAddToFieldsTable(unittest.TestCase):
         self.assertTrue(result)
         
         
+#
+#   Base of the tests that use a real database file in a temporary directory
+#       - items: (id, name, quantity) rows inserted before every test
+#
+class DatabaseTestCase(unittest.TestCase):
+    items = []
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.temp_dir.name, "test.db")
+        self.db_system = DatabaseSystem(os.path.join(self.temp_dir.name, "TestDB"), self.db_file)
+        if self.items:
+            self.db_system.conn.executemany("INSERT INTO products (id, name, quantity) VALUES (?, ?, ?)", self.items)
+            self.db_system.conn.commit()
+
+    def tearDown(self):
+        self.db_system.connections.close()
+        self.db_system.log_file.close()
+        self.temp_dir.cleanup()
+
+    def quantities(self):
+        return dict(self.db_system.conn.execute("SELECT id, quantity FROM products").fetchall())
+
+
+class TestImageStorage(DatabaseTestCase):
+    #
+    # Test: UT-08-TB
+    # Testing: migrate_image_storage
+    #
+    def test_migrate_image_storage(self):
+        image_data = b"\x89PNG fake image bytes"
+        self.db_system.add_image_to_product("1", image_data)
+
+        # Move the image out of SQLite
+        file_store = FileBlobStore(os.path.join(self.temp_dir.name, "images"))
+        self.assertEqual(self.db_system.migrate_image_storage(file_store), 1)
+        self.db_system.cursor.execute("SELECT image_data, image_ref FROM images")
+        stored_data, image_ref = self.db_system.cursor.fetchone()
+        self.assertEqual(stored_data, b"")
+        self.assertTrue(os.path.exists(file_store.path_for(image_ref)))
+        self.assertEqual(self.db_system.get_images_for_product("1"), [image_data])
+
+        # The next session opens the saved store by itself
+        reopened = DatabaseSystem(os.path.join(self.temp_dir.name, "Reopened"), self.db_file)
+        self.assertEqual(reopened.blob_store.name, "files")
+        self.assertEqual(reopened.get_images_for_product("1"), [image_data])
+        image_id = reopened.get_image_ids_for_product("1")[0]
+        self.assertEqual(b"".join(reopened.iter_image_chunks(image_id)), image_data)
+        reopened.connections.close()
+        reopened.log_file.close()
+        # Without the store, references are an error instead of blank images
+        with self.assertRaises(ValueError):
+            DatabaseBlobStore().get(b"", image_ref)
+
+        # Move it back into SQLite
+        self.assertEqual(self.db_system.migrate_image_storage(DatabaseBlobStore()), 1)
+        self.assertEqual(self.db_system.get_images_for_product("1"), [image_data])
+        self.assertFalse(os.path.exists(file_store.path_for(image_ref)))
+
+    #
+    # Test: UT-09-TB
+    # Testing: add_image_from_file, stream_image_to
+    #
+    def test_stream_image(self):
+        image_data = os.urandom(10000)
+        source_path = os.path.join(self.temp_dir.name, "source.png")
+        with open(source_path, "wb") as source_file:
+            source_file.write(image_data)
+
+        image_id = self.db_system.add_image_from_file("1", source_path)
+
+        # Read back in chunks smaller than the image
+        chunks = list(self.db_system.iter_image_chunks(image_id, 4096))
+        self.assertEqual([len(chunk) for chunk in chunks], [4096, 4096, 1808])
+        destination_path = os.path.join(self.temp_dir.name, "copy.png")
+        self.assertEqual(self.db_system.stream_image_to(image_id, destination_path), len(image_data))
+        with open(destination_path, "rb") as destination_file:
+            self.assertEqual(destination_file.read(), image_data)
+
+    #
+    # Test: UT-10-TB
+    # Testing: add_item_to_database (prefetched images)
+    #
+    def test_add_item_with_images(self):
+        image_paths = []
+        for index, contents in enumerate([b"first image", b"second image", b"first image"]):
+            image_path = os.path.join(self.temp_dir.name, f"image{index}.png")
+            with open(image_path, "wb") as image_file:
+                image_file.write(contents)
+            image_paths.append(image_path)
+
+        product_data = {
+            "id": "A100", "name": "name", "quantity": 1, "price": 1.0,
+            "category": "category", "brand": "brand", "description": "description",
+            "images": image_paths,
+        }
+        self.assertTrue(self.db_system.add_item_to_database(product_data))
+
+        # Images are linked by the product id, and the duplicate file is only stored once
+        self.assertEqual(sorted(self.db_system.get_images_for_product("A100")), [b"first image", b"second image"])
+
+    #
+    #   Returns PNG bytes of a gradient image (mirrored gradients look different to dHash)
+    #
+    def make_png(self, width, height, mirrored=False):
+        image = QImage(width, height, QImage.Format.Format_RGB32)
+        for x in range(width):
+            for y in range(height):
+                shade = int(255 * ((width - 1 - x) if mirrored else x) / width * y / height)
+                image.setPixel(x, y, QColor(shade, shade, shade).rgb())
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        image.save(buffer, "PNG")
+        buffer.close()
+        return bytes(data)
+
+    #
+    # Test: UT-11-TB
+    # Testing: find_duplicate_images, BKTree
+    #
+    def test_find_duplicate_images(self):
+        self.db_system.add_image_to_product("1", self.make_png(64, 48))
+        self.db_system.add_image_to_product("2", self.make_png(128, 96))  # Same photo at a different size
+        self.db_system.add_image_to_product("3", self.make_png(64, 48, mirrored=True))
+
+        report = self.db_system.find_duplicate_images(max_distance=4)
+        self.assertEqual(len(report), 1)
+        self.assertEqual((str(report.loc[0, "product_id"]), str(report.loc[0, "duplicate_product_id"])), ("1", "2"))
+
+        # BK-tree search only returns hashes within the distance
+        tree = BKTree()
+        for value in (0b0000, 0b0001, 0b0111, 0b1111):
+            tree.add(value, value)
+        self.assertEqual([item for _, item in tree.search(0b0000, 1)], [0b0000, 0b0001])
+
+
+class TestSchemaChange(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db_system.add_to_fields_table("warranty", "small_box", "int", 0)
+        self.db_system.add_to_fields_table("supplier", "small_box", "string", 0)
+        self.db_system.conn.execute("CREATE INDEX IF NOT EXISTS products_category ON products (category)")
+        self.db_system.conn.execute("CREATE INDEX products_warranty ON products (warranty)")
+        self.db_system.conn.execute("INSERT INTO products (id, name, category, quantity, warranty, supplier) VALUES ('1', 'Cable', 'Audio', 5, 2, 'Acme')")
+        self.db_system.conn.commit()
+
+    def table_state(self):
+        columns = {column[1]: column[2] for column in self.db_system.conn.execute("PRAGMA table_info(products)")}
+        indexes = [row[0] for row in self.db_system.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")]
+        return columns, indexes
+
+    #
+    # Test: UT-12-TB
+    # Testing: remove_field_from_database, SchemaChangeEngine.drop_column
+    #
+    def test_drop_column(self):
+        # In place drop
+        self.assertTrue(self.db_system.remove_field_from_database("warranty"))
+        columns, indexes = self.table_state()
+        self.assertNotIn("warranty", columns)
+        self.assertIn("products_category", indexes)
+        self.assertNotIn("products_warranty", indexes)
+
+        # Batched rebuild keeps types, indexes, rows and rowids
+        engine = SchemaChangeEngine(self.db_system.conn, batch_size=1)
+        engine.can_alter_drop = lambda *args: False
+        result = engine.drop_column("products", "supplier")
+        self.assertEqual(result["method"], "rebuild")
+        columns, indexes = self.table_state()
+        self.assertNotIn("supplier", columns)
+        self.assertEqual((columns["quantity"], columns["price"]), ("INTEGER", "REAL"))
+        self.assertIn("products_category", indexes)
+        self.assertNotIn("products_warranty", indexes)
+        self.assertEqual(self.db_system.conn.execute("SELECT id, name, quantity FROM products").fetchall(), [("1", "Cable", 5)])
+        with self.assertRaises(ValueError):
+            engine.drop_column("products", "supplier")
+
+    #
+    # Test: UT-34-TB
+    # Testing: SchemaChangeEngine.drop_column rolls back failed drops and rebuilds
+    #
+    def test_drop_column_failure(self):
+        conn = self.db_system.conn
+        # The view blocks both the in place drop and the rename at the end of the rebuild
+        conn.execute("CREATE INDEX products_supplier ON products (supplier)")
+        conn.execute("CREATE VIEW supplier_view AS SELECT id, supplier FROM products")
+        conn.commit()
+        with self.assertRaises(sqlite3.OperationalError):
+            SchemaChangeEngine(conn).drop_column("products", "supplier")
+        columns, indexes = self.table_state()
+        self.assertIn("supplier", columns)
+        self.assertIn("products_supplier", indexes)
+        self.assertEqual(conn.execute("SELECT id, supplier FROM products").fetchall(), [("1", "Acme")])
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'products__rebuild%'").fetchone()[0], 0)
+
+        # Removing the field fails as a whole: the field entry and the change triggers stay
+        with self.assertRaises(sqlite3.OperationalError):
+            self.db_system.remove_field_from_database("supplier")
+        self.assertIsNotNone(self.db_system.get_field_info("supplier"))
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'products'").fetchone()[0], 3)
+        self.assertFalse(conn.in_transaction)
+
+        # Inside the caller's transaction nothing is committed
+        conn.execute("DROP VIEW supplier_view")
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        SchemaChangeEngine(conn, batch_size=1).drop_column("products", "warranty")
+        self.assertNotIn("warranty", self.table_state()[0])
+        conn.rollback()
+        columns, indexes = self.table_state()
+        self.assertIn("warranty", columns)
+        self.assertIn("products_warranty", indexes)
+
+
+class TestSchemaMigrations(unittest.TestCase):
+    def setUp(self):
+        # Database in the layout used before migrations existed
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.temp_dir.name, "test.db")
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("CREATE TABLE fields (field_name TEXT PRIMARY KEY, entry_type TEXT, validation_type TEXT, required INTEGER)")
+        conn.execute("CREATE TABLE products (id TEXT, name TEXT, quantity INTEGER)")
+        conn.execute("CREATE TABLE images (image_id INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER NOT NULL, image_data BLOB NOT NULL)")
+        conn.execute("CREATE TABLE login (username TEXT PRIMARY KEY, password TEXT NOT NULL, requires_login INTEGER NOT NULL)")
+        conn.executemany("INSERT INTO products VALUES (?, ?, ?)", [(str(i), f"Item {i}", i) for i in range(50)])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    #
+    # Test: UT-13-TB
+    # Testing: SchemaMigrator.estimate, SchemaMigrator.migrate
+    #
+    def test_migrate(self):
+        # Dry run reports every step and leaves the database alone
+        conn = sqlite3.connect(self.db_file)
+        migrator = SchemaMigrator(conn)
+        estimates = migrator.estimate(sample_rows=10)
+        self.assertEqual([estimate["version"] for estimate in estimates], [1, 2, 3, 4, 5, 6, 7, 8])
+        self.assertEqual(estimates[2]["rows"], 50)
+        self.assertEqual(migrator.current_version(), 0)
+        conn.close()
+
+        # Opening the database applies the migrations
+        db_system = DatabaseSystem(os.path.join(self.temp_dir.name, "TestDB"), self.db_file)
+        self.assertEqual(db_system.migrator.current_version(), 8)
+        columns = [column[1] for column in db_system.conn.execute("PRAGMA table_info(images)")]
+        self.assertIn("phash", columns)
+        self.assertEqual(db_system.conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'products_id'").fetchone()[0], 1)
+
+        # Already up to date
+        self.assertEqual(db_system.migrator.migrate(), 0)
+        self.assertEqual(db_system.migrator.estimate(), [])
+        db_system.conn.close()
+        db_system.log_file.close()
+
+
+class TestGroupCommitWriter(DatabaseTestCase):
+    items = [("1", "Cable", 10)]
+
+    def setUp(self):
+        super().setUp()
+        self.writer = GroupCommitWriter(self.db_system, latency=0.2)
+
+    def tearDown(self):
+        self.writer.close()
+        super().tearDown()
+
+    #
+    # Test: UT-14-TB
+    # Testing: GroupCommitWriter.submit
+    #
+    def test_group_commit(self):
+        events = []
+        self.db_system.changes.subscribe(events.append)
+        futures = [self.writer.submit("remove_item_from_database", "1", 3) for _ in range(3)]
+        # Fails on its own without undoing the others
+        failing = self.writer.submit("remove_item_from_database", "1", 5)
+        futures.append(self.writer.submit("update_item", "1", {"name": "USB Cable"}))
+
+        for future in futures:
+            future.result(timeout=10)
+        with self.assertRaises(ValueError):
+            failing.result(timeout=10)
+
+        # Committed in one group, in submission order, and visible to other connections
+        self.assertEqual(self.writer.commits, 1)
+        self.assertEqual(self.db_system.conn.execute("SELECT name, quantity FROM products WHERE id = '1'").fetchone(), ("USB Cable", 1))
+        with self.assertRaises(ValueError):
+            self.writer.submit("clear_database")
+
+        # The committed commands are published on the database's own bus, the failed one is not
+        self.assertEqual([event.kind for event in events], ["item_updated"] * 4)
+        # The snapshot of the database catches up with the writer's changes
+        self.assertEqual(self.db_system.column_store().sum("quantity"), 1)
+
+
+class TestTransaction(DatabaseTestCase):
+    items = [("1", "Cable", 10)]
+
+    def product(self):
+        return self.db_system.conn.execute("SELECT name, quantity FROM products WHERE id = '1'").fetchone()
+
+    #
+    # Test: UT-15-TB
+    # Testing: transaction
+    #
+    def test_transaction(self):
+        # A failure undoes every call in the block
+        with self.assertRaises(RuntimeError):
+            with self.db_system.transaction():
+                self.db_system.update_item("1", {"name": "USB Cable"})
+                self.db_system.add_image_to_product("1", b"image")
+                raise RuntimeError("failed halfway")
+        self.assertEqual(self.product(), ("Cable", 10))
+        self.assertEqual(self.db_system.get_image_ids_for_product("1"), [])
+
+        # Nested blocks only undo their own part, and the whole block commits once
+        with patch.object(self.db_system, "commit", wraps=self.db_system.commit) as commit:
+            with self.db_system.transaction():
+                self.db_system.update_item("1", {"name": "USB Cable"})
+                with self.assertRaises(ValueError):
+                    with self.db_system.transaction():
+                        self.db_system.remove_item_from_database("1", 4)
+                        self.db_system.remove_item_from_database("1", 20)
+                self.db_system.remove_item_from_database("1", 1)
+            self.assertEqual(commit.call_count, 1)
+        self.assertFalse(self.db_system.conn.in_transaction)
+        self.assertEqual(self.product(), ("USB Cable", 9))
+
+
+class TestConnectionManager(DatabaseTestCase):
+    items = [("1", "Cable", 10)]
+
+    #
+    # Test: UT-16-TB
+    # Testing: read_cursor, ConnectionManager
+    #
+    def test_readers_run_during_write(self):
+        self.assertEqual(self.db_system.connections.journal_mode, "wal")
+        results = {}
+        reader_done = threading.Event()
+
+        def background_read():
+            results["quantity"] = self.db_system.get_all_items().loc[0, "quantity"]
+            # Account and schema checks read through the thread's reader too
+            results["checks"] = (self.db_system.table_exists("products"), self.db_system.account_exists(), self.db_system.login_required())
+            reader_done.set()
+
+        def background_write():
+            self.db_system.remove_item_from_database("1", 1)
+
+        with self.db_system.transaction():
+            self.db_system.update_item("1", {"quantity": 5})
+            # The transaction sees its own change
+            self.assertEqual(self.db_system.get_all_items().loc[0, "quantity"], 5)
+
+            # A background reader is not blocked and sees the last committed data
+            threading.Thread(target=background_read).start()
+            self.assertTrue(reader_done.wait(5))
+            self.assertEqual(results["quantity"], 10)
+            self.assertEqual(results["checks"], (True, False, False))
+
+            # A background writer waits for the transaction to finish
+            writer = threading.Thread(target=background_write)
+            writer.start()
+            writer.join(0.2)
+            self.assertTrue(writer.is_alive())
+        writer.join(5)
+
+        self.assertEqual(self.db_system.get_all_items().loc[0, "quantity"], 4)
+        self.assertEqual(self.db_system.connections.stats()["write_waits"], 1)
+        with self.assertRaises(sqlite3.OperationalError):
+            self.db_system.connections.reader().execute("DELETE FROM products")
+
+
+class TestStorageProfiles(DatabaseTestCase):
+    def settings(self, conn):
+        return (conn.execute("PRAGMA synchronous").fetchone()[0], conn.execute("PRAGMA cache_size").fetchone()[0])
+
+    #
+    # Test: UT-17-TB
+    # Testing: storage_profile, set_storage_profile
+    #
+    def test_switch_profiles(self):
+        # durable: synchronous FULL (2)
+        self.assertEqual(self.settings(self.db_system.conn), (2, -16 * 1024))
+        reader = self.db_system.connections.reader()
+
+        with self.db_system.storage_profile("bulk-load"):
+            self.db_system.add_to_fields_table("warranty", "small_box", "int", 0)
+            self.assertEqual(self.settings(self.db_system.conn), (0, -256 * 1024))
+            # Readers switch before their next query
+            self.assertEqual(self.settings(self.db_system.connections.reader()), (0, -256 * 1024))
+
+        self.assertEqual(self.settings(self.db_system.conn), (2, -16 * 1024))
+        self.assertEqual(self.settings(self.db_system.connections.reader()), (2, -16 * 1024))
+        self.assertIs(self.db_system.connections.reader(), reader)
+        self.assertEqual(self.db_system.connections.journal_mode, "wal")
+
+        with self.assertRaises(ValueError):
+            self.db_system.set_storage_profile("fastest")
+
+
+class TestAdjustStock(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-18-TB
+    # Testing: adjust_stock, adjust_stock_batch
+    #
+    def test_adjust_stock(self):
+        self.assertEqual(self.db_system.adjust_stock("1", -30), 70)
+        self.assertEqual(self.db_system.adjust_stock("1", 5), 75)
+        with self.assertRaises(ValueError):
+            self.db_system.adjust_stock("1", -76)
+        with self.assertRaises(ValueError):
+            self.db_system.adjust_stock("missing", -1)
+
+        # A failing change undoes the whole batch
+        with self.assertRaises(ValueError):
+            self.db_system.adjust_stock_batch([("2", -10), ("1", -100)])
+        self.assertEqual(self.quantities(), {"1": 75, "2": 1000})
+        self.assertEqual(self.db_system.adjust_stock_batch([("2", -10), ("1", -5)]), {"2": 990, "1": 70})
+
+    #
+    # Test: UT-19-TB
+    # Testing: adjust_stock under concurrent processes
+    #
+    def test_concurrent_processes(self):
+        context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+        results = context.Queue()
+        processes = [context.Process(target=stress_adjust_stock,
+                                     args=(self.db_file, os.path.join(self.temp_dir.name, f"Worker{i}"), 50, results))
+                     for i in range(4)]
+        for process in processes:
+            process.start()
+        removed = sum(results.get(timeout=60) for _ in processes)
+        for process in processes:
+            process.join(60)
+
+        # 200 attempts on 100 units: exactly 100 succeed and the quantity never goes below zero
+        self.assertEqual(removed, 100)
+        quantities = self.quantities()
+        self.assertEqual(quantities["1"], 0)
+        # Only the batches that succeeded also took from item 2
+        self.assertGreaterEqual(quantities["2"], 1000 - 100)
+
+
+class TestPickList(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-20-TB
+    # Testing: parse_pick_list, apply_pick_list
+    #
+    def test_pick_list(self):
+        lines = parse_pick_list("id,quantity\n1, 10\n2\n# comment\n1\t+4\nmissing,1\n2,many\n1,200")
+        self.assertEqual([(line.item_id, line.delta) for line in lines],
+                         [("1", -10), ("2", -1), ("1", 4), ("missing", -1), ("2", 0), ("1", -200)])
+
+        # A failing line rejects the whole list
+        report = self.db_system.apply_pick_list(lines)
+        self.assertFalse(report.applied)
+        self.assertEqual([line.status for line in report.lines], [SKIPPED, SKIPPED, SKIPPED, NOT_FOUND, INVALID, INSUFFICIENT])
+        self.assertEqual(self.quantities(), {"1": 100, "2": 1000})
+
+        # Partial mode applies the valid lines, combined per item
+        report = self.db_system.apply_pick_list(lines, partial=True)
+        self.assertTrue(report.applied)
+        self.assertEqual(report.changes(), {"1": -6, "2": -1})
+        self.assertEqual([line.quantity for line in report.lines[:3]], [90, 999, 94])
+        self.assertEqual(self.quantities(), {"1": 94, "2": 999})
+
+        report = self.db_system.apply_pick_list([("1", -94), ("2", -999)])
+        self.assertEqual([line.status for line in report.lines], [OK, OK])
+        self.assertEqual(self.quantities(), {"1": 0, "2": 0})
+
+
+class TestStockLedger(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-21-TB
+    # Testing: stock_movements ledger, get_stock_history, get_stock_totals
+    #
+    def test_stock_ledger(self):
+        self.db_system.remove_item_from_database("1", 10)
+        self.db_system.adjust_stock("1", 3)
+        self.assertTrue(self.db_system.update_item("1", {"quantity": "100"}))
+        self.db_system.apply_pick_list([("1", -4), ("2", -1)])
+        # Failed changes leave no movement
+        with self.assertRaises(ValueError):
+            self.db_system.remove_item_from_database("1", 1000)
+
+        history = self.db_system.get_stock_history("1")
+        self.assertEqual(list(zip(history["delta"], history["quantity"], history["reason"])),
+                         [(-4, 96, "pick list"), (7, 100, "edit"), (3, 93, "adjust"), (-10, 90, "remove")])
+        self.assertEqual(len(self.db_system.get_stock_history("1", limit=2)), 2)
+
+        # Aggregates per period, aligned to UTC days
+        day = 86400
+        with self.db_system.transaction():
+            ledger = StockLedger(self.db_system)
+            ledger.record([("2", 5, None, "adjust"), ("2", -2, None, "remove")], created_at=10 * day + 60)
+            ledger.record([("2", -1, None, "remove")], created_at=11 * day + 60)
+        totals = self.db_system.get_stock_totals("day", start=10 * day, end=12 * day, item_id="2")
+        self.assertEqual(totals[["units_in", "units_out", "net", "movements"]].values.tolist(), [[5, 2, 3, 2], [0, 1, -1, 1]])
+        self.assertEqual(str(totals["period"][1].date()), "1970-01-12")
+        by_item = self.db_system.get_stock_totals("week", by_item=True)
+        self.assertEqual(by_item.groupby("product_id")["net"].sum().to_dict(), {"1": -4, "2": 1})
+
+
+class TestProductsById(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-22-TB
+    # Testing: get_products_by_id, fetch_products_by_id
+    #
+    def test_products_by_id(self):
+        self.db_system.conn.executemany("INSERT INTO products (id, name, quantity) VALUES (?, ?, ?)", [(str(i), f"Item {i}", i) for i in range(3, 5003)])
+        self.db_system.conn.commit()
+
+        empty = self.db_system.get_products_by_id([])
+        self.assertEqual(len(empty), 0)
+        self.assertIn("quantity", empty.columns)
+
+        # Requested order, repeated and missing ids, numbers for text ids
+        products = self.db_system.get_products_by_id([2, "missing", "1", "2"])
+        self.assertEqual(products["id"].tolist(), ["2", "1"])
+
+        # Past the parameter limit, in chunks and through the JSON join
+        for count in (1500, 5000):
+            ids = [str(i) for i in range(5002, 5002 - count, -1)]
+            self.assertEqual(self.db_system.fetch_products_by_id(ids).column("id"), ids)
+
+
+class TestQueryItems(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-23-TB
+    # Testing: query_items, count_items, iter_items
+    #
+    def test_query_items(self):
+        self.db_system.conn.executemany("INSERT INTO products (id, name, quantity, price) VALUES (?, ?, ?, ?)",
+                                        [("3", "Fuse", 5, None), ("4", "Relay", 0, 2.5), ("5", "Wire", 5, 1.0)])
+        self.db_system.conn.commit()
+
+        items = self.db_system.query_items(["id", "name"], {"quantity": ("<=", 5)})
+        self.assertEqual(list(items.columns), ["id", "name"])
+        self.assertEqual(items["id"].tolist(), ["3", "4", "5"])
+        self.assertEqual(self.db_system.count_items({"quantity": ("<=", 5)}), 3)
+        self.assertEqual(self.db_system.count_items({"id": ("in", [])}), 0)
+        self.assertEqual(self.db_system.count_items(), 5)
+        with self.assertRaises(ValueError):
+            self.db_system.query_items(["id", "missing"])
+
+        # Keyset pages follow the sort order, including NULLs and ties
+        for descending in (False, True):
+            expected = self.db_system.query_items(["id"], order_by="price", descending=descending)["id"].tolist()
+            pages, after = [], None
+            while True:
+                page = self.db_system.query_items(["id"], order_by="price", descending=descending, after=after, limit=2)
+                pages.extend(page["id"].tolist())
+                after = self.db_system.fetch_page(["id"], order_by="price", descending=descending, after=after, limit=2)[1]
+                if after is None:
+                    break
+            self.assertEqual(pages, expected)
+            self.assertEqual(sorted(pages), ["1", "2", "3", "4", "5"])
+
+        pages = list(self.db_system.iter_items(["name"], order_by="quantity", page_size=2))
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(list(pages[0].columns), ["name"])
+        self.assertEqual(pages[0]["name"].tolist(), ["Relay", "Fuse"])
+
+        # Repeated ids are paged through once each (the pages continue after a rowid, not an id)
+        self.db_system.conn.executemany("INSERT INTO products (id, name, quantity) VALUES (?, ?, ?)", [("A", f"Part {i}", i) for i in range(3)])
+        self.db_system.conn.commit()
+        pages = list(self.db_system.iter_items(["id", "name"], {"id": "A"}, page_size=1))
+        self.assertEqual([page["name"].tolist() for page in pages], [["Part 0"], ["Part 1"], ["Part 2"]])
+
+
+class TestRowSet(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-24-TB
+    # Testing: fetch_all_items, RowSet, row_class
+    #
+    def test_row_set(self):
+        rows = self.db_system.fetch_all_items()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows.column("name"), ["Cable", "Plug"])
+        self.assertEqual(rows.to_dataframe().values.tolist(), self.db_system.get_all_items().values.tolist())
+        self.assertEqual(len(rows.filter(lambda row: row[rows.index["quantity"]] > 500)), 1)
+
+        record = next(rows.records())
+        self.assertEqual((record.id, record["name"], record.get("missing", "-")), ("1", "Cable", "-"))
+        self.assertFalse(hasattr(record, "__dict__"))
+
+        # Column names that are not identifiers still get an attribute
+        cls = row_class(["unit price", "class", "unit price"])
+        self.assertIs(cls, row_class(("unit price", "class", "unit price")))
+        self.assertEqual(cls.attributes, ("unit_price", "column_1", "column_2"))
+        self.assertEqual(cls(1, 2, 3).to_dict(), {"unit price": 3, "class": 2})
+        self.assertTrue(RowSet(["id"], []).empty)
+
+
+class TestColumnStore(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-25-TB
+    # Testing: ColumnStore filters, aggregates and incremental refresh
+    #
+    def test_column_store(self):
+        self.db_system.conn.executemany("UPDATE products SET price = ?, category = ? WHERE id = ?", [(2.5, "Audio", "1"), (1.0, "Power", "2")])
+        self.db_system.conn.commit()
+        store = self.db_system.column_store()
+        self.assertEqual(store.count(), 2)
+        self.assertEqual(store.ids_where({"category": "Audio"}), ["1"])
+        self.assertEqual(store.count({"quantity": ("<=", 100), "category": ("in", ["Audio", "Video"])}), 1)
+        self.assertEqual(store.total_value(), 2.5 * 100 + 1.0 * 1000)
+        self.assertEqual(store.search(["name", "quantity"], "100"), ["1", "2"])
+        self.assertEqual(store.search(["name"], "PLU"), ["2"])
+
+        # Committed changes are applied to the snapshot row by row
+        self.db_system.adjust_stock("1", -40)
+        product = {"id": "3", "name": "Fuse", "quantity": "7", "price": "0.5", "category": "Power", "brand": "Acme", "description": ""}
+        self.assertTrue(self.db_system.add_item_to_database(product))
+        self.assertTrue(self.db_system.update_item("2", {"id": "20", "category": "Video"}))
+        self.assertEqual(store.ids_where({"quantity": ("<", 100)}), ["1", "3"])
+        self.assertEqual(store.ids_where({"category": "Video"}), ["20"])
+        self.assertEqual(store.count(), 3)
+        self.assertEqual(store.total_value(), 2.5 * 60 + 1.0 * 1000 + 0.5 * 7)
+
+        # A rolled back change leaves the snapshot as it was
+        with self.assertRaises(ValueError):
+            with self.db_system.transaction():
+                self.db_system.adjust_stock("1", -10)
+                raise ValueError("cancelled")
+        self.assertEqual(store.sum("quantity", {"id": "1"}), 60)
+
+        # Schema changes reload the whole snapshot
+        self.db_system.add_to_fields_table("warranty", "small_box", "int", 0)
+        self.assertEqual(store.count({"warranty": ("is null", None)}), 3)
+
+        # Rows sharing an id are kept apart (by rowid), updating and removing one id touches all of them
+        self.db_system.conn.execute("INSERT INTO products (id, name, quantity) VALUES ('3', 'Fuse', 5)")
+        self.db_system.conn.commit()
+        store.items_changed(["3"])
+        self.assertEqual(store.sum("quantity", {"id": "3"}), 12)
+        self.db_system.conn.execute("UPDATE products SET quantity = 1 WHERE id = '3'")
+        self.db_system.conn.commit()
+        store.items_changed(["3"])
+        self.assertEqual(store.ids_where({"quantity": 1}), ["3", "3"])
+        self.db_system.conn.execute("DELETE FROM products WHERE id = '3'")
+        self.db_system.conn.commit()
+        store.items_changed(["3"])
+        self.assertEqual(store.count(), 2)
+        self.assertEqual(store.search(["name"], "fuse", within=["3"]), [])
+
+
+class TestFieldDictionaries(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-26-TB
+    # Testing: Dictionary encoding of a text field, reads and writes keep using the text values
+    #
+    def test_field_dictionary(self):
+        self.db_system.conn.executemany("UPDATE products SET category = ? WHERE id = ?", [("Audio", "1"), ("Power", "2")])
+        self.db_system.conn.commit()
+        self.assertTrue(self.db_system.set_field_dictionary("category"))
+        self.assertFalse(self.db_system.set_field_dictionary("category"))
+        with self.assertRaises(ValueError):
+            self.db_system.set_field_dictionary("quantity")
+
+        # The column holds codes, reads see the values
+        stored = self.db_system.conn.execute("SELECT typeof(category) FROM products").fetchall()
+        self.assertEqual(stored, [("integer",), ("integer",)])
+        self.assertEqual(self.db_system.fetch_all_items().column("category"), ["Audio", "Power"])
+        self.assertEqual(self.db_system.fetch_items(["id", "category"], {"category": "Power"}).rows, [("2", "Power")])
+        self.assertEqual(self.db_system.count_items({"category": ("like", "%o%")}), 2)
+        self.assertEqual(self.db_system.fetch_items(["id"], order_by="category", descending=True).column("id"), ["2", "1"])
+        self.assertEqual(self.db_system.fetch_search_results(["category"], "pow").column("id"), ["2"])
+
+        # Writes encode new values
+        product = {"id": "3", "name": "Fuse", "quantity": "7", "price": "0.5", "category": "Fuses", "brand": "Acme", "description": ""}
+        self.assertTrue(self.db_system.add_item_to_database(product))
+        self.assertTrue(self.db_system.update_item("1", {"category": "Video"}))
+        self.assertEqual(self.db_system.fetch_products_by_id(["3", "1"]).column("category"), ["Fuses", "Video"])
+        self.assertEqual(self.db_system.get_distinct_values("category"), ["Fuses", "Power", "Video"])
+        self.assertEqual(self.db_system.column_store().ids_where({"category": "Video"}), ["1"])
+
+        # Turning it off restores the text column
+        self.assertTrue(self.db_system.set_field_dictionary("category", False))
+        stored = self.db_system.conn.execute("SELECT category FROM products ORDER BY id").fetchall()
+        self.assertEqual(stored, [("Video",), ("Power",), ("Fuses",)])
+
+
+class TestFacetCounts(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-27-TB
+    # Testing: Facet counts, each facet ignores its own filter and the cache follows the data version
+    #
+    def test_facet_counts(self):
+        self.db_system.conn.executemany("UPDATE products SET category = ?, brand = ?, price = ? WHERE id = ?",
+                                        [("Audio", "Acme", 2.0, "1"), ("Power", "Acme", 10.0, "2")])
+        self.db_system.conn.commit()
+        product = {"id": "3", "name": "Fuse", "quantity": "7", "price": "4", "category": "Power", "brand": "Volt", "description": ""}
+        self.assertTrue(self.db_system.add_item_to_database(product))
+
+        counts = self.db_system.get_facet_counts({"category": "values", "quantity": "ranges"})
+        self.assertEqual(counts["category"], [("Power", "Power", 2), ("Audio", "Audio", 1)])
+        self.assertEqual([count for _, _, count in counts["quantity"]], [2, 0, 0, 0, 1])
+        self.assertEqual(counts["quantity"][-1][1], ("range", (803, None)))
+
+        filters = {"category": ("in", ["Power"]), "brand": ("in", ["Acme"])}
+        counts = self.db_system.get_facet_counts({"category": "values", "brand": "values"}, filters)
+        self.assertEqual(counts["category"], [("Audio", "Audio", 1), ("Power", "Power", 1)])
+        self.assertEqual(counts["brand"], [("Acme", "Acme", 1), ("Volt", "Volt", 1)])
+        self.assertEqual(self.db_system.count_items(dict(filters, price=("range", (5, None)))), 1)
+
+        # A committed change starts a new data version
+        self.assertTrue(self.db_system.update_item("1", {"category": "Power"}))
+        counts = self.db_system.get_facet_counts({"category": "values"})
+        self.assertEqual(counts["category"], [("Power", "Power", 3)])
+        with self.assertRaises(ValueError):
+            self.db_system.get_facet_counts({"missing": "values"})
+
+
+class TestQueryLanguage(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-28-TB
+    # Testing: Search box queries parsed by QueryLanguage and run as parameterized SQL
+    #
+    def test_query_language(self):
+        self.assertEqual(parse_query('brand:sony price<200 "noise cancelling"'),
+                         And([Term("brand", ":", "sony"), Term("price", "<", "200"), Text("noise cancelling")]))
+        self.assertEqual(parse_query("a OR b -c"), Or([Text("a"), And([Text("b"), Not(Text("c"))])]))
+        for broken in ("price<", "(cable", "cable )"):
+            with self.assertRaises(QuerySyntaxError):
+                parse_query(broken)
+
+        self.db_system.conn.executemany("UPDATE products SET brand = ?, price = ?, description = ? WHERE id = ?",
+                                        [("Sony", 150.0, "noise cancelling", "1"), ("Acme", 5.0, None, "2")])
+        self.db_system.conn.commit()
+        search = lambda query, **options: self.db_system.fetch_query_results(query, **options).column("id")
+        self.assertEqual(search('brand:sony price<200 quantity<=100 "noise cancelling"'), ["1"])
+        self.assertEqual(search("price:1..10 OR brand=Sony"), ["1", "2"])
+        self.assertEqual(search("-cancelling"), ["2"])
+        self.assertEqual(search("plug", fields=["id"]), [])
+        self.assertEqual(search("quantity>=100", filters={"brand": "Acme"}), ["2"])
+        with self.assertRaises(QuerySyntaxError):
+            search("colour:red")
+        with self.assertRaises(QuerySyntaxError):
+            search("price<cheap")
+
+        # Encoded fields are matched through their value table
+        self.assertTrue(self.db_system.set_field_dictionary("brand"))
+        self.assertEqual(search("brand:SON"), ["1"])
+        self.assertEqual(search("NOT brand=Sony"), ["2"])
+
+
+class TestSearchPipeline(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-29-TB
+    # Testing: SearchPipeline debounce, refinement of extended queries and dropping of superseded results
+    #
+    def test_search_pipeline(self):
+        app = QApplication.instance() or QApplication([])
+        store = self.db_system.column_store()
+        self.assertEqual(store.search(["name"], "l", within=["2", "1", "9"]), ["1", "2"])
+        self.assertEqual(store.search(["name"], "c", within=["2"]), [])
+
+        shown = []
+        def search(request):
+            request.version = store.version
+            return RowSet(["id"], [(item_id,) for item_id in store.search(["name"], request.text, within=request.within)])
+        def show(request, rows):
+            shown.append((request.text, request.within, rows.column("id")))
+        pipeline = SearchPipeline(search, show, refine=lambda previous, request: previous.text in request.text, threaded=False)
+
+        # Keystrokes wait for the debounce, only the last text is searched
+        for text in ("p", "pl", "plu"):
+            pipeline.submit(text)
+        self.assertEqual(shown, [])
+        pipeline.flush()
+        self.assertEqual(shown, [("plu", None, ["2"])])
+
+        # An extended query only searches the previous results
+        pipeline.submit("plug", immediate=True)
+        self.assertEqual(shown[-1], ("plug", ["2"], ["2"]))
+        # It knows which version of the data the previous results came from
+        self.assertEqual(pipeline.previous.within_version, store.version)
+
+        # Results of a superseded search are dropped
+        pipeline.finished(SearchRequest(1, "c"), RowSet(["id"], [("1",)]))
+        self.assertEqual(len(shown), 2)
+        stats = pipeline.stats()
+        self.assertEqual((stats["searches"], stats["shown"], stats["discarded"], stats["refined"], stats["keystrokes"]), (2, 2, 1, 1, 4))
+
+
+class TestPrefixIndex(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-30-TB
+    # Testing: PrefixIndex completions and their incremental updates
+    #
+    def test_prefix_index(self):
+        self.db_system.conn.executemany("UPDATE products SET brand = ? WHERE id = ?", [("Sony", "1"), ("sonic", "2")])
+        self.db_system.conn.commit()
+        self.assertEqual(self.db_system.complete_values("SO"), ["sonic", "Sony"])
+        self.assertEqual(self.db_system.complete_values("c"), ["Cable"])
+        self.assertEqual(self.db_system.complete_values("1", field="id"), ["1"])
+        self.assertEqual(self.db_system.complete_values("a", field="category"), [])
+
+        # Committed changes move values in and out, a value stays while an item has it
+        product = {"id": "10", "name": "Cable tie", "quantity": "7", "price": "0.5", "category": "Tools", "brand": "Sony", "description": ""}
+        self.assertTrue(self.db_system.add_item_to_database(product))
+        self.assertTrue(self.db_system.update_item("2", {"id": "20", "brand": "Volt"}))
+        self.assertEqual(self.db_system.complete_values("so"), ["Sony"])
+        self.assertEqual(self.db_system.complete_values("cab", limit=1), ["Cable"])
+        self.assertEqual(self.db_system.complete_values("", field="id"), ["1", "10", "20"])
+        self.db_system.update_item("10", {"brand": "Acme"})
+        self.assertEqual(self.db_system.complete_values("so"), ["Sony"])
+        self.db_system.update_item("1", {"brand": "Acme"})
+        self.assertEqual(self.db_system.complete_values("so"), [])
+        self.assertEqual(self.db_system.complete_values("ACM"), ["Acme"])
+
+
+class TestSortedPages(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-31-TB
+    # Testing: fetch_page sorted keyset pages, sorted query results and RowSet.sort
+    #
+    def test_sorted_pages(self):
+        self.db_system.conn.executemany("INSERT INTO products (id, name, quantity, price) VALUES (?, ?, ?, ?)",
+                                        [("3", "Fuse", 5, None), ("4", "Relay", 0, 2.5), ("5", "Wire", 5, None), ("6", "Lamp", 5, 2.5)])
+        self.db_system.conn.commit()
+        self.db_system.conn.execute("UPDATE products SET price = 2.5 WHERE id IN ('1', '2')")
+        self.db_system.conn.commit()
+
+        # Pages cross the ties and the missing prices in both directions, ties in rowid order
+        for descending, expected in ((False, ["3", "5", "1", "2", "4", "6"]), (True, ["6", "4", "2", "1", "5", "3"])):
+            ids, after = [], None
+            while True:
+                page, after = self.db_system.fetch_page(["id"], order_by="price", descending=descending, after=after, limit=2)
+                self.assertEqual(page.columns, ["id"])
+                ids.extend(page.column("id"))
+                if after is None:
+                    break
+            self.assertEqual(ids, expected)
+            self.assertEqual(self.db_system.fetch_items(["id"], order_by="price", descending=descending).column("id"), expected)
+
+        page, after = self.db_system.fetch_page(filters={"quantity": 5}, order_by="rowid", descending=True, limit=10)
+        self.assertEqual((page.column("id"), after), (["6", "5", "3"], None))
+        with self.assertRaises(ValueError):
+            self.db_system.fetch_page(order_by="missing")
+
+        # Search results come back in the same order as the pages
+        results = self.db_system.fetch_query_results("quantity:5", order_by="name", descending=True)
+        self.assertEqual(results.column("name"), ["Wire", "Lamp", "Fuse"])
+        rows = self.db_system.fetch_products_by_id(["6", "3", "1", "5"])
+        self.assertEqual(rows.sort("price").column("id"), ["3", "5", "6", "1"])
+        self.assertEqual(rows.sort("price", descending=True).column("id"), ["1", "6", "5", "3"])
+
+
+class TestChangeEvents(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-32-TB
+    # Testing: change events published after the commit and dropped with rolled back savepoints
+    #
+    def test_change_events(self):
+        events, item_changes = [], []
+        self.db_system.changes.subscribe(events.append)
+        self.db_system.add_change_listener(item_changes.append)
+
+        with self.db_system.transaction():
+            self.db_system.adjust_stock("1", 5)
+            # The nested block fails, its change is rolled back and never published
+            with self.assertRaises(ValueError):
+                with self.db_system.transaction():
+                    self.db_system.adjust_stock("2", 1)
+                    raise ValueError("undo")
+            self.assertEqual(events, [])
+        self.assertEqual(events, [ChangeEvent(ITEM_UPDATED, ["1"])])
+
+        # Nothing is published for a transaction that is rolled back
+        with self.assertRaises(ValueError):
+            with self.db_system.transaction():
+                self.db_system.adjust_stock("1", 1)
+                raise ValueError("undo")
+        self.assertEqual(len(events), 1)
+
+        self.assertTrue(self.db_system.update_item("2", {"id": "20"}))
+        self.assertEqual(events[-1], ChangeEvent(ITEM_UPDATED, ["20"], renamed={"2": "20"}))
+        self.db_system.add_image_to_product("20", b"image")
+        self.assertEqual(events[-1], ChangeEvent(IMAGES_CHANGED, ["20"]))
+        self.db_system.add_to_fields_table("colour", "small_box", "string", "0")
+        self.db_system.remove_field_from_database("colour")
+        self.assertEqual([event.kind for event in events[-2:]], [FIELD_ADDED, FIELD_REMOVED])
+        self.assertEqual(events[-1].field, "colour")
+
+        # Listeners of changed ids hear the old and new ids, and None for schema changes
+        self.assertEqual(item_changes, [["1"], ["20", "2"], None, None])
+        self.db_system.remove_change_listener(item_changes.append)
+        self.db_system.adjust_stock("1", 1)
+        self.assertEqual(len(item_changes), 4)
+
+
+class TestChangeLog(DatabaseTestCase):
+    items = CATALOG
+
+    #
+    # Test: UT-33-TB
+    # Testing: change log written by triggers, changes_since, compaction, catching up on other connections
+    #
+    def test_change_log(self):
+        start = self.db_system.latest_change()
+        self.db_system.adjust_stock("1", 5)
+        self.assertTrue(self.db_system.update_item("2", {"id": "20", "name": "Socket"}))
+
+        changes = list(self.db_system.changes_since(start, table="products").records())
+        self.assertEqual([(change.operation, change.item_id, change.previous_item_id) for change in changes],
+                         [("update", "1", None), ("update", "20", "2")])
+        self.assertEqual(changes[0].changed_columns, "quantity")
+        self.assertEqual(set(changes[1].changed_columns.split(",")), {"id", "name"})
+        self.assertEqual(self.db_system.latest_change(), changes[-1].seq)
+
+        # Rolled back changes leave no entries, added fields are tracked after a schema entry
+        with self.assertRaises(ValueError):
+            with self.db_system.transaction():
+                self.db_system.adjust_stock("1", 1)
+                raise ValueError("undo")
+        self.assertEqual(len(self.db_system.changes_since(changes[-1].seq)), 0)
+        self.db_system.add_to_fields_table("colour", "small_box", "string", "0")
+        self.db_system.update_item("1", {"colour": "red"})
+        self.db_system.remove_field_from_database("colour")
+        latest = list(self.db_system.changes_since(changes[-1].seq).records())
+        self.assertEqual([change.operation for change in latest], ["schema", "update", "schema"])
+        self.assertEqual(latest[1].changed_columns, "colour")
+
+        # The snapshot picks up a change made by another connection
+        store = self.db_system.column_store()
+        self.assertEqual(store.sum("quantity"), 1105)
+        seq = self.db_system.latest_change()
+        other = sqlite3.connect(self.db_file)
+        other.execute("INSERT INTO products (id, name, quantity) VALUES ('3', 'Fuse', 7)")
+        other.execute("DELETE FROM products WHERE id = '20'")
+        other.commit()
+        other.close()
+        self.assertEqual([(change.operation, change.item_id) for change in self.db_system.changes_since(seq).records()], [("insert", "3"), ("delete", "20")])
+        self.assertEqual(store.sum("quantity"), 112)
+
+        # The log is only looked at again once the follow interval has passed
+        other = sqlite3.connect(self.db_file)
+        other.execute("UPDATE products SET quantity = 0 WHERE id = '3'")
+        other.commit()
+        other.close()
+        self.assertEqual(store.sum("quantity"), 112)
+        store.follow_timer.interval = 0
+        self.assertEqual(store.sum("quantity"), 105)
+
+        # Consumers behind the compacted entries have to re-read the tables
+        logged = len(self.db_system.changes_since(0))
+        self.assertEqual(self.db_system.compact_changes(keep=1), logged - 1)
+        self.assertEqual(len(self.db_system.changes_since(self.db_system.latest_change() - 1)), 1)
+        with self.assertRaises(ChangesCompacted):
+            self.db_system.changes_since(start)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
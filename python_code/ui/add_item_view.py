@@ -4,6 +4,8 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdi
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont, QRegularExpressionValidator, QPixmap
 from PyQt6.QtCore import QRegularExpression
+from ui.change_bridge import ChangeBridge
+from database.ChangeEvents import FIELD_ADDED, FIELD_REMOVED
 
 class AddItemView(QWidget):  # Changed from QDialog to QWidget
     def __init__(self, parent, logic, inventory_system):
@@ -31,6 +33,8 @@ class AddItemView(QWidget):  # Changed from QDialog to QWidget
             }
         """)
         self.setup_ui()
+        # Fields added or removed in Manage Fields add or remove their input here
+        self.change_bridge = ChangeBridge(self.inventory_system, self.on_fields_changed, {FIELD_ADDED, FIELD_REMOVED}, parent=self)
         
     # Update the color palette and styling for inputs and containers
     # Update the background color to match inventory view
@@ -62,6 +66,7 @@ class AddItemView(QWidget):  # Changed from QDialog to QWidget
             'placeholder': '#9ca3af', # Placeholder text
             'custom_bg': '#111827',   # Dark gray for custom fields
         }
+        self.colors = colors
         
         # Make sure the background frame stays full size when window resizes
         self.resizeEvent = lambda event: background_frame.setGeometry(0, 0, self.width(), self.height())
@@ -351,9 +356,18 @@ class AddItemView(QWidget):  # Changed from QDialog to QWidget
         # Create a widget to hold the list of custom fields
         custom_fields_list = QWidget()
         custom_fields_list_layout = QVBoxLayout(custom_fields_list)
+        self.custom_fields_list_layout = custom_fields_list_layout
         custom_fields_list_layout.setContentsMargins(0, 0, 0, 0)
         custom_fields_list_layout.setSpacing(8)
         
+        # Custom field inputs by field name, so fields can be added and removed later
+        self.custom_field_containers = {}
+        self.custom_fields_built = False
+        self.no_custom_fields_label = QLabel("No custom fields available. Add fields in Manage Fields.")
+        self.no_custom_fields_label.setStyleSheet(f"color: {colors['placeholder']}; font-style: italic;")
+        self.no_custom_fields_label.setWordWrap(True)
+        self.no_custom_fields_label.setVisible(False)
+        
         # Get custom fields from the database with better error handling
         try:
             # Check if the method exists first
@@ -379,76 +393,10 @@ class AddItemView(QWidget):  # Changed from QDialog to QWidget
                             
                             if custom_fields:
                                 for field_name in custom_fields:
-                                    field_container = QFrame()
-                                    field_layout = QVBoxLayout(field_container)
-                                    field_layout.setContentsMargins(0, 0, 0, 0)
-                                    field_layout.setSpacing(4)
-                                    
-                                    # Label with field type
-                                    label_container = QWidget()
-                                    label_layout = QHBoxLayout(label_container)
-                                    label_layout.setContentsMargins(0, 0, 0, 0)
-                                    
-                                    field_label = QLabel(field_name)
-                                    field_label.setStyleSheet("color: white;")
-                                    label_layout.addWidget(field_label)
-                                    label_layout.addStretch()
-                                    
-                                    # Removed the required label here
-                                    
-                                    field_layout.addWidget(label_container)
-                                    
-                                    # Input field (default to small_box)
-                                    field_input = QLineEdit()
-                                    field_input.setPlaceholderText("Input text")
-                                    field_input.setStyleSheet(f"""
-                                        QLineEdit {{
-                                            border: 1px solid {colors['border']};
-                                            border-radius: 4px;
-                                            padding: 8px;
-                                            background-color: {colors['input_bg']};
-                                            color: {colors['text']};
-                                        }}
-                                        QLineEdit:focus {{
-                                            border: 1px solid {colors['accent']};
-                                        }}
-                                    """)
-                                    
-                                    field_layout.addWidget(field_input)
-                                    
-                                    # Error message label
-                                    message_label = QLabel("")
-                                    message_label.setStyleSheet("color: #ef4444; font-size: 9px;")
-                                    field_layout.addWidget(message_label)
-                                    
-                                    # Get field details from database
-                                    validation_type = 'text'  # Default
-                                    is_required = False  # Default
-                                    
-                                    try:
-                                        if hasattr(self.logic, 'get_field_details'):
-                                            field_details = self.logic.get_field_details(field_name)
-                                            if field_details:
-                                                # Extract validation type and required status
-                                                if 'validation_type' in field_details:
-                                                    validation_type = field_details['validation_type']
-                                                if 'required' in field_details:
-                                                    is_required = field_details['required'] == '1'
-                                    except Exception as e:
-                                        print(f"Error getting field details: {str(e)}")
-                                        # Continue with defaults if there's an error
-                                    
-                                    # Store references for validation with correct validation type
-                                    self.entries[field_name] = (field_input, validation_type, is_required)
-                                    self.message_labels[field_name] = message_label
-                                    
-                                    custom_fields_list_layout.addWidget(field_container)
+                                    self.add_custom_field(field_name)
                             else:
                                 # No custom fields found after filtering
-                                no_fields_label = QLabel("No custom fields available. Add fields in Manage Fields.")
-                                no_fields_label.setStyleSheet(f"color: {colors['placeholder']}; font-style: italic;")
-                                no_fields_label.setWordWrap(True)
-                                custom_fields_list_layout.addWidget(no_fields_label)
+                                self.no_custom_fields_label.setVisible(True)
                         else:
                             # Unknown list format
                             error_label = QLabel("Unknown list format for fields. Please check the data source.")
@@ -500,8 +448,11 @@ class AddItemView(QWidget):  # Changed from QDialog to QWidget
             print(f"Error loading custom fields: {str(e)}")
             print(error_details)
         
+        # Shown while there are no custom fields (see add_custom_field)
+        custom_fields_list_layout.addWidget(self.no_custom_fields_label)
         # Add stretch to push everything to the top
         custom_fields_list_layout.addStretch()
+        self.custom_fields_built = True
         
         # Set the custom fields list as the scroll area widget
         custom_fields_scroll.setWidget(custom_fields_list)
@@ -531,6 +482,102 @@ class AddItemView(QWidget):  # Changed from QDialog to QWidget
         main_layout.addWidget(main_container)
     
     
+    #
+    #   Adds the input of a custom field to the custom fields list
+    #
+    def add_custom_field(self, field_name):
+        field_container = QFrame()
+        field_layout = QVBoxLayout(field_container)
+        field_layout.setContentsMargins(0, 0, 0, 0)
+        field_layout.setSpacing(4)
+        
+        # Label with field type
+        label_container = QWidget()
+        label_layout = QHBoxLayout(label_container)
+        label_layout.setContentsMargins(0, 0, 0, 0)
+        
+        field_label = QLabel(field_name)
+        field_label.setStyleSheet("color: white;")
+        label_layout.addWidget(field_label)
+        label_layout.addStretch()
+        
+        # Removed the required label here
+        
+        field_layout.addWidget(label_container)
+        
+        # Input field (default to small_box)
+        field_input = QLineEdit()
+        field_input.setPlaceholderText("Input text")
+        field_input.setStyleSheet(f"""
+            QLineEdit {{
+                border: 1px solid {self.colors['border']};
+                border-radius: 4px;
+                padding: 8px;
+                background-color: {self.colors['input_bg']};
+                color: {self.colors['text']};
+            }}
+            QLineEdit:focus {{
+                border: 1px solid {self.colors['accent']};
+            }}
+        """)
+        
+        field_layout.addWidget(field_input)
+        
+        # Error message label
+        message_label = QLabel("")
+        message_label.setStyleSheet("color: #ef4444; font-size: 9px;")
+        field_layout.addWidget(message_label)
+        
+        # Get field details from database
+        validation_type = 'text'  # Default
+        is_required = False  # Default
+        
+        try:
+            if hasattr(self.logic, 'get_field_details'):
+                field_details = self.logic.get_field_details(field_name)
+                if field_details:
+                    # Extract validation type and required status
+                    if 'validation_type' in field_details:
+                        validation_type = field_details['validation_type']
+                    if 'required' in field_details:
+                        is_required = field_details['required'] == '1'
+        except Exception as e:
+            print(f"Error getting field details: {str(e)}")
+            # Continue with defaults if there's an error
+        
+        # Store references for validation with correct validation type
+        self.entries[field_name] = (field_input, validation_type, is_required)
+        self.message_labels[field_name] = message_label
+        
+        # Inputs added later go before the stretch at the end of the list
+        position = self.custom_fields_list_layout.count() - 1 if self.custom_fields_built else self.custom_fields_list_layout.count()
+        self.custom_fields_list_layout.insertWidget(position, field_container)
+        self.custom_field_containers[field_name] = field_container
+        self.no_custom_fields_label.setVisible(False)
+
+    #
+    #   Removes the input of a custom field (ex. after the field was removed in Manage Fields)
+    #
+    def remove_custom_field(self, field_name):
+        field_container = self.custom_field_containers.pop(field_name, None)
+        if field_container is None:
+            return
+        self.custom_fields_list_layout.removeWidget(field_container)
+        field_container.deleteLater()
+        self.entries.pop(field_name, None)
+        self.message_labels.pop(field_name, None)
+        self.no_custom_fields_label.setVisible(not self.custom_field_containers)
+
+    #
+    #   Keeps the custom field inputs in step with the fields of the database (see ChangeEvents)
+    #
+    def on_fields_changed(self, event):
+        standard_fields = ['id', 'name', 'brand', 'category', 'description', 'price', 'quantity', 'images']
+        if event.kind == FIELD_ADDED and event.field.lower() not in standard_fields and event.field not in self.custom_field_containers:
+            self.add_custom_field(event.field)
+        elif event.kind == FIELD_REMOVED:
+            self.remove_custom_field(event.field)
+
     def upload_image(self, event):
     
         file_dialog = QFileDialog(self)
@@ -644,8 +691,8 @@ class AddItemView(QWidget):  # Changed from QDialog to QWidget
         if id_entry:
             new_id = id_entry.text().strip()
             # Check if ID already exists
-            existing_items = self.inventory_system.get_all_items()
-            if new_id in existing_items['id'].values:
+            existing_items = self.inventory_system.query_items(["id"], {"id": new_id}, limit=1)
+            if not existing_items.empty:
                 self.message_labels['ID'].setText("This ID already exists")
                 self.message_labels['ID'].setStyleSheet("color: #ef4444;")
                 return
@@ -655,8 +702,9 @@ class AddItemView(QWidget):  # Changed from QDialog to QWidget
         product_data = {}
         
         # Get the exact field names from the database to preserve case
-        self.inventory_system.cursor.execute(f"SELECT field_name, required FROM {self.inventory_system.fields_table}")
-        db_field_info = {row[0]: bool(row[1]) for row in self.inventory_system.cursor.fetchall()}
+        cursor = self.inventory_system.read_cursor()
+        cursor.execute(f"SELECT field_name, required FROM {self.inventory_system.fields_table}")
+        db_field_info = {row[0]: bool(row[1]) for row in cursor.fetchall()}
         db_field_names_map = {name.lower(): name for name in db_field_info.keys()}
         
         for label, (entry, validation_type, is_required) in self.entries.items():
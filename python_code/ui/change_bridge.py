@@ -0,0 +1,25 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+#   ChangeBridge Class
+#
+#   Subscribes a view to the database's change events (see database/ChangeEvents) and calls its
+#   handler on the GUI thread: events committed by another thread (ex. the WriteQueue writer) go
+#   through a queued signal, events committed on the GUI thread are handled right away.
+#
+
+class ChangeBridge(QObject):
+    changed = pyqtSignal(object)
+
+    def __init__(self, database, handler, kinds=None, parent=None):
+        super().__init__(parent)
+        self.database = database
+        self.changed.connect(handler)
+        database.changes.subscribe(self.forward, kinds)
+        # Stop receiving events once the view is gone
+        self.destroyed.connect(lambda: database.changes.unsubscribe(self.forward))
+
+    def forward(self, event):
+        self.changed.emit(event)
+
+    def close(self):
+        self.database.changes.unsubscribe(self.forward)
@@ -3,17 +3,32 @@ from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QFr
                             QHeaderView, QMessageBox, QDialog, QFormLayout, QListWidget, 
                             QListWidgetItem, QCheckBox, QScrollArea, QComboBox, QSizePolicy, QFileDialog, QStackedWidget)
 from PyQt6.QtCore import Qt, QRegularExpression, QTimer
-from PyQt6.QtGui import QFont, QIcon, QColor, QRegularExpressionValidator, QPixmap, QBrush, QMovie
+from PyQt6.QtGui import QFont, QIcon, QColor, QRegularExpressionValidator, QPixmap, QBrush, QMovie, QImageReader
 import pandas as pd
-import re
 import os  # Add this import
+import tempfile
+from database.Rows import RowSet
+from database.QueryLanguage import parse_query, is_plain_text, QuerySyntaxError
+from ui.search_pipeline import SearchPipeline, DEFAULT_DEBOUNCE_MS
+from ui.prefix_completer import PrefixCompleter
+from ui.change_bridge import ChangeBridge
+from database.ChangeEvents import ITEM_ADDED, ITEM_UPDATED, ITEM_REMOVED, FIELD_ADDED, FIELD_REMOVED, ITEMS_RELOADED
 
 class InventoryView(QMainWindow):
-    def __init__(self, parent, inventory_system, ai):
+    def __init__(self, parent, inventory_system, ai, search_debounce_ms=DEFAULT_DEBOUNCE_MS):
         super().__init__(parent)
         self.inventory_system = inventory_system
         self.ai = ai
         self.selected_fields = set()
+        # Column the table is sorted on (None for the table order), set by clicking a header
+        self.sort_column = None
+        self.sort_descending = False
+        # (filters, after) of the next page while the table shows one page at a time, see load_next_page
+        self.next_page = None
+        
+        # Typing is debounced and searched off the GUI thread, stale results are dropped (see SearchPipeline)
+        self.search_pipeline = SearchPipeline(self.run_search, self.show_search_results, search_debounce_ms,
+                                              refine=self.can_refine_search, log=self.inventory_system.log_message, parent=self)
         
         # Define the normal style (For Normal search results)
         self.normal_style = ("""
@@ -99,6 +114,9 @@ class InventoryView(QMainWindow):
         """)
         
         self.setup_ui()
+        # Committed changes are applied to the table and filters as they happen (see on_database_changed)
+        self.change_bridge = ChangeBridge(self.inventory_system, self.on_database_changed,
+                                          {ITEM_ADDED, ITEM_UPDATED, ITEM_REMOVED, FIELD_ADDED, FIELD_REMOVED, ITEMS_RELOADED}, parent=self)
         
         
         # FOR AI RECOMMENDATION
@@ -143,7 +161,7 @@ class InventoryView(QMainWindow):
         
         self.search_entry = QLineEdit()
         self.search_entry.setFont(QFont("Segoe UI", 11))
-        self.search_entry.setPlaceholderText("Search inventory...")
+        self.search_entry.setPlaceholderText('Search inventory... (ex. brand:sony price<200 quantity<=5 "noise cancelling")')
         self.search_entry.setStyleSheet("""
             QLineEdit {
                 border: 1px solid #374151;
@@ -156,7 +174,11 @@ class InventoryView(QMainWindow):
                 border: 1px solid #3B82F6;
             }
         """)
-        self.search_entry.textChanged.connect(self.on_search)
+        self.search_entry.textChanged.connect(self.on_search_text_changed)
+        # Completes ids, names and brands of the word being typed (ex. "brand:so" -> brand:Sony)
+        self.search_completer = PrefixCompleter(self.search_entry, lambda prefix, field: self.inventory_system.complete_values(prefix, field, wait=False), query_terms=True)
+        # Build the completions while the user has not started typing yet
+        self.inventory_system.prefix_index().build_in_background()
         search_layout.addWidget(self.search_entry, 1)  # Give search bar more space
         
         # Filter button with blue styling
@@ -212,49 +234,31 @@ class InventoryView(QMainWindow):
         
         self.field_checkboxes = {}
         
-        # Get all fields from the DataFrame
-        df = self.inventory_system.get_all_items()
-        all_fields = df.columns.tolist()
+        # Get all fields of the items table
+        all_fields = self.inventory_system.item_columns()
         
         # grid layout for field checkboxes (removed Select All checkbox)
         fields_grid = QWidget()
-        fields_grid_layout = QGridLayout(fields_grid)
-        fields_grid_layout.setContentsMargins(0, 0, 0, 0)
-        fields_grid_layout.setSpacing(8)
+        self.fields_grid_layout = QGridLayout(fields_grid)
+        self.fields_grid_layout.setContentsMargins(0, 0, 0, 0)
+        self.fields_grid_layout.setSpacing(8)
         
         # Add field checkboxes in a grid
-        columns_per_row = 3
-        for idx, field in enumerate(all_fields):
-            checkbox = QCheckBox(field.capitalize())
-            checkbox.setFont(QFont("Segoe UI", 11))
-            checkbox.setStyleSheet("""
-                QCheckBox {
-                    spacing: 8px;
-                    color: #E5E7EB;
-                }
-                QCheckBox::indicator {
-                    width: 18px;
-                    height: 18px;
-                    border-radius: 4px;
-                    border: 1px solid #6B7280;
-                    background-color: #111827;
-                }
-                QCheckBox::indicator:checked {
-                    background-color: #3B82F6;
-                    border: 1px solid #3B82F6;
-                }
-            """)
-            checkbox.setChecked(True)  # All fields selected by default
-            checkbox.stateChanged.connect(self.on_field_selection_changed)
-            
-            row = idx // columns_per_row
-            col = idx % columns_per_row
-            fields_grid_layout.addWidget(checkbox, row, col)
-            self.field_checkboxes[field] = checkbox
+        for field in all_fields:
+            self.add_field_checkbox(field)
             
         checkbox_layout.addWidget(fields_grid)
         filter_layout.addWidget(checkbox_container)
         
+        # Facet panels, one list of values or ranges with their item counts per facet field
+        self.facet_lists = {}
+        self.facet_kinds = {}
+        self.facet_container = QWidget()
+        self.facet_layout = QHBoxLayout(self.facet_container)
+        self.facet_layout.setContentsMargins(0, 0, 0, 0)
+        self.facet_layout.setSpacing(12)
+        filter_layout.addWidget(self.facet_container)
+        
         # Stacked widget for the legend and no recommendations message -----------------------------------
         self.legend_stack = QStackedWidget()
 
@@ -300,6 +304,13 @@ class InventoryView(QMainWindow):
         self.table.doubleClicked.connect(self.on_table_double_click)
         self.table.horizontalHeader().setDefaultAlignment(Qt.AlignmentFlag.AlignLeft)
         self.table.setAlternatingRowColors(True)
+        # Sorting is done by the database (see on_header_clicked), not by the table
+        self.table.horizontalHeader().setSectionsClickable(True)
+        self.table.horizontalHeader().setSortIndicatorShown(True)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table.horizontalHeader().sectionClicked.connect(self.on_header_clicked)
+        # More rows are read when scrolling near the end of a page
+        self.table.verticalScrollBar().valueChanged.connect(self.on_table_scrolled)
         
         table_layout.addWidget(self.table)
         main_layout.addWidget(table_container, 1)  # Give table more stretch
@@ -309,13 +320,113 @@ class InventoryView(QMainWindow):
     def get_unique_categories(self):
         """Get unique categories from inventory data"""
         try:
-            df = self.inventory_system.get_all_items()
-            if 'category' in df.columns:
-                return sorted(df['category'].unique().tolist())
+            if 'category' in self.inventory_system.item_columns():
+                return self.inventory_system.get_distinct_values('category')
             return []
         except:
             return []
 
+    #
+    #   Rebuilds the facet panels for the current fields (clears the selected facets)
+    #
+    def create_facet_panels(self):
+        for i in reversed(range(self.facet_layout.count())):
+            self.facet_layout.itemAt(i).widget().deleteLater()
+        self.facet_lists = {}
+        self.facet_kinds = self.inventory_system.facet_fields()
+
+        for field, kind in self.facet_kinds.items():
+            panel = QWidget()
+            panel_layout = QVBoxLayout(panel)
+            panel_layout.setContentsMargins(0, 0, 0, 0)
+            panel_layout.setSpacing(4)
+
+            label = QLabel(field.capitalize())
+            label.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
+            label.setStyleSheet("color: #9CA3AF; border: none;")
+            panel_layout.addWidget(label)
+
+            facet_list = QListWidget()
+            facet_list.setFont(QFont("Segoe UI", 10))
+            facet_list.setMaximumHeight(160)
+            facet_list.setStyleSheet("""
+                QListWidget {
+                    border: 1px solid #374151;
+                    border-radius: 4px;
+                    background-color: #111827;
+                    color: #E5E7EB;
+                }
+            """)
+            facet_list.itemChanged.connect(lambda item, field=field: self.on_facet_changed(field, item))
+            panel_layout.addWidget(facet_list)
+
+            self.facet_lists[field] = facet_list
+            self.facet_layout.addWidget(panel)
+
+    #
+    #   Returns the ItemQuery filters of the checked facet entries
+    #       - Values of one facet are combined with "in", a range facet has at most one checked range
+    #
+    def facet_filters(self):
+        filters = {}
+        for field, facet_list in self.facet_lists.items():
+            checked = [facet_list.item(i).data(Qt.ItemDataRole.UserRole) for i in range(facet_list.count())
+                       if facet_list.item(i).checkState() == Qt.CheckState.Checked]
+            if not checked:
+                continue
+            if self.facet_kinds[field] == "ranges":
+                filters[field] = checked[0]
+            else:
+                filters[field] = ("in", checked)
+        return filters
+
+    #
+    #   Refreshes the entries and counts of the facet panels for the checked facets
+    #       - Counts come from the database's facet cache, so only changed facets are recounted
+    #
+    def update_facets(self):
+        if not self.facet_lists:
+            return
+        filters = self.facet_filters()
+        try:
+            counts = self.inventory_system.get_facet_counts(self.facet_kinds, filters, limit=50)
+        except Exception as e:
+            print(f"Error counting facets: {str(e)}")
+            return
+
+        for field, facet_list in self.facet_lists.items():
+            selected = filters.get(field)
+            if self.facet_kinds[field] == "values":
+                checked = list(selected[1]) if selected else []
+                entries = counts[field]
+                # Checked values stay listed even when the other facets leave them without items
+                listed = {condition for _, condition, _ in entries}
+                entries = entries + [(str(value), value, 0) for value in checked if value not in listed]
+            else:
+                checked = [selected] if selected else []
+                entries = counts[field]
+
+            facet_list.blockSignals(True)
+            facet_list.clear()
+            for label, condition, count in entries:
+                item = QListWidgetItem(f"{label} ({count})")
+                item.setData(Qt.ItemDataRole.UserRole, condition)
+                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+                item.setCheckState(Qt.CheckState.Checked if condition in checked else Qt.CheckState.Unchecked)
+                facet_list.addItem(item)
+            facet_list.blockSignals(False)
+
+    def on_facet_changed(self, field, changed_item):
+        # A range facet selects one range at a time
+        if self.facet_kinds.get(field) == "ranges" and changed_item.checkState() == Qt.CheckState.Checked:
+            facet_list = self.facet_lists[field]
+            facet_list.blockSignals(True)
+            for i in range(facet_list.count()):
+                if facet_list.item(i) is not changed_item:
+                    facet_list.item(i).setCheckState(Qt.CheckState.Unchecked)
+            facet_list.blockSignals(False)
+        self.on_search()
+
     def on_field_selection_changed(self):
         """Update search results when field selection changes"""
         self.selected_fields = {field for field, checkbox in self.field_checkboxes.items() 
@@ -325,85 +436,232 @@ class InventoryView(QMainWindow):
     def refresh_fields(self):
         """Refresh the table and field checkboxes to show updated fields"""
         # Get current fields from database
-        df = self.inventory_system.get_all_items()
-        current_fields = df.columns.tolist()
-        
-        # Find the fields grid widget
-        checkbox_container = self.filter_section.findChild(QWidget)
-        if checkbox_container:
-            fields_grid = checkbox_container.findChild(QWidget)
-            if fields_grid and fields_grid.layout():
-                # Clear existing checkboxes
-                for i in reversed(range(fields_grid.layout().count())): 
-                    fields_grid.layout().itemAt(i).widget().deleteLater()
-                
-                # Recreate field checkboxes
-                columns_per_row = 3
-                for idx, field in enumerate(current_fields):
-                    checkbox = QCheckBox(field.capitalize())
-                    checkbox.setFont(QFont("Segoe UI", 11))
-                    checkbox.setStyleSheet("""
-                        QCheckBox {
-                            spacing: 8px;
-                            color: #E5E7EB;
-                        }
-                        QCheckBox::indicator {
-                            width: 18px;
-                            height: 18px;
-                            border-radius: 4px;
-                            border: 1px solid #6B7280;
-                            background-color: #111827;
-                        }
-                        QCheckBox::indicator:checked {
-                            background-color: #3B82F6;
-                            border: 1px solid #3B82F6;
-                        }
-                    """)
-                    checkbox.setChecked(True)  # All fields selected by default
-                    checkbox.stateChanged.connect(self.on_field_selection_changed)
-                    
-                    row = idx // columns_per_row
-                    col = idx % columns_per_row
-                    fields_grid.layout().addWidget(checkbox, row, col)
-                    self.field_checkboxes[field] = checkbox
+        current_fields = self.inventory_system.item_columns()
+        if self.sort_column not in current_fields:
+            self.sort_column = None
+        
+        # Only added and removed fields change, the other checkboxes keep their state
+        for field in list(self.field_checkboxes):
+            if field not in current_fields:
+                self.remove_field_checkbox(field)
+        for field in current_fields:
+            if field not in self.field_checkboxes:
+                self.add_field_checkbox(field)
         
         # Update table with a search
         self.on_search()
 
-    def on_search(self):
-        self.legend_stack.setCurrentWidget(self.empty_label)
-        query = self.search_entry.text()
+    #
+    #   Adds the checkbox of a field at the end of the grid (all fields selected by default)
+    #
+    def add_field_checkbox(self, field):
+        columns_per_row = 3
+        checkbox = QCheckBox(field.capitalize())
+        checkbox.setFont(QFont("Segoe UI", 11))
+        checkbox.setStyleSheet("""
+            QCheckBox {
+                spacing: 8px;
+                color: #E5E7EB;
+            }
+            QCheckBox::indicator {
+                width: 18px;
+                height: 18px;
+                border-radius: 4px;
+                border: 1px solid #6B7280;
+                background-color: #111827;
+            }
+            QCheckBox::indicator:checked {
+                background-color: #3B82F6;
+                border: 1px solid #3B82F6;
+            }
+        """)
+        checkbox.setChecked(True)  # All fields selected by default
+        checkbox.stateChanged.connect(self.on_field_selection_changed)
         
-        # Get all items
-        df = self.inventory_system.get_all_items()
+        idx = len(self.field_checkboxes)
+        self.fields_grid_layout.addWidget(checkbox, idx // columns_per_row, idx % columns_per_row)
+        self.field_checkboxes[field] = checkbox
+
+    #
+    #   Removes the checkbox of a field, the checkboxes after it move up one place
+    #
+    def remove_field_checkbox(self, field):
+        columns_per_row = 3
+        checkbox = self.field_checkboxes.pop(field)
+        self.fields_grid_layout.removeWidget(checkbox)
+        checkbox.deleteLater()
+        for idx, other in enumerate(self.field_checkboxes.values()):
+            self.fields_grid_layout.addWidget(other, idx // columns_per_row, idx % columns_per_row)
+
+    #
+    #   Applies a committed change (see ChangeEvents) to the table and the filters
+    #       - Changed items are re-read and their rows replaced where they are shown
+    #       - New items can belong anywhere in the sort order, so the current search runs again
+    #       - A field adds or removes its checkbox (and its column) instead of rebuilding the view
+    #
+    def on_database_changed(self, event):
+        if event.kind == ITEMS_RELOADED:
+            self.create_facet_panels()
+            self.refresh_fields()
+        elif event.kind == FIELD_ADDED:
+            self.refresh_fields()
+        elif event.kind == FIELD_REMOVED:
+            if event.field in self.field_checkboxes:
+                self.remove_field_checkbox(event.field)
+            if self.sort_column == event.field:
+                self.sort_column = None
+            columns = self.table_columns()
+            if event.field in columns:
+                self.table.removeColumn(columns.index(event.field))
+                self.show_sort_indicator()
+            if event.field in self.facet_lists:
+                self.create_facet_panels()
+            self.update_facets()
+        elif event.kind == ITEM_ADDED:
+            self.on_search()
+        elif event.kind == ITEM_UPDATED:
+            self.update_table_rows(event.item_ids, event.renamed)
+            self.update_facets()
+        elif event.kind == ITEM_REMOVED:
+            self.remove_table_rows(event.item_ids)
+            self.update_facets()
+
+    def table_columns(self):
+        return [self.table.horizontalHeaderItem(i).text() if self.table.horizontalHeaderItem(i) else "" for i in range(self.table.columnCount())]
+
+    #
+    #   Returns {id: row} of the rows shown in the table
+    #
+    def table_rows_by_id(self):
+        columns = self.table_columns()
+        if "id" not in columns:
+            return {}
+        id_column = columns.index("id")
+        rows = {}
+        for row_idx in range(self.table.rowCount()):
+            item = self.table.item(row_idx, id_column)
+            if item is not None:
+                rows[item.text()] = row_idx
+        return rows
+
+    #
+    #   Re-reads the shown rows of changed items, renamed = {old id: new id} finds rows under their old id
+    #
+    def update_table_rows(self, item_ids, renamed=None):
+        shown = self.table_rows_by_id()
+        changed = {shown[item_id]: item_id for item_id in item_ids if item_id in shown}
+        for old_id, new_id in (renamed or {}).items():
+            if old_id in shown:
+                changed[shown[old_id]] = new_id
+        if not changed:
+            return
+        rows = self.inventory_system.fetch_products_by_id(list(changed.values()))
+        if "id" not in rows.index:
+            return
+        found = {str(row[rows.index["id"]]): row for row in rows}
+        for col_idx, column in enumerate(self.table_columns()):
+            position = rows.index.get(column)
+            if position is None:
+                continue
+            for row_idx, item_id in changed.items():
+                if item_id in found and self.table.item(row_idx, col_idx) is not None:
+                    self.table.item(row_idx, col_idx).setText(str(found[item_id][position]))
+
+    def remove_table_rows(self, item_ids):
+        shown = self.table_rows_by_id()
+        # From the bottom up, so the other row numbers stay valid
+        for row_idx in sorted((shown[item_id] for item_id in item_ids if item_id in shown), reverse=True):
+            self.table.removeRow(row_idx)
+
+    def on_search_text_changed(self, text):
+        self.search_pipeline.submit(text, self.search_context())
+
+    #
+    #   Searches right away with the current text, fields and facets (ex. after a filter changed)
+    #
+    def on_search(self):
+        self.search_pipeline.submit(self.search_entry.text(), self.search_context(), immediate=True)
+
+    #
+    #   Returns what decides the results besides the text, read on the GUI thread for the search
+    #
+    def search_context(self):
+        return {
+            "fields": [field for field, checkbox in self.field_checkboxes.items() if checkbox.isChecked()],
+            # Checked facets narrow down the search
+            "filters": self.facet_filters(),
+            "sort": (self.sort_column, self.sort_descending),
+        }
+
+    #
+    #   A plain text search that extends the previous one (ex. "cab" -> "cable") can only find
+    #   items the previous one found, if the fields, facets and items are unchanged
+    #
+    def can_refine_search(self, previous, request):
+        if previous.context != request.context or not previous.text or previous.text.lower() not in request.text.lower():
+            return False
+        try:
+            previous_node, node = parse_query(previous.text), parse_query(request.text)
+        except QuerySyntaxError:
+            return False
+        return is_plain_text(previous_node) and is_plain_text(node)
+
+    #
+    #   Runs on the search pipeline's worker thread, returns the rows to show
+    #
+    def run_search(self, request):
+        query = request.text
+        selected_fields = request.context["fields"]
+        filters = request.context["filters"]
+        order_by, descending = request.context["sort"]
+        # Lets a newer search interrupt this one's query
+        if not self.inventory_system.connections.in_memory:
+            request.connection = self.inventory_system.connections.reader()
         
-        # Get selected fields for filtering
-        selected_fields = [field for field, checkbox in self.field_checkboxes.items() 
-                          if checkbox.isChecked()]
+        # Structured queries (ex. brand:sony price<200) run in the database, see QueryLanguage
+        try:
+            node = parse_query(query)
+            if node is not None and not is_plain_text(node):
+                return self.inventory_system.fetch_query_results(query, selected_fields, filters, order_by=order_by, descending=descending)
+        except QuerySyntaxError:
+            # ex. a half typed "price<" or an unknown field, searched as plain text until it can be read
+            node = None
         
         # Apply text search filter
         if query:
-            # Escape special regex characters in the query
-            escaped_query = re.escape(query)
-            
-            # If specific fields are selected, only search in those fields
-            if selected_fields:
-                mask = pd.Series(False, index=df.index)
-                for field in selected_fields:
-                    if field in df.columns:
-                        mask |= df[field].astype(str).str.contains(escaped_query, case=False, na=False, regex=True)
-                df = df[mask]
-            else:
-                # If no fields selected show nothing
-                df = df.iloc[0:0]
-                
+            # Case-insensitive match of the query anywhere in the value (ex. "23" in "1234"), evaluated
+            # on the column snapshot so only the matching rows are read from the database
+            text = node.value if node is not None else query
+            store = self.inventory_system.column_store()
+            # Catch up with the changes here (not on the GUI thread), earlier results only narrow the
+            # search down while the items have not changed since
+            store.refresh()
+            request.version = store.version
+            within = request.within if request.within_version == store.version else None
+            matching_ids = store.search(selected_fields, text, filters, within)
+            request.check()
+            # If no fields selected this shows nothing
+            rows = self.inventory_system.fetch_products_by_id(matching_ids)
+            return rows.sort(order_by, descending) if order_by in rows.index else rows
+        # Browsing (all items or the checked facets) reads the table one page at a time
+        rows, after = self.inventory_system.fetch_page(filters=filters, order_by=order_by or "rowid", descending=descending)
+        if after is not None:
+            request.next_page = (filters, after)
+        return rows
+    
+    #
+    #   Shows the results of the latest search (GUI thread)
+    #
+    def show_search_results(self, request, df):
+        self.legend_stack.setCurrentWidget(self.empty_label)
+        self.update_facets()
         if df.empty: # If serach result yeilds no results
             self.update_table(df) # Clear the table (to show no results)
-            self.last_search_query = query # Store the query as the last query so it can be sent to the AI if needed
+            self.last_search_query = request.text # Store the query as the last query so it can be sent to the AI if needed
             self.ai_recommendation_timer.start(1000) # Delay AI call by 1 second (To prevent constant AI API calls)
         else:
             self.ai_recommendation_timer.stop()  # Stop any pending AI calls
-        self.update_table(df)
+        self.update_table(df, next_page=request.next_page)
         
     #
     #   Creates and receives the AI API call
@@ -437,25 +695,79 @@ class InventoryView(QMainWindow):
         
         
     def display_all_items(self):
+        # Results of a search still running would replace the full list
+        self.search_pipeline.cancel()
         self.legend_stack.setCurrentWidget(self.empty_label)
-        # Get all items as a DataFrame
-        items_df = self.inventory_system.get_all_items()
+        # Fields may have changed, start again from unfiltered facets
+        self.create_facet_panels()
+        self.update_facets()
+        # Get the first page of items, in the chosen sort order (the sort field may have been removed)
+        if self.sort_column not in self.inventory_system.item_columns():
+            self.sort_column = None
+        items_df, after = self.inventory_system.fetch_page(order_by=self.sort_column or "rowid", descending=self.sort_descending)
         
         # Update the table with all items
-        self.update_table(items_df)
-        
+        self.update_table(items_df, next_page=None if after is None else ({}, after))
         
+    #
+    #   Sorts the table on the clicked column, a second click reverses the order
+    #       - The database sorts (indexed columns are read in index order) and the first page is shown
+    #
+    def on_header_clicked(self, section):
+        header_item = self.table.horizontalHeaderItem(section)
+        if header_item is None:
+            return
+        column = header_item.text()
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = False
+        self.show_sort_indicator()
+        self.on_search()
+
+    def show_sort_indicator(self):
+        columns = self.table_columns()
+        order = Qt.SortOrder.DescendingOrder if self.sort_descending else Qt.SortOrder.AscendingOrder
+        self.table.horizontalHeader().setSortIndicator(columns.index(self.sort_column) if self.sort_column in columns else -1, order)
+
+    def on_table_scrolled(self, value):
+        scroll_bar = self.table.verticalScrollBar()
+        if self.next_page is not None and value >= scroll_bar.maximum() - 10:
+            self.load_next_page()
+
+    #
+    #   Adds the next page of a paged browse to the end of the table
+    #
+    def load_next_page(self):
+        if self.next_page is None:
+            return
+        filters, after = self.next_page
+        self.next_page = None
+        try:
+            rows, after = self.inventory_system.fetch_page(filters=filters, order_by=self.sort_column or "rowid", descending=self.sort_descending, after=after)
+        except Exception as e:
+            print(f"Error reading the next page: {str(e)}")
+            return
+        self.add_table_rows(rows)
+        self.next_page = None if after is None else (filters, after)
         
-    def update_table(self, df, ai_reccommended=False):
+    def update_table(self, df, ai_reccommended=False, next_page=None):
         # Clear the current table
+        self.next_page = None
         self.table.setRowCount(0)
         
         if df.empty:
             return
+        
+        # The AI returns a DataFrame, the table reads plain rows
+        if isinstance(df, pd.DataFrame):
+            df = RowSet.from_dataframe(df)
             
         # Set up table columns
         self.table.setColumnCount(len(df.columns))
         self.table.setHorizontalHeaderLabels(df.columns)
+        self.show_sort_indicator()
         
         if ai_reccommended:
             self.table.setStyleSheet(self.ai_style)
@@ -465,16 +777,7 @@ class InventoryView(QMainWindow):
             self.table.setAlternatingRowColors(True)
         
         # Add items to table
-        for row_idx, (_, row_data) in enumerate(df.iterrows()):
-            self.table.insertRow(row_idx)
-            for col_idx, field in enumerate(df.columns):
-                value = row_data[field]
-                item = QTableWidgetItem(str(value))
-                    
-                # self.table.setItem(row_idx, col_idx, item)
-                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                item.setBackground(QBrush(QColor('#1f7cff')))
-                self.table.setItem(row_idx, col_idx, item)
+        self.add_table_rows(df)
         
         # Set column resize mode based on number of columns
         if len(df.columns) <= 7:
@@ -485,6 +788,21 @@ class InventoryView(QMainWindow):
             for i in range(len(df.columns)):
                 self.table.horizontalHeader().setSectionResizeMode(i, QHeaderView.ResizeMode.Interactive)    
         
+        # Set after the rows, so filling the table does not read the next page
+        self.next_page = next_page
+        
+    def add_table_rows(self, rows):
+        first_row = self.table.rowCount()
+        self.table.setRowCount(first_row + len(rows))
+        for row_idx, row_data in enumerate(rows, first_row):
+            for col_idx, value in enumerate(row_data):
+                item = QTableWidgetItem(str(value))
+                    
+                # self.table.setItem(row_idx, col_idx, item)
+                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+                item.setBackground(QBrush(QColor('#1f7cff')))
+                self.table.setItem(row_idx, col_idx, item)
+        
     
     def modify_item(self, item_data, columns):
         if not item_data:
@@ -634,6 +952,20 @@ class InventoryView(QMainWindow):
         upload_btn.clicked.connect(self.upload_image)
         image_container_layout.addWidget(upload_btn)
 
+        # Export button streams the stored images to a folder
+        export_btn = QPushButton("Export Images")
+        export_btn.setFont(QFont("Segoe UI", 12))
+        export_btn.setStyleSheet("""
+            background-color: #374151;
+            color: white;
+            border-radius: 4px;
+            padding: 8px 16px;
+            font-weight: bold;
+            text-align: center;
+        """)
+        export_btn.clicked.connect(lambda: self.export_images(item_data[0]))
+        image_container_layout.addWidget(export_btn)
+
         # Scroll area for images
         self.image_list_widget = QWidget()
         self.image_layout = QVBoxLayout(self.image_list_widget)
@@ -685,11 +1017,43 @@ class InventoryView(QMainWindow):
     #   Loads existing images from the product into the list in the UI
     #
     def load_existing_images(self, product_id):
-        self.existing_images = self.inventory_system.get_images_for_product(product_id)  # Retrieve images from the database
+        # Only the image IDs are kept, each image is streamed when its thumbnail is built
+        self.existing_images = self.inventory_system.get_image_ids_for_product(product_id)
         self.image_paths = []  # Reset new image paths
 
-        for image_data in self.existing_images:
-            self.add_image_to_container(image_data, is_existing=True)
+        for image_id in self.existing_images:
+            self.add_image_to_container(image_id, is_existing=True)
+    
+    #
+    #   Builds a thumbnail for a stored image without holding the whole image in Python memory
+    #       - The image is streamed to a temporary file and decoded at thumbnail size by Qt
+    #
+    def load_thumbnail(self, image_id, size=70):
+        handle, temp_path = tempfile.mkstemp(suffix=".img")
+        os.close(handle)
+        try:
+            self.inventory_system.stream_image_to(image_id, temp_path)
+            reader = QImageReader(temp_path)
+            reader.setAutoTransform(True)
+            original_size = reader.size()
+            if original_size.isValid():
+                reader.setScaledSize(original_size.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio))
+            return QPixmap.fromImage(reader.read())
+        finally:
+            os.remove(temp_path)
+    
+    #
+    #   Exports the stored images of a product to a folder chosen by the user
+    #
+    def export_images(self, product_id):
+        directory = QFileDialog.getExistingDirectory(self, "Export Images")
+        if not directory:
+            return
+        try:
+            paths = self.inventory_system.export_product_images(product_id, directory)
+            QMessageBox.information(self, "Export Complete", f"Exported {len(paths)} image(s) to {directory}.")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to export images: {str(e)}")
                         
     #
     #   Uploads a file to the UI list
@@ -708,7 +1072,7 @@ class InventoryView(QMainWindow):
 
     #
     #   Add image to the image container list in the UI
-    #       - as binary or an image path
+    #       - as a stored image ID or an image path
     #
     def add_image_to_container(self, image_data, is_existing=False):
         image_item_container = QFrame()
@@ -728,9 +1092,9 @@ class InventoryView(QMainWindow):
         thumbnail = QLabel()
         pixmap = QPixmap()
         
-        # Load from binary data or map depending if the image exists already
+        # Stream from the database or load from the path depending if the image exists already
         if is_existing:
-            pixmap.loadFromData(image_data)  # Load from binary
+            pixmap = self.load_thumbnail(image_data)
         else:
             pixmap.load(image_data)  # Load from path
             
@@ -876,31 +1240,31 @@ class InventoryView(QMainWindow):
         # Check if trying to change ID to an existing one (except itself)
         new_id = new_data.get('id')
         if new_id and new_id != original_id:
-            all_items = self.inventory_system.get_all_items()
-            if new_id in all_items['id'].values:
+            if not self.inventory_system.fetch_items(['id'], {'id': new_id}, limit=1).empty:
                 message_labels['id'].setText("This ID already exists. Please choose a different ID.")
                 return
         
-        success = self.inventory_system.update_item(original_id, new_data)
-        if not success:
-            QMessageBox.critical(self, "Error", "Failed to update the product.")
-            
-        # Update the images in the database
+        # Images follow the product to its new ID
+        product_id = new_id or original_id
+
+        # The product and its images are saved together, or not at all
         try:
-            # Remove deleted images
-            current_images = self.inventory_system.get_images_for_product(original_id)
-            for image_data in current_images:
-                if image_data not in self.existing_images:
-                    self.inventory_system.remove_image(original_id, image_data)
-
-            # Add new images
-            for image_path in self.image_paths:
-                with open(image_path, "rb") as image_file:
-                    image_data = image_file.read()
-                    self.inventory_system.add_image_to_product(original_id, image_data)
+            with self.inventory_system.transaction():
+                if not self.inventory_system.update_item(original_id, new_data):
+                    raise ValueError("Failed to update the product.")
+
+                # Remove deleted images
+                current_images = self.inventory_system.get_image_ids_for_product(product_id)
+                for image_id in current_images:
+                    if image_id not in self.existing_images:
+                        self.inventory_system.remove_image_by_id(image_id)
+
+                # Add new images (streamed from disk in chunks)
+                for image_path in self.image_paths:
+                    self.inventory_system.add_image_from_file(product_id, image_path)
 
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to update images: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to save changes: {str(e)}")
             return
 
         # Close the dialog and refresh the table
@@ -596,9 +596,8 @@ class ManageFieldsView(QWidget):  # Changed from QDialog to QWidget
             self.set_validation_type("string")
             self.set_required("1")
             
-            # Refresh all views to show the new field
-            if hasattr(self.parent(), 'refresh_views'):
-                self.parent().refresh_views()
+            # The other views add the field themselves once it is committed (see ChangeEvents)
+            self.refresh_fields()
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to add field: {str(e)}")
@@ -636,39 +635,19 @@ class ManageFieldsView(QWidget):  # Changed from QDialog to QWidget
             try:
                 print(f"Removing field: {field_name}")
                 
-                # First, remove the field from the fields table
-                self.inventory_system.remove_to_fields_table(field_name)
-                
-                # Then, remove the column from the items table
-                try:
-                    # Get all columns except the one to remove
-                    self.inventory_system.cursor.execute(f"PRAGMA table_info({self.inventory_system.items_table})")
-                    columns = [column[1] for column in self.inventory_system.cursor.fetchall() if column[1].lower() != field_name.lower()]
-                    
-                    # Create a new table without the column
-                    columns_str = ", ".join(columns)
-                    self.inventory_system.cursor.execute(f"CREATE TABLE temp_table AS SELECT {columns_str} FROM {self.inventory_system.items_table}")
-                    
-                    # Drop the old table
-                    self.inventory_system.cursor.execute(f"DROP TABLE {self.inventory_system.items_table}")
-                    
-                    # Rename the new table
-                    self.inventory_system.cursor.execute(f"ALTER TABLE temp_table RENAME TO {self.inventory_system.items_table}")
-                    
-                    # Commit the changes
-                    self.inventory_system.conn.commit()
-                    
-                    print(f"Successfully removed column '{field_name}' from items table")
-                except Exception as e:
-                    print(f"Error removing column from items table: {str(e)}")
-                    raise e
+                # Use the column name as stored in the database
+                columns = [column[1] for column in self.inventory_system.read_cursor().execute(f"PRAGMA table_info({self.inventory_system.items_table})").fetchall()]
+                column_name = next((column for column in columns if column.lower() == field_name.lower()), field_name)
+
+                # Drops the column without copying the table where possible and removes the field entry
+                self.inventory_system.remove_field_from_database(column_name)
+                print(f"Successfully removed column '{column_name}' from items table")
                 
                 QMessageBox.information(self, "Success", f"Field '{field_name}' removed successfully.")
                 self.remove_field_entry.clear()
                 
-                # Refresh all views to reflect the removed field
-                if hasattr(self.parent(), 'refresh_views'):
-                    self.parent().refresh_views()
+                # The other views remove the field themselves once it is committed (see ChangeEvents)
+                self.refresh_fields()
                     
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to remove field: {str(e)}")
@@ -0,0 +1,72 @@
+import re
+from PyQt6.QtWidgets import QCompleter
+from PyQt6.QtCore import Qt, QStringListModel
+
+#   PrefixCompleter Class
+#
+#   A QCompleter whose suggestions come from a completion function (ex. DatabaseSystem.complete_values,
+#   answered by the PrefixIndex) instead of a fixed list:
+#       - By default the whole text of the line edit is completed and replaced (ex. an item id)
+#       - With query_terms=True only the word being typed is, so it works inside a search query:
+#         "brand:so" completes brands, a plain word completes every indexed field, and values
+#         with spaces are inserted in quotes (see QueryLanguage)
+#
+
+# The word being typed, optionally a "field:" term, ex. -brand:"so
+QUERY_TERM = re.compile(r'(?P<negate>-?)(?:(?P<field>[A-Za-z_][A-Za-z0-9_]*):)?"?(?P<prefix>[^\s"]*)$')
+
+
+class PrefixCompleter(QCompleter):
+    def __init__(self, line_edit, complete, field=None, query_terms=False, limit=10):
+        super().__init__(line_edit)
+        self.line_edit = line_edit
+        # Function (prefix, field) returning the completions
+        self.complete_values = complete
+        self.field = field
+        self.query_terms = query_terms
+        self.limit = limit
+        # Text before the completed part, kept from the last update for the insertion
+        self.head = ""
+
+        self.completion_model = QStringListModel(self)
+        self.setModel(self.completion_model)
+        self.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        # The completion function already matched the prefix
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.setWidget(line_edit)
+        self.activated[str].connect(self.insert_completion)
+        line_edit.textEdited.connect(self.update_completions)
+
+    #
+    #   Returns (head, field, prefix): the text kept, the field to complete and the typed prefix
+    #
+    def split(self, text):
+        if not self.query_terms:
+            return "", self.field, text.strip()
+        match = QUERY_TERM.search(text)
+        if match is None:
+            return text, None, ""
+        head = text[:match.start()] + match.group("negate")
+        if match.group("field"):
+            head += match.group("field") + ":"
+        return head, match.group("field") or self.field, match.group("prefix")
+
+    def update_completions(self, text):
+        head, field, prefix = self.split(text)
+        completions = []
+        if prefix:
+            try:
+                completions = self.complete_values(prefix, field)[:self.limit]
+            except Exception as e:
+                print(f"Error completing '{prefix}': {str(e)}")
+        self.head = head
+        self.completion_model.setStringList(completions)
+        if completions:
+            self.complete()
+        else:
+            self.popup().hide()
+
+    def insert_completion(self, value):
+        if self.query_terms and (" " in value or ":" in value):
+            value = f'"{value}"'
+        self.line_edit.setText(self.head + value)
@@ -1,8 +1,12 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                            QLineEdit, QPushButton, QFrame, QMessageBox)
+                            QLineEdit, QPushButton, QFrame, QMessageBox, QStackedWidget,
+                            QTextEdit, QCheckBox, QFileDialog, QTableWidget, QTableWidgetItem,
+                            QHeaderView)
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QFont
+from PyQt6.QtGui import QFont, QColor
 import re
+from database.PickList import parse_pick_list, OK, SKIPPED
+from ui.prefix_completer import PrefixCompleter
 
 class RemoveItemView(QWidget):  # Changed from QDialog to QWidget
     def __init__(self, parent, inventory_system, patterns):
@@ -53,6 +57,33 @@ class RemoveItemView(QWidget):  # Changed from QDialog to QWidget
         title.setFont(QFont("Segoe UI", 24, QFont.Weight.Bold))
         title.setStyleSheet(f"color: {colors['text_light']};")
         header_layout.addWidget(title)
+        
+        # Mode switch: one item at a time, or a whole pick list
+        mode_layout = QHBoxLayout()
+        mode_layout.setSpacing(8)
+        self.mode_buttons = []
+        for index, text in enumerate(["Single Item", "Pick List"]):
+            mode_btn = QPushButton(text)
+            mode_btn.setCheckable(True)
+            mode_btn.setChecked(index == 0)
+            mode_btn.setFont(QFont("Segoe UI", 10))
+            mode_btn.setStyleSheet(f"""
+                QPushButton {{
+                    background-color: {colors['container_bg']};
+                    color: {colors['text']};
+                    border-radius: 4px;
+                    padding: 6px 14px;
+                }}
+                QPushButton:checked {{
+                    background-color: {colors['accent']};
+                    color: white;
+                }}
+            """)
+            mode_btn.clicked.connect(lambda checked, index=index: self.set_mode(index))
+            mode_layout.addWidget(mode_btn)
+            self.mode_buttons.append(mode_btn)
+        mode_layout.addStretch()
+        header_layout.addLayout(mode_layout)
     
         main_layout.addWidget(header_frame)
         
@@ -106,6 +137,8 @@ class RemoveItemView(QWidget):  # Changed from QDialog to QWidget
             }}
         """)
         self.id_entry.setPlaceholderText("Enter item ID")
+        # Suggests the existing ids while typing (see PrefixIndex)
+        self.id_completer = PrefixCompleter(self.id_entry, lambda prefix, field: self.inventory_system.complete_values(prefix, field, wait=False), field="id")
         id_layout.addWidget(self.id_entry)
         
         id_help = QLabel("Enter the ID of the item you want to remove")
@@ -193,7 +226,123 @@ class RemoveItemView(QWidget):  # Changed from QDialog to QWidget
         remove_btn.clicked.connect(self.remove_item)
         container_layout.addWidget(remove_btn)
         
-        main_layout.addWidget(main_container)
+        self.mode_stack = QStackedWidget()
+        self.mode_stack.addWidget(main_container)
+        self.mode_stack.addWidget(self.create_pick_list_page(colors))
+        main_layout.addWidget(self.mode_stack)
+    
+    def set_mode(self, index):
+        self.mode_stack.setCurrentIndex(index)
+        for button_index, button in enumerate(self.mode_buttons):
+            button.setChecked(button_index == index)
+    
+    #
+    #   Builds the pick list page:
+    #       - A text box to paste a pick list into, or to scan into (one id per line removes one unit)
+    #       - A button to load a pick list file (CSV or text)
+    #       - A table with the outcome of every line after applying
+    #
+    def create_pick_list_page(self, colors):
+        page = QFrame()
+        page.setStyleSheet(f"""
+            background-color: {colors['container_bg']};
+            border-radius: 8px;
+            border: none;
+        """)
+        page_layout = QVBoxLayout(page)
+        page_layout.setContentsMargins(30, 30, 30, 30)
+        page_layout.setSpacing(15)
+        
+        subtitle = QLabel("Remove many items at once, one line per item: ID, quantity")
+        subtitle.setFont(QFont("Segoe UI", 12))
+        subtitle.setStyleSheet(f"color: {colors['placeholder']};")
+        page_layout.addWidget(subtitle)
+        
+        self.pick_list_entry = QTextEdit()
+        self.pick_list_entry.setFont(QFont("Consolas", 11))
+        self.pick_list_entry.setAcceptRichText(False)
+        self.pick_list_entry.setPlaceholderText("12, 3\n15, 1\nScanned IDs remove one item each\n+5 puts items back")
+        self.pick_list_entry.setStyleSheet(f"""
+            QTextEdit {{
+                border: 1px solid {colors['border']};
+                border-radius: 4px;
+                padding: 10px;
+                background-color: {colors['input_bg']};
+                color: {colors['text']};
+            }}
+            QTextEdit:focus {{
+                border: 1px solid {colors['accent']};
+            }}
+        """)
+        page_layout.addWidget(self.pick_list_entry, 1)
+        
+        options_layout = QHBoxLayout()
+        load_btn = QPushButton("Load File")
+        load_btn.setFont(QFont("Segoe UI", 10))
+        load_btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {colors['input_bg']};
+                color: {colors['text']};
+                border: 1px solid {colors['border']};
+                border-radius: 4px;
+                padding: 8px 14px;
+            }}
+            QPushButton:hover {{
+                border: 1px solid {colors['accent']};
+            }}
+        """)
+        load_btn.clicked.connect(self.load_pick_list)
+        options_layout.addWidget(load_btn)
+        
+        self.partial_check = QCheckBox("Apply valid lines even if some lines fail")
+        self.partial_check.setFont(QFont("Segoe UI", 10))
+        self.partial_check.setStyleSheet(f"color: {colors['text']};")
+        options_layout.addWidget(self.partial_check)
+        options_layout.addStretch()
+        page_layout.addLayout(options_layout)
+        
+        self.pick_list_summary = QLabel("")
+        self.pick_list_summary.setFont(QFont("Segoe UI", 10))
+        self.pick_list_summary.setStyleSheet(f"color: {colors['text']};")
+        page_layout.addWidget(self.pick_list_summary)
+        
+        self.pick_list_results = QTableWidget(0, 5)
+        self.pick_list_results.setHorizontalHeaderLabels(["Line", "ID", "Change", "Result", "Quantity"])
+        self.pick_list_results.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.pick_list_results.verticalHeader().setVisible(False)
+        self.pick_list_results.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.pick_list_results.setStyleSheet(f"""
+            QTableWidget {{
+                background-color: {colors['input_bg']};
+                color: {colors['text']};
+                gridline-color: {colors['border']};
+            }}
+            QHeaderView::section {{
+                background-color: {colors['container_bg']};
+                color: {colors['text']};
+                border: none;
+                padding: 4px;
+            }}
+        """)
+        page_layout.addWidget(self.pick_list_results, 1)
+        
+        apply_btn = QPushButton("Apply Pick List")
+        apply_btn.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
+        apply_btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {colors['danger']};
+                color: white;
+                border-radius: 4px;
+                padding: 12px 0;
+            }}
+            QPushButton:hover {{
+                background-color: #dc2626;
+            }}
+        """)
+        apply_btn.clicked.connect(self.apply_pick_list)
+        page_layout.addWidget(apply_btn)
+        
+        return page
         
     def remove_item(self):
         # Get values
@@ -218,6 +367,49 @@ class RemoveItemView(QWidget):  # Changed from QDialog to QWidget
         except ValueError as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    def load_pick_list(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Pick List", "", "Pick Lists (*.csv *.txt);;All Files (*)")
+        if not file_path:
+            return
+        try:
+            with open(file_path, "r", encoding="utf-8-sig") as file:
+                self.pick_list_entry.setPlainText(file.read())
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Could not read the pick list: {str(e)}")
+    
+    #
+    #   Applies the pick list in one transaction and shows the outcome of every line
+    #       - Only failed lines are shown in red, nothing is changed if a line fails (unless partial is checked)
+    #
+    def apply_pick_list(self):
+        lines = parse_pick_list(self.pick_list_entry.toPlainText())
+        if not lines:
+            QMessageBox.critical(self, "Error", "The pick list is empty.")
+            return
+        
+        try:
+            report = self.inventory_system.apply_pick_list(lines, partial=self.partial_check.isChecked())
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        
+        self.pick_list_results.setRowCount(len(report.lines))
+        for row, line in enumerate(report.lines):
+            result = line.status if not line.message else f"{line.status}: {line.message}"
+            values = [line.line_number, line.item_id, f"{line.delta:+d}", result, "" if line.quantity is None else line.quantity]
+            for column, value in enumerate(values):
+                cell = QTableWidgetItem(str(value))
+                if line.status not in (OK, SKIPPED):
+                    cell.setForeground(QColor("#ef4444"))
+                self.pick_list_results.setItem(row, column, cell)
+        
+        if report.applied:
+            self.pick_list_summary.setText(f"Applied. {report.summary()}")
+            if not report.failed():
+                self.pick_list_entry.clear()
+        else:
+            self.pick_list_summary.setText(f"Nothing was changed, fix the failed lines. {report.summary()}")
+
     # Add this method to the RemoveItemView class
     def refresh_items(self):
         """Refresh the list of items in the view"""
@@ -225,21 +417,17 @@ class RemoveItemView(QWidget):  # Changed from QDialog to QWidget
         if hasattr(self, 'item_list'):
             self.item_list.clear()
             
-            # Fetch all items from the database
-            items = self.inventory_system.get_all_items()
+            # Fetch the ids and names of all items from the database
+            items = self.inventory_system.fetch_items(["id", "name"])
             
             # Add items to the list
-            for _, item in items.iterrows():
-                item_id = str(item.get('id', ''))
-                item_name = str(item.get('name', ''))
+            for item_id, item_name in items:
                 item_text = f"{item_id}: {item_name}"
                 self.item_list.addItem(item_text)
         
         # If we have ID dropdown, update it
         if hasattr(self, 'id_combo'):
             self.id_combo.clear()
-            items = self.inventory_system.get_all_items()
-            for _, item in items.iterrows():
-                item_id = str(item.get('id', ''))
-                item_name = str(item.get('name', ''))
-                self.id_combo.addItem(f"{item_id}: {item_name}", item_id)
\ No newline at end of file
+            items = self.inventory_system.fetch_items(["id", "name"])
+            for item_id, item_name in items:
+                self.id_combo.addItem(f"{item_id}: {item_name}", str(item_id))
\ No newline at end of file
@@ -0,0 +1,244 @@
+import sqlite3
+import time
+from collections import deque
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+#   Search Pipeline
+#
+#   Runs the searches of a search box without blocking typing or showing stale results:
+#       - Debounce: every keystroke restarts a timer, the search starts once typing pauses for
+#         debounce_ms (submit(..., immediate=True) skips the wait, ex. after a filter is checked)
+#       - Sequencing: searches are numbered, a newer search cancels the one still running (its SQLite
+#         query is interrupted) and results of a superseded search are dropped instead of shown
+#       - Refinement: when refine(previous, request) allows it (ex. "cab" -> "cable" with the same
+#         fields and filters), request.within holds the ids found by the previous search, so the new
+#         search only has to look at those items (request.within_version is the version of the data the
+#         previous results were computed from, see SearchRequest.version)
+#       - Latency: for every keystroke, the time until results that include it are shown
+#
+#   search(request) runs on a worker thread (or inline with threaded=False) and returns the results,
+#   show(request, results) runs on the GUI thread.
+#
+
+# Pause in typing before a search starts
+DEFAULT_DEBOUNCE_MS = 150
+
+# Keystrokes whose results took longer than this are logged
+SLOW_SEARCH_MS = 500
+
+# Keystroke latencies kept for stats()
+LATENCY_HISTORY = 500
+
+
+class SearchCancelled(Exception):
+    pass
+
+
+class SearchRequest:
+    def __init__(self, sequence, text, context=None):
+        self.sequence = sequence
+        self.text = text
+        # What else decides the results (ex. fields and filters), compared by refine()
+        self.context = context
+        # Ids of the previous results when this search refines them, and the version they were found at
+        self.within = None
+        self.within_version = None
+        # Version of the data the results were computed from (set by the search function, ex. on the worker
+        # thread), the search function only uses within while the data is still at within_version
+        self.version = None
+        # Set by the search function when the results continue past what it returned (ex. the next page)
+        self.next_page = None
+        self.cancelled = False
+        # Connection running the search's query, interrupted on cancel (set by the search function)
+        self.connection = None
+        self.started = None
+
+    #
+    #   Stops the search: its query is interrupted and its results will not be shown
+    #
+    def cancel(self):
+        self.cancelled = True
+        if self.connection is not None:
+            self.connection.interrupt()
+
+    #
+    #   Raises SearchCancelled once a newer search has replaced this one (for search functions with several steps)
+    #
+    def check(self):
+        if self.cancelled:
+            raise SearchCancelled()
+
+    def __repr__(self):
+        return f"SearchRequest({self.sequence}, {self.text!r})"
+
+
+class SearchSignals(QObject):
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, object)
+
+
+class SearchTask(QRunnable):
+    def __init__(self, search, request, signals):
+        super().__init__()
+        self.search = search
+        self.request = request
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.search(self.request)
+        except Exception as e:
+            self.signals.failed.emit(self.request, e)
+            return
+        self.signals.finished.emit(self.request, result)
+
+
+class SearchPipeline(QObject):
+    def __init__(self, search, show, debounce_ms=DEFAULT_DEBOUNCE_MS, refine=None, result_ids=None, log=None, threaded=True, parent=None):
+        super().__init__(parent)
+        self.search = search
+        self.show = show
+        self.refine = refine
+        # Returns the ids of a result (for refinement), the "id" column of a RowSet by default
+        self.result_ids = result_ids or (lambda result: result.column("id") if "id" in result.columns else None)
+        self.log = log
+        self.threaded = threaded
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.start)
+        self.signals = SearchSignals(self)
+        self.signals.finished.connect(self.finished)
+        self.signals.failed.connect(self.failed)
+        self.pool = QThreadPool(self)
+        # One search at a time, a newer one waits for the cancelled one to return
+        self.pool.setMaxThreadCount(1)
+
+        self.sequence = 0
+        self.pending = None
+        self.running = None
+        # Last shown request and the ids of its results
+        self.previous = None
+        self.previous_ids = None
+        # Times of the keystrokes whose results have not been shown yet
+        self.keystrokes = []
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self.counts = {"searches": 0, "shown": 0, "discarded": 0, "cancelled": 0, "refined": 0, "failed": 0}
+
+    def set_debounce(self, debounce_ms):
+        self.timer.setInterval(debounce_ms)
+
+    #
+    #   Called for every change of the search text (or of what else decides the results)
+    #
+    def submit(self, text, context=None, immediate=False):
+        self.keystrokes.append(time.perf_counter())
+        self.pending = (text, context)
+        if immediate:
+            self.timer.stop()
+            self.start()
+        else:
+            self.timer.start()
+
+    #
+    #   Starts the pending search now instead of after the debounce
+    #
+    def flush(self):
+        if self.pending is not None:
+            self.timer.stop()
+            self.start()
+
+    def start(self):
+        if self.pending is None:
+            return
+        text, context = self.pending
+        self.pending = None
+        self.sequence += 1
+        request = SearchRequest(self.sequence, text, context)
+
+        # A newer search makes the running one useless
+        if self.running is not None:
+            self.running.cancel()
+            self.counts["cancelled"] += 1
+
+        if self.previous is not None and self.previous_ids is not None and self.refine and self.refine(self.previous, request):
+            request.within = self.previous_ids
+            request.within_version = self.previous.version
+            self.counts["refined"] += 1
+
+        request.started = time.perf_counter()
+        self.running = request
+        self.counts["searches"] += 1
+        if self.threaded:
+            self.pool.start(SearchTask(self.search, request, self.signals))
+        else:
+            SearchTask(self.search, request, self.signals).run()
+
+    def finished(self, request, result):
+        if request is self.running:
+            self.running = None
+        if request.cancelled or request.sequence != self.sequence:
+            # A newer search has started since, its results are the ones to show
+            self.counts["discarded"] += 1
+            return
+
+        self.show(request, result)
+        self.previous = request
+        try:
+            self.previous_ids = self.result_ids(result)
+        except Exception:
+            self.previous_ids = None
+        self.counts["shown"] += 1
+        self.record_latency(request)
+
+    def failed(self, request, error):
+        if request is self.running:
+            self.running = None
+        # A cancelled search stops with SearchCancelled or an interrupted query
+        if request.cancelled and isinstance(error, (SearchCancelled, sqlite3.OperationalError)):
+            self.counts["discarded"] += 1
+            return
+        self.counts["failed"] += 1
+        if self.log:
+            self.log(f"ERROR: Search Failed: text:{request.text}, error:{str(error)}")
+
+    #
+    #   The results shown include every keystroke made before their search started
+    #
+    def record_latency(self, request):
+        shown = time.perf_counter()
+        served = [keystroke for keystroke in self.keystrokes if keystroke <= request.started]
+        self.keystrokes = [keystroke for keystroke in self.keystrokes if keystroke > request.started]
+        for keystroke in served:
+            self.latencies.append((shown - keystroke) * 1000)
+        slowest = max(((shown - keystroke) * 1000 for keystroke in served), default=0)
+        if self.log and slowest > SLOW_SEARCH_MS:
+            self.log(f"Slow Search: text:{request.text}, keystroke_ms:{slowest:.0f}, search_ms:{(shown - request.started) * 1000:.0f}, refined:{request.within is not None}")
+
+    #
+    #   Returns the search counts and the keystroke latency percentiles (ms) of the recent keystrokes
+    #
+    def stats(self):
+        latencies = sorted(self.latencies)
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] if latencies else 0.0
+        return dict(self.counts, keystrokes=len(latencies), p50_ms=percentile(0.5), p95_ms=percentile(0.95),
+                    max_ms=latencies[-1] if latencies else 0.0)
+
+    #
+    #   Drops the pending search and cancels the running one (ex. when the view shows something else)
+    #
+    def cancel(self):
+        self.timer.stop()
+        self.pending = None
+        if self.running is not None:
+            self.running.cancel()
+            self.counts["cancelled"] += 1
+
+    #
+    #   Cancels the searches and waits for the worker to return (ex. when the view is closed)
+    #
+    def stop(self):
+        self.cancel()
+        self.pool.waitForDone()
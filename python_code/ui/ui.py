@@ -20,6 +20,8 @@ from PyQt6.QtWidgets import QPushButton, QMessageBox
 from ui.embed_ai import EmbedAI
 from ai.AI import AI 
 from ui.inventory_view import InventoryView  # Import the new InventoryView
+from ui.change_bridge import ChangeBridge
+from database.ChangeEvents import ITEM_EVENTS
 
 #   UI Class
 #    -  This class is for the UI of a database instance
@@ -238,9 +240,8 @@ class UI:
                 def update_low_stock_count():
                     try:
                         threshold = int(threshold_input.text())
-                        items_df = self.inventory_system.get_all_items()
-                        if 'quantity' in items_df.columns:
-                            low_stock_count = len(items_df[items_df['quantity'].astype(float) <= threshold])
+                        if 'quantity' in self.inventory_system.item_columns():
+                            low_stock_count = self.inventory_system.column_store().count({'quantity': ('<=', threshold)})
                             value_label.setText(str(low_stock_count))
                     except ValueError:
                         value_label.setText("--")
@@ -257,17 +258,12 @@ class UI:
             return card
         
         def calculate_total_value():
-            items_df = self.inventory_system.get_all_items()
-            if 'price' in items_df.columns and 'quantity' in items_df.columns:
-                # Convert price to float and multiply by quantity
-                items_df['price'] = items_df['price'].astype(float)
-                items_df['quantity'] = items_df['quantity'].astype(float)
-                total_value = (items_df['price'] * items_df['quantity']).sum()
-                return f"${total_value:,.2f}"
-            return "$0.00"
+            # Price times quantity summed over the column snapshot ($0.00 without those fields)
+            total_value = self.inventory_system.column_store().total_value('price', 'quantity')
+            return f"${total_value:,.2f}"
 
         # Add stats cards with real data
-        stats_layout.addWidget(create_stat_card("Total Products", str(len(self.inventory_system.get_all_items())), "📦"))
+        stats_layout.addWidget(create_stat_card("Total Products", str(self.inventory_system.column_store().count()), "📦"))
         stats_layout.addWidget(create_stat_card("Low Stock Items", "--", "⚠️", show_settings=True))
         stats_layout.addWidget(create_stat_card("Total Value", calculate_total_value(), "💰"))
         
@@ -330,6 +326,8 @@ class UI:
         
         # Add default view and inventory view to QStackedWidget
         self.stacked_widget.addWidget(self.default_view)
+        # The dashboard statistics follow the committed item changes (the views follow their own, see ChangeEvents)
+        self.dashboard_changes = ChangeBridge(self.inventory_system, lambda event: self.refresh_dashboard_stats(), ITEM_EVENTS, parent=self.root)
         self.inventory_view = InventoryView(self.root, self.inventory_system, self.ai)  # Use the new InventoryView
         self.stacked_widget.addWidget(self.inventory_view)
         
@@ -373,9 +371,8 @@ class UI:
             return
         # Switch to the inventory view in the stacked widget
         self.stacked_widget.setCurrentWidget(self.inventory_view)
-        # Refresh the inventory view to show the latest data
+        # Show all items again (the view already follows the changes, see InventoryView.on_database_changed)
         self.inventory_view.display_all_items()
-        self.refresh_views()
         
     def display_activity(self):
         if not self.is_authenticated():
@@ -394,14 +391,8 @@ class UI:
         if not self.is_authenticated():
             return
         # Switch to the add product view in the stacked widget
+        # (its custom field inputs follow the added and removed fields, see AddItemView.on_fields_changed)
         self.stacked_widget.setCurrentWidget(self.add_product_view)
-        # Refresh the view to show the latest fields
-        if hasattr(self, 'add_product_view'):
-            # Recreate the add item view to reflect any field changes
-            self.stacked_widget.removeWidget(self.add_product_view)
-            self.add_product_view = AddItemView(self.root, self.logic, self.inventory_system)
-            self.stacked_widget.addWidget(self.add_product_view)
-            self.stacked_widget.setCurrentWidget(self.add_product_view)
     
     def display_remove_item(self):
         if not self.is_authenticated():
@@ -857,30 +848,6 @@ class UI:
             return False
         return True
 
-    def refresh_views(self):
-        """Refresh all views to reflect database changes"""
-        # Refresh inventory view
-        if hasattr(self, 'inventory_view'):
-            self.inventory_view.display_all_items()
-        
-        # Refresh manage fields view
-        if hasattr(self, 'manage_fields_view'):
-            self.manage_fields_view.refresh_fields()
-        
-        # Refresh add item view by recreating it
-        if hasattr(self, 'add_product_view') and self.stacked_widget.currentWidget() == self.add_product_view:
-            index = self.stacked_widget.indexOf(self.add_product_view)
-            self.stacked_widget.removeWidget(self.add_product_view)
-            self.add_product_view = AddItemView(self.root, self.logic, self.inventory_system)
-            self.stacked_widget.insertWidget(index, self.add_product_view)
-            self.stacked_widget.setCurrentWidget(self.add_product_view)
-        
-        # Refresh remove item view
-        if hasattr(self, 'remove_product_view'):
-            # Assuming there's a refresh_items method in RemoveItemView
-            if hasattr(self.remove_product_view, 'refresh_items'):
-                self.remove_product_view.refresh_items()
-
     # Add this function to your UI class to refresh dashboard statistics
     def refresh_dashboard_stats(self):
         # Find the stats container in the default view
@@ -896,7 +863,7 @@ class UI:
             return
             
         # Update total products count
-        product_count = len(self.inventory_system.get_all_items())
+        product_count = self.inventory_system.column_store().count()
         stats_layout = stats_container.layout()
         if stats_layout.count() > 0:
             product_card = stats_layout.itemAt(0).widget()
@@ -924,14 +891,9 @@ class UI:
 
     # Move calculate_total_value out of the display_menu method and make it a class method
     def calculate_total_value(self):
-        items_df = self.inventory_system.get_all_items()
-        if 'price' in items_df.columns and 'quantity' in items_df.columns:
-            # Convert price to float and multiply by quantity
-            items_df['price'] = items_df['price'].astype(float)
-            items_df['quantity'] = items_df['quantity'].astype(float)
-            total_value = (items_df['price'] * items_df['quantity']).sum()
-            return f"${total_value:,.2f}"
-        return "$0.00"
+        # Price times quantity summed over the column snapshot ($0.00 without those fields)
+        total_value = self.inventory_system.column_store().total_value('price', 'quantity')
+        return f"${total_value:,.2f}"
 
     def show_help(self):
         """Display help information"""
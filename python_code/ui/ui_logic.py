@@ -12,19 +12,21 @@ class UILogic:
 
     def get_inventory_data(self):
         # This method doesn't need changes
-        self.inventory_system.cursor.execute(f"PRAGMA table_info({self.inventory_system.items_table})")
-        columns = [column[1] for column in self.inventory_system.cursor.fetchall()]
+        cursor = self.inventory_system.read_cursor()
+        cursor.execute(f"PRAGMA table_info({self.inventory_system.items_table})")
+        columns = [column[1] for column in cursor.fetchall()]
         query = f"SELECT {', '.join(columns)} FROM {self.inventory_system.items_table}"
-        self.inventory_system.cursor.execute(query)
-        records = self.inventory_system.cursor.fetchall()
+        cursor.execute(query)
+        records = cursor.fetchall()
         return columns, records
 
     def get_add_item_specs(self, window):
         # This method needs to return the same structure but doesn't need internal changes
         entries = {}
         message_labels = {}
-        self.inventory_system.cursor.execute(f"SELECT field_name, entry_type, validation_type, required FROM {self.inventory_system.fields_table}")
-        fields = self.inventory_system.cursor.fetchall()
+        cursor = self.inventory_system.read_cursor()
+        cursor.execute(f"SELECT field_name, entry_type, validation_type, required FROM {self.inventory_system.fields_table}")
+        fields = cursor.fetchall()
         prod_specs = {}
         for field_name, entry_type, validation_type, required in fields:
             # Debug the required value
@@ -64,21 +66,23 @@ class UILogic:
 
     def get_existing_fields(self):
         # This method doesn't need changes
-        self.inventory_system.cursor.execute(f"SELECT field_name FROM {self.inventory_system.fields_table}")
-        fields = [row[0] for row in self.inventory_system.cursor.fetchall()]
+        cursor = self.inventory_system.read_cursor()
+        cursor.execute(f"SELECT field_name FROM {self.inventory_system.fields_table}")
+        fields = [row[0] for row in cursor.fetchall()]
         return fields
         
     def get_field_details(self, field_name):
         """
         Get details about a specific field including validation type and required status
         """
+        cursor = self.inventory_system.read_cursor()
         try:
             # Query the database for field details
-            self.inventory_system.cursor.execute(
+            cursor.execute(
                 f"SELECT entry_type, validation_type, required FROM {self.inventory_system.fields_table} WHERE field_name = ?", 
                 (field_name,)
             )
-            result = self.inventory_system.cursor.fetchone()
+            result = cursor.fetchone()
             
             if result:
                 return {